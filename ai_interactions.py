@@ -1,75 +1,214 @@
-import requests
+import asyncio
 import json
 import os
 import re
-import ast
-from openai import OpenAI
+import hashlib
 from dotenv import load_dotenv
-from state_manager import load_game_state
+from functools import partial
+from instrumentation import span
+from ai_providers import create_provider
+from request_scheduler import RequestScheduler, RequestCancelled, TokenBucket
+from model_router import ModelRouter, load_routes
+from image_store import ImageStore, prompt_key, DOWNLOAD_CHUNK_SIZE
+from world_generator import generate_procedural_game_state, generate_expanding_game_state
+from item_catalog import item_id
+from world_repair import repair_world
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 DEEPAI_API_KEY = os.getenv("DEEPAI_API_KEY")
+AI_PROVIDER = os.getenv("AI_PROVIDER", "hosted")
+WORLD_GENERATOR = os.getenv("WORLD_GENERATOR", "ai")
+WORLD_SIZE = int(os.getenv("WORLD_SIZE", "12"))
+WORLD_SEED = os.getenv("WORLD_SEED")
+EXPANSION_BOSS_DEPTH = int(os.getenv("EXPANSION_BOSS_DEPTH", "8"))
+DESCRIPTION_BATCH_SIZE = int(os.getenv("DESCRIPTION_BATCH_SIZE", "8"))
+MAX_DESCRIPTION_CHARS = 1200
+DESCRIPTION_DEADLINE = float(os.getenv("DESCRIPTION_DEADLINE", "2.5"))
+DESCRIPTION_FALLBACK = "An intriguing scene unfolds before you."
+NPC_FALLBACK = "I have nothing to say right now."
+NPC_INSTRUCTIONS = (
+    "You are an NPC in a Dungeons & Dragons game. "
+    "Respond to the player's input in a way that reflects the current game state, being helpful, cryptic, or lore-focused. "
+    "Keep your responses concise and limited to no more than two sentences."
+)
+
+provider = create_provider(
+    AI_PROVIDER,
+    openai_api_key=OPENAI_API_KEY,
+    deepai_api_key=DEEPAI_API_KEY,
+    latency=float(os.getenv("OFFLINE_LATENCY", "0.2")),
+    jitter=float(os.getenv("OFFLINE_JITTER", "0.3")),
+    error_rate=float(os.getenv("OFFLINE_ERROR_RATE", "0")),
+    seed=os.getenv("OFFLINE_SEED"),
+)
+router = ModelRouter(load_routes())
+image_store = ImageStore()
+scheduler = RequestScheduler(
+    {
+        "openai": TokenBucket(float(os.getenv("OPENAI_REQUESTS_PER_SECOND", "2")), float(os.getenv("OPENAI_BURST", "4"))),
+        "deepai": TokenBucket(float(os.getenv("DEEPAI_REQUESTS_PER_SECOND", "0.5")), float(os.getenv("DEEPAI_BURST", "2"))),
+    },
+    max_in_flight=int(os.getenv("AI_MAX_IN_FLIGHT", "4")),
+)
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-game_state = load_game_state()
+def _chat(site, **request):
+    """
+    Sends a chat completion for a call site, using the model the router picks for it.
+    """
+    def attempt(model):
+        return scheduler.run(provider.chat_service, router.timed, site, partial(provider.chat, site), model=model, **request)
+    return router.complete(site, attempt)
 
 def generate_description(prompt):
     """
     Generates a location description using OpenAI's GPT model.
     """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a Dungeon Master."},
-                {
-                    "role": "user",
-                    "content": f"{prompt} Provide a brief, engaging paragraph, no more than 3 sentences.",
-                },
-            ],
-            max_tokens=200,
-            temperature=0.7,
-        )
+        with span("ai.description") as call:
+            response = _chat(
+                "description",
+                messages=[
+                    {"role": "system", "content": "You are a Dungeon Master."},
+                    {
+                        "role": "user",
+                        "content": f"{prompt} Provide a brief, engaging paragraph, no more than 3 sentences.",
+                    },
+                ],
+                max_tokens=200,
+                temperature=0.7,
+            )
+            call.add_usage(getattr(response, "usage", None))
         description_text = response.choices[0].message.content.strip()
         return description_text
+    except RequestCancelled:
+        raise
     except Exception as e:
         print(f"Error generating description: {e}")
-        return "An intriguing scene unfolds before you."
+        return DESCRIPTION_FALLBACK
+
+def generate_descriptions_batch(prompts, batch_size=DESCRIPTION_BATCH_SIZE):
+    """
+    Generates descriptions for many locations, packing up to batch_size prompts into each completion.
+    Takes a mapping of location name to prompt and returns a mapping of location name to description.
+    Entries missing or invalid in a batch reply are retried with individual calls.
+    """
+    names = list(prompts)
+    descriptions = {}
+    for start in range(0, len(names), max(1, batch_size)):
+        chunk = {name: prompts[name] for name in names[start:start + batch_size]}
+        if len(chunk) > 1:
+            descriptions.update(_generate_description_chunk(chunk))
+
+    return {name: descriptions[name] if name in descriptions else generate_description(prompts[name]) for name in names}
+
+def _generate_description_chunk(chunk):
+    """
+    Requests one completion for several location prompts and returns the entries that validate.
+    """
+    entries = "\n".join(f"- {name}: {prompt}" for name, prompt in chunk.items())
+    try:
+        with span("ai.description_batch") as call:
+            response = _chat(
+                "description_batch",
+                messages=[
+                    {"role": "system", "content": "You are a Dungeon Master."},
+                    {
+                        "role": "user",
+                        "content": (
+                            "Write a description for each location below. Provide a brief, engaging paragraph, "
+                            "no more than 3 sentences, for each one.\n"
+                            f"{entries}\n"
+                            "Return only a JSON object mapping each location key exactly as given to its paragraph."
+                        ),
+                    },
+                ],
+                max_tokens=200 * len(chunk) + 50,
+                temperature=0.7,
+            )
+            call.add_usage(getattr(response, "usage", None))
+        reply = response.choices[0].message.content.strip()
+        reply = re.sub(r"```(?:json)?|```", "", reply).strip()
+        parsed = json.loads(reply)
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        print(f"Error generating batched descriptions: {e}")
+        return {}
+
+    if not isinstance(parsed, dict):
+        print("Error: Batched descriptions were not a JSON object.")
+        return {}
+
+    descriptions = {}
+    for name in chunk:
+        text = parsed.get(name)
+        if isinstance(text, str) and text.strip() and len(text) <= MAX_DESCRIPTION_CHARS:
+            descriptions[name] = text.strip()
+    return descriptions
 
-def generate_npc_response(npc_name, player_input):
+def _npc_prompt_inputs(npc_name, game_state):
+    """
+    Returns the parts of the game state an NPC's prompt is built from, as a hashable tuple.
+    """
+    player = game_state["player"]
+    location = player["location"]
+    npc_data = game_state["locations"][location]["npcs"].get(npc_name, {})
+    return (
+        location,
+        npc_name,
+        npc_data.get("status", "unknown"),
+        player["hp"],
+        player["max_hp"],
+        tuple(item_id(item) for item in player["inventory"]),
+        tuple(name for name, quest in game_state.get("quests", {}).items() if not quest["completed"]),
+    )
+
+def npc_prompt_fingerprint(npc_name, game_state):
+    """
+    Hashes the game state an NPC's prompt is built from: where the NPC is, its status,
+    the player's HP and inventory, and the open quests.
+    """
+    return hashlib.sha1(repr(_npc_prompt_inputs(npc_name, game_state)).encode("utf-8")).hexdigest()
+
+def npc_context(npc_name, game_state):
+    """
+    Returns the system messages for an NPC: the shared instructions, then the location
+    and NPC, then the player's state.
+    """
+    location, _, status, current_hp, max_hp, inventory, open_quest_names = _npc_prompt_inputs(npc_name, game_state)
+    quests = game_state.get("quests", {})
+    open_quests = ', '.join(f"{q}: {quests[q]['description']}" for q in open_quest_names)
+    return [
+        {"role": "system", "content": NPC_INSTRUCTIONS},
+        {
+            "role": "system",
+            "content": (
+                f"You are an NPC named {npc_name.capitalize()}. "
+                f"You are located at {location.replace('_', ' ').title()}, which is described as: '{game_state['locations'][location]['description']}'. "
+                f"The active quests are: {open_quests}. "
+                f"Your status is '{status}'. "
+                f"The player has {current_hp}/{max_hp} HP and the following inventory: "
+                f"{', '.join(inventory)}."
+            ),
+        },
+    ]
+
+def generate_npc_response(npc_name, player_input, game_state):
     """
     Generates an NPC's response to the player's input using OpenAI's GPT model.
     """
     try:
-        location = game_state["player"]["location"]
-        npc_data = game_state["locations"][location]["npcs"].get(npc_name, {})
-        inventory = game_state["player"]["inventory"]
-        quests = game_state.get("quests", {})
-        current_hp = game_state["player"]["hp"]
-        max_hp = game_state["player"]["max_hp"]
-
-        context = (
-            f"You are an NPC named {npc_name.capitalize()} in a Dungeons & Dragons game. "
-            f"You are located at {location.replace('_', ' ').title()}, which is described as: '{game_state['locations'][location]['description']}'. "
-            f"Your status is '{npc_data.get('status', 'unknown')}'. "
-            f"The player has {current_hp}/{max_hp} HP and the following inventory: "
-            f"{', '.join(item['name'] for item in inventory)}. "
-            f"The active quests are: {', '.join(f'{q}: {data['description']}' for q, data in quests.items() if not data['completed'])}. "
-            "Respond to the player's input in a way that reflects the current game state, being helpful, cryptic, or lore-focused. "
-            "Keep your responses concise and limited to no more than two sentences."
-        )
-
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": context},
-                {"role": "user", "content": player_input},
-            ],
-            max_tokens=150,
-            temperature=0.7,
-        )
+        context = npc_context(npc_name, game_state)
+
+        with span("ai.npc_response") as call:
+            response = _chat(
+                "npc_response",
+                messages=context + [{"role": "user", "content": player_input}],
+                max_tokens=150,
+                temperature=0.7,
+            )
+            call.add_usage(getattr(response, "usage", None))
         npc_response = response.choices[0].message.content.strip()
 
         sentences = re.split(r'(?<=[.!?]) +', npc_response)
@@ -79,41 +218,54 @@ def generate_npc_response(npc_name, player_input):
                 npc_response += '.'
 
         return npc_response
+    except RequestCancelled:
+        raise
     except Exception as e:
         print(f"Error generating NPC response: {e}")
-        return "I have nothing to say right now."
+        return NPC_FALLBACK
 
-def generate_image_with_deepai(description, location_name, folder="generated_images"):
+def generate_image_with_deepai(description, location_name, store=None):
     """
     Generates an image using the DeepAI API based on the location description.
+    Prompts that were rendered before are served from the image store without calling DeepAI.
+    The image is streamed to disk in chunks and recorded with its SHA-256 checksum.
     """
+    store = store or image_store
+    text = f"{description}. Make it in a Dungeons & Dragons style, with a cave environment."
+    key = prompt_key(text)
     try:
-        url = "https://api.deepai.org/api/text2img"
-        headers = {"api-key": DEEPAI_API_KEY}
-        data = {"text": f"{description}. Make it in a Dungeons & Dragons style, with a cave environment."}
-
-        response = requests.post(url, headers=headers, data=data)
-        response_data = response.json()
-
-        if "output_url" not in response_data:
-            print(f"Error: 'output_url' not found in API response.")
-            return None
-
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-
-        image_url = response_data["output_url"]
-        image_path = os.path.join(folder, f"{location_name}_image.png")
-        image_data = requests.get(image_url).content
-
-        with open(image_path, "wb") as img_file:
-            img_file.write(image_data)
-
-        return {"file_path": image_path, "url": image_url}
+        with store.key_lock(key):
+            entry = store.lookup(key)
+            if entry is not None:
+                return entry
+
+            with span("ai.image_request"):
+                image_url = scheduler.run(provider.image_service, provider.request_image, text, priority="bulk")
+
+            with span("ai.image_download"):
+                download = scheduler.run(provider.image_service, provider.open_download, image_url, priority="bulk")
+                with download:
+                    download.raise_for_status()
+                    length = download.headers.get("Content-Length")
+                    if download.headers.get("Content-Encoding") or not (length and length.isdigit()):
+                        length = None
+                    return store.save_stream(
+                        key,
+                        image_url,
+                        download.iter_content(DOWNLOAD_CHUNK_SIZE),
+                        expected_size=int(length) if length else None,
+                    )
     except Exception as e:
         print(f"Error during image generation: {e}")
         return None
 
+async def generate_image_async(description, location_name, store=None):
+    """
+    Awaitable form of generate_image_with_deepai for code running on an event loop.
+    The blocking download runs on a worker thread that carries the caller's context.
+    """
+    return await asyncio.to_thread(generate_image_with_deepai, description, location_name, store)
+
 def validate_game_state(game_state):
     """
     Validates the game state structure and required keys.
@@ -139,6 +291,7 @@ def validate_game_state(game_state):
         "hidden_items",
         "traps",
     }
+    required_pending_keys = {"description", "connections"}
 
     if "player" not in game_state:
         raise ValueError("Missing 'player' section in game state.")
@@ -156,6 +309,11 @@ def validate_game_state(game_state):
     if "locations" not in game_state:
         raise ValueError("Missing 'locations' section in game state.")
     for location_name, location_data in game_state["locations"].items():
+        if location_data.get("pending"):
+            if not required_pending_keys.issubset(location_data.keys()):
+                missing = required_pending_keys - location_data.keys()
+                raise ValueError(f"Pending location '{location_name}' is missing required keys: {missing}")
+            continue
         if not required_location_keys.issubset(location_data.keys()):
             missing = required_location_keys - location_data.keys()
             raise ValueError(f"Location '{location_name}' is missing required keys: {missing}")
@@ -256,7 +414,7 @@ def generate_initial_game_state(attempts=3):
                 },
                 "locked_paths": {
                     "west": true,
-                    "north": true,
+                    "north": true
                 },
                 "hidden_items": {
                     "golden_key": {
@@ -342,17 +500,19 @@ def generate_initial_game_state(attempts=3):
 
     for attempt in range(1, attempts + 1):
         try:
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a Dungeon Master."},
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=3500,
-                temperature=0.7,
-                n=1,
-                stop=None,
-            )
+            with span("ai.world_generation") as call:
+                response = _chat(
+                    "world_generation",
+                    messages=[
+                        {"role": "system", "content": "You are a Dungeon Master."},
+                        {"role": "user", "content": prompt},
+                    ],
+                    max_tokens=3500,
+                    temperature=0.7,
+                    n=1,
+                    stop=None,
+                )
+                call.add_usage(getattr(response, "usage", None))
 
             game_state_text = response.choices[0].message.content.strip()
             game_state_text = re.sub(r"```(?:python|json)?|```", "", game_state_text).strip()
@@ -368,11 +528,14 @@ def generate_initial_game_state(attempts=3):
                 print(f"Validation Error: {ve}")
 
             try:
-                game_state = ast.literal_eval(game_state_text)
+                game_state, fixes = repair_world(game_state_text)
                 validate_game_state(game_state)
+                print(f"Repaired the generated world locally ({len(fixes)} fixes):")
+                for fix in fixes:
+                    print(f"- {fix}")
                 return game_state
-            except Exception:
-                print("Error: Failed to parse game_state as Python dict.")
+            except (ValueError, TypeError) as error:
+                print(f"Error: The generated world could not be repaired: {error}")
         except Exception as e:
             print(f"Error during API call: {e}")
 
@@ -384,5 +547,19 @@ def generate_initial_game_state(attempts=3):
 def initialize_game_state():
     """
     Initializes the game state by generating it if not present.
+    By default GPT-4 writes the world; set WORLD_GENERATOR=procedural to build it locally,
+    or WORLD_GENERATOR=expanding to generate locations only as the player approaches them.
     """
-    return generate_initial_game_state()
+    if WORLD_GENERATOR == "ai":
+        return generate_initial_game_state()
+
+    if WORLD_GENERATOR == "expanding":
+        game_state = generate_expanding_game_state(seed=WORLD_SEED, boss_depth=EXPANSION_BOSS_DEPTH)
+    else:
+        game_state = generate_procedural_game_state(WORLD_SIZE, seed=WORLD_SEED)
+    try:
+        validate_game_state(game_state)
+    except ValueError as ve:
+        print(f"Validation Error: {ve}")
+        return None
+    return game_state
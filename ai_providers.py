@@ -0,0 +1,188 @@
+import hashlib
+import json
+import random
+import re
+import struct
+import time
+import zlib
+from types import SimpleNamespace
+from world_generator import generate_procedural_game_state
+
+DEEPAI_TEXT2IMG_URL = "https://api.deepai.org/api/text2img"
+
+class ProviderError(Exception):
+    """
+    Raised when a provider cannot complete a request.
+    """
+
+class HostedProvider:
+    """
+    The real services: OpenAI for chat completions and DeepAI for images.
+    """
+
+    name = "hosted"
+    chat_service = "openai"
+    image_service = "deepai"
+
+    def __init__(self, openai_api_key, deepai_api_key):
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=openai_api_key)
+        self.deepai_api_key = deepai_api_key
+
+    def chat(self, site, **request):
+        """
+        Returns a chat completion. Responses expose choices[0].message.content and usage.
+        """
+        return self.client.chat.completions.create(**request)
+
+    def stream_chat(self, site, **request):
+        """
+        Yields the text of a chat completion as it is generated.
+        """
+        for chunk in self.client.chat.completions.create(stream=True, **request):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    def request_image(self, text):
+        """
+        Asks for an image of the text and returns the URL to download it from.
+        """
+        import requests
+
+        response = requests.post(DEEPAI_TEXT2IMG_URL, headers={"api-key": self.deepai_api_key}, data={"text": text})
+        response_data = response.json()
+        if "output_url" not in response_data:
+            raise ProviderError("'output_url' not found in API response.")
+        return response_data["output_url"]
+
+    def open_download(self, url):
+        """
+        Opens a streamed download. The result is a context manager with headers,
+        raise_for_status() and iter_content(chunk_size).
+        """
+        import requests
+
+        return requests.get(url, stream=True, timeout=60)
+
+class OfflineProvider:
+    """
+    In-process stand-in that answers every call site with schema-valid content, so the
+    game, benchmarks and load tests run without network access or keys. Latency and
+    failures can be injected to exercise the scheduling and fallback paths.
+    """
+
+    name = "offline"
+    chat_service = "offline"
+    image_service = "offline"
+
+    NPC_LINES = [
+        "The roads grow darker the closer you get to the castle.",
+        "I have heard the crystals in the caves sing at night.",
+        "Keep your keys close; not every door here wants to open.",
+        "Travellers rarely come this way, and fewer leave.",
+        "Steel will serve you better than words against the Shadow Lord.",
+    ]
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+    def _simulate(self):
+        delay = self.latency + self.rng.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            time.sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise ProviderError("Injected offline provider failure.")
+
+    def _reply(self, site, messages):
+        prompt = messages[-1]["content"] if messages else ""
+        if site == "world_generation":
+            return json.dumps(generate_procedural_game_state(12, seed=self.rng.randrange(2 ** 32)))
+        if site == "description_batch":
+            names = re.findall(r"^- ([^:\n]+):", prompt, flags=re.MULTILINE)
+            return json.dumps({name: self._describe(name) for name in names})
+        if site == "description":
+            return self._describe(prompt.split(".")[0])
+        return self.NPC_LINES[self.rng.randrange(len(self.NPC_LINES))]
+
+    def _describe(self, subject):
+        subject = subject.replace("_", " ").strip() or "this place"
+        subject = subject[0].lower() + subject[1:]
+        return f"Shadows gather around {subject}. The air is cold and still, and somewhere water drips onto old stone."
+
+    def chat(self, site, **request):
+        self._simulate()
+        messages = request.get("messages", [])
+        content = self._reply(site, messages)
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        completion_tokens = len(content) // 4
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def stream_chat(self, site, **request):
+        content = self.chat(site, **request).choices[0].message.content
+        for word in content.split(" "):
+            yield word + " "
+
+    def request_image(self, text):
+        self._simulate()
+        return f"offline://{hashlib.sha256(text.encode('utf-8')).hexdigest()[:24]}.png"
+
+    def open_download(self, url):
+        return OfflineDownload(placeholder_png(url.encode("utf-8")))
+
+class OfflineDownload:
+    """
+    Mimics the parts of a streamed requests.Response that the image pipeline uses.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.headers = {"Content-Length": str(len(data))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start:start + chunk_size]
+
+def placeholder_png(seed, size=64):
+    """
+    Returns a solid-colour PNG whose colour is derived from the seed bytes.
+    """
+    red, green, blue = hashlib.sha256(seed).digest()[:3]
+    row = b"\x00" + bytes((red, green, blue)) * size
+    raw = row * size
+
+    def chunk(kind, payload):
+        return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+def create_provider(kind, openai_api_key=None, deepai_api_key=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+    """
+    Builds the provider named by kind: "hosted" for OpenAI and DeepAI, or "offline".
+    """
+    if kind == "offline":
+        return OfflineProvider(latency=latency, jitter=jitter, error_rate=error_rate, seed=seed)
+    if kind == "hosted":
+        return HostedProvider(openai_api_key, deepai_api_key)
+    raise ValueError(f"Unknown AI provider '{kind}'.")
@@ -0,0 +1,283 @@
+import asyncio
+import codecs
+import os
+import threading
+from collections import deque
+
+try:
+    import termios
+except ImportError:
+    termios = None
+
+ERASE_LINE = "\r\x1b[K"
+BACKSPACE_KEYS = ("\x7f", "\x08")
+END_OF_INPUT = "\x04"
+KILL_LINE = "\x15"
+ESCAPE = "\x1b"
+
+class ConsoleOutput:
+    """
+    Terminal writer that remembers the unfinished last line and what the player has
+    typed after it, so a message can be printed above a waiting prompt and the prompt
+    and the player's input drawn again beneath it.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.partial = ""
+        self.typed = ""
+        self.lock = threading.Lock()
+        self.is_terminal = hasattr(stream, "isatty") and stream.isatty()
+
+    def write(self, data):
+        with self.lock:
+            self.stream.write(data)
+            if "\n" in data:
+                self.partial = data.rsplit("\n", 1)[1]
+            else:
+                self.partial += data
+        return len(data)
+
+    def flush(self):
+        self.stream.flush()
+
+    def echo(self, text):
+        """
+        Shows characters the player typed and adds them to the pending input.
+        """
+        with self.lock:
+            self.typed += text
+            self.stream.write(text)
+            self.stream.flush()
+
+    def erase(self):
+        """
+        Removes the last typed character from the pending input and the screen.
+        """
+        with self.lock:
+            if self.typed:
+                self.typed = self.typed[:-1]
+                self.stream.write("\b \b")
+                self.stream.flush()
+
+    def redraw(self, typed=None):
+        """
+        Draws the prompt and the pending input again, optionally replacing the input.
+        """
+        with self.lock:
+            if typed is not None:
+                self.typed = typed
+            self.stream.write(ERASE_LINE + self.partial + self.typed)
+            self.stream.flush()
+
+    def submit(self):
+        """
+        Ends the pending input at Enter and returns it.
+        """
+        with self.lock:
+            line, self.typed, self.partial = self.typed, "", ""
+            self.stream.write("\n")
+            self.stream.flush()
+        return line
+
+    def interject(self, message):
+        """
+        Prints a message on its own lines and redraws the prompt the player is answering,
+        with whatever they have typed so far.
+        """
+        with self.lock:
+            self.stream.write((ERASE_LINE if self.is_terminal else "\n") + message + "\n" + self.partial + self.typed)
+            self.stream.flush()
+
+class AsyncConsole:
+    """
+    Reads the terminal on the event loop without blocking it. Coroutines await lines
+    with read_line(); the game thread's input() calls reach readline(), which waits
+    for the loop to deliver a line. While the player is at a prompt, background
+    notifications are printed as they arrive instead of after the next command.
+    On a terminal, input is read a key at a time and echoed by the console itself,
+    so a notification never loses what the player has typed.
+    """
+
+    def __init__(self, loop, stdin, stdout, session):
+        self.loop = loop
+        self.stdin = stdin
+        self.output = ConsoleOutput(stdout)
+        self.session = session
+        self.lines = deque()
+        self.buffer = b""
+        self.waiter = None
+        self.waiting = False
+        self.closed = False
+        self.reader_fd = None
+        self.saved_mode = None
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self.escape = None
+
+    def start(self):
+        """
+        Starts reading stdin: with a loop reader where the platform supports one,
+        otherwise on a daemon thread.
+        """
+        try:
+            fd = self.stdin.fileno()
+            self.loop.add_reader(fd, self._on_readable, fd)
+            self.reader_fd = fd
+            self._enter_key_mode(fd)
+        except (AttributeError, OSError, ValueError, NotImplementedError):
+            threading.Thread(target=self._read_blocking, daemon=True).start()
+        self.session.on_notify = lambda: self.loop.call_soon_threadsafe(self.deliver_notifications)
+
+    def stop(self):
+        self.session.on_notify = None
+        if self.reader_fd is not None:
+            self.loop.remove_reader(self.reader_fd)
+            self.reader_fd = None
+        self._leave_key_mode()
+        self._close()
+
+    def _enter_key_mode(self, fd):
+        """
+        Turns off the terminal's line editing and echo so keys arrive as they are typed.
+        Signals such as Ctrl-C keep working.
+        """
+        if termios is None or not self.output.is_terminal or not os.isatty(fd):
+            return
+        try:
+            mode = termios.tcgetattr(fd)
+            self.saved_mode = (fd, list(mode))
+            mode[3] &= ~(termios.ICANON | termios.ECHO)
+            mode[6][termios.VMIN] = 1
+            mode[6][termios.VTIME] = 0
+            termios.tcsetattr(fd, termios.TCSANOW, mode)
+        except termios.error:
+            self.saved_mode = None
+
+    def _leave_key_mode(self):
+        if self.saved_mode is not None:
+            fd, mode = self.saved_mode
+            self.saved_mode = None
+            try:
+                termios.tcsetattr(fd, termios.TCSADRAIN, mode)
+            except termios.error:
+                pass
+
+    def _on_readable(self, fd):
+        data = os.read(fd, 4096)
+        if self.saved_mode is not None and data:
+            self._on_keys(self.decoder.decode(data))
+            return
+        if not data:
+            if self.buffer:
+                self._feed(self.buffer.decode("utf-8", errors="ignore"))
+                self.buffer = b""
+            self.loop.remove_reader(fd)
+            self.reader_fd = None
+            self._close()
+            return
+        self.buffer += data
+        while b"\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\n", 1)
+            self._feed(line.decode("utf-8", errors="ignore").replace("\r", "") + "\n")
+
+    def _on_keys(self, text):
+        """
+        Applies typed keys to the pending input: printable characters, backspace,
+        Ctrl-U to clear the line, Ctrl-D on an empty line for end of input and Enter.
+        Escape sequences such as arrow keys are skipped.
+        """
+        for char in text:
+            if self.escape is not None:
+                self.escape += char
+                if self._escape_finished(self.escape):
+                    self.escape = None
+                continue
+            if char == ESCAPE:
+                self.escape = ""
+            elif char in "\r\n":
+                self._feed(self.output.submit() + "\n")
+            elif char in BACKSPACE_KEYS:
+                self.output.erase()
+            elif char == KILL_LINE:
+                self.output.redraw("")
+            elif char == END_OF_INPUT:
+                if not self.output.typed:
+                    self._close()
+            elif char.isprintable():
+                self.output.echo(char)
+
+    def _escape_finished(self, sequence):
+        """
+        Tells whether the characters after ESC complete a key sequence: a CSI sequence
+        ("[" up to a final byte), an SS3 sequence ("O" and one key) or a single Alt key.
+        """
+        if sequence[0] == "[":
+            return len(sequence) > 1 and "@" <= sequence[-1] <= "~"
+        if sequence[0] == "O":
+            return len(sequence) == 2
+        return True
+
+    def _read_blocking(self):
+        while True:
+            line = self.stdin.readline()
+            if not line:
+                self.loop.call_soon_threadsafe(self._close)
+                return
+            self.loop.call_soon_threadsafe(self._feed, line)
+
+    def _feed(self, line):
+        self.session.touch()
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(line)
+            self.waiter = None
+        else:
+            self.lines.append(line)
+
+    def _close(self):
+        self.closed = True
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result("")
+            self.waiter = None
+
+    def close(self):
+        """
+        Marks the input as finished; pending and later reads return end of file.
+        """
+        self.loop.call_soon_threadsafe(self._close)
+
+    def deliver_notifications(self):
+        """
+        Prints queued background messages above the prompt if the player is at one.
+        Otherwise they stay queued until the running command finishes.
+        """
+        if not self.waiting:
+            return
+        for message in self.session.drain_notifications():
+            self.output.interject(message)
+
+    async def read_line(self, prompt=""):
+        """
+        Shows a prompt and returns the next line, or an empty string at end of input.
+        """
+        if prompt:
+            self.output.write(prompt)
+            self.output.flush()
+        if self.output.typed:
+            self.output.redraw()
+        self.waiting = True
+        self.deliver_notifications()
+        try:
+            if self.lines:
+                return self.lines.popleft()
+            if self.closed:
+                return ""
+            self.waiter = self.loop.create_future()
+            return await self.waiter
+        finally:
+            self.waiting = False
+
+    def readline(self, *args):
+        """
+        Blocking read for the game thread; input() writes the prompt before calling this.
+        """
+        return asyncio.run_coroutine_threadsafe(self.read_line(), self.loop).result()
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+DEFAULT_CACHE_DIR = "audio_cache"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+INDEX_FILE = "index.json"
+
+def normalize_text(text):
+    """
+    Normalizes text so that trivially different strings share one clip.
+    """
+    return re.sub(r"\s+", " ", text).strip()
+
+def find_wav_player():
+    """
+    Returns the command used to play WAV files on this platform, or None if there is none.
+    """
+    if sys.platform.startswith("win"):
+        return "winsound"
+    for player in ("afplay", "aplay", "paplay"):
+        executable = shutil.which(player)
+        if executable:
+            return executable
+    return None
+
+WAV_PLAYER = find_wav_player()
+
+def play_wav(file_path):
+    """
+    Plays a WAV file with the platform's native player. Returns False if playback failed.
+    """
+    if WAV_PLAYER is None:
+        return False
+
+    if WAV_PLAYER == "winsound":
+        try:
+            import winsound
+            winsound.PlaySound(file_path, winsound.SND_FILENAME)
+            return True
+        except Exception:
+            return False
+
+    args = [WAV_PLAYER, file_path]
+    if os.path.basename(WAV_PLAYER) == "aplay":
+        args.insert(1, "-q")
+    try:
+        return subprocess.run(args, check=False).returncode == 0
+    except OSError:
+        return False
+
+class AudioCache:
+    """
+    Disk cache of pre-rendered speech clips, indexed by normalized text and voice settings
+    and bounded by total size with least-recently-used eviction.
+    """
+
+    def __init__(self, engine, folder=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.engine = engine
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(folder, INDEX_FILE)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        """
+        Loads the clip index, dropping entries whose files no longer exist.
+        """
+        try:
+            with open(self.index_path, "r") as file:
+                index = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {
+            key: entry for key, entry in index.items()
+            if os.path.exists(os.path.join(self.folder, entry["file"]))
+        }
+
+    def _save_index(self):
+        """
+        Writes the clip index to disk.
+        """
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        with open(self.index_path, "w") as file:
+            json.dump(self.index, file)
+
+    def voice_settings(self):
+        """
+        Returns the engine properties that affect how a clip sounds.
+        """
+        return {
+            "rate": self.engine.getProperty("rate"),
+            "volume": self.engine.getProperty("volume"),
+            "voice": self.engine.getProperty("voice"),
+        }
+
+    def cache_key(self, text):
+        """
+        Builds the index key for a piece of text under the current voice settings.
+        """
+        payload = json.dumps({"text": normalize_text(text), **self.voice_settings()}, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def total_bytes(self):
+        """
+        Returns the combined size of all cached clips.
+        """
+        return sum(entry["size"] for entry in self.index.values())
+
+    def render(self, text):
+        """
+        Renders the text to a WAV clip if it is not cached yet and returns the clip path.
+        """
+        key = self.cache_key(text)
+        entry = self.index.get(key)
+        if entry:
+            entry["last_used"] = time.time()
+            return os.path.join(self.folder, entry["file"])
+
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+        file_name = f"{key}.wav"
+        file_path = os.path.join(self.folder, file_name)
+        self.engine.save_to_file(normalize_text(text), file_path)
+        self.engine.runAndWait()
+
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            return None
+
+        self.index[key] = {
+            "file": file_name,
+            "text": normalize_text(text),
+            "size": os.path.getsize(file_path),
+            "last_used": time.time(),
+        }
+        self.evict()
+        self._save_index()
+        return file_path if key in self.index else None
+
+    def close(self):
+        """
+        Persists the recency information gathered since the last render.
+        """
+        if self.index:
+            self._save_index()
+
+    def evict(self):
+        """
+        Removes least recently used clips until the cache fits within its size budget.
+        """
+        by_age = sorted(self.index.items(), key=lambda pair: pair[1]["last_used"])
+        total = self.total_bytes()
+        for key, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.folder, entry["file"]))
+            except FileNotFoundError:
+                pass
+            total -= entry["size"]
+            del self.index[key]
+
+    def play(self, text):
+        """
+        Plays the cached clip for the text, rendering it first if needed.
+        Returns False when the caller should fall back to live synthesis.
+        """
+        if WAV_PLAYER is None:
+            return False
+        file_path = self.render(text)
+        if not file_path:
+            return False
+        return play_wav(file_path)
+
+    def warm(self, phrases):
+        """
+        Pre-renders a list of phrases so that their first use plays instantly.
+        """
+        if WAV_PLAYER is None:
+            return
+        for phrase in phrases:
+            self.render(phrase)
+        self._save_index()
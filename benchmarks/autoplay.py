@@ -0,0 +1,320 @@
+import argparse
+import copy
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.run_benchmarks import import_engine
+from benchmarks.soak_test import BotInput, BotOutput, BotStuck, MAX_ANSWERS_PER_COMMAND
+from item_catalog import item_id, resolve_item
+
+DEFAULT_MAX_TURNS = 1000
+RESTRICTED_ITEMS = ["ancient_artifact"]
+
+_worker = {}
+
+class AutoplayAgent:
+    """
+    Plays one world to the end through the real command handlers: it picks up everything,
+    heals when low, fights whatever stands in its way and walks towards the nearest place
+    it has not cleared yet, using keys on locked paths when it has them. It retreats from
+    a losing fight while there is still somewhere else to go, and fights on once there is not.
+    """
+
+    def __init__(self, main, session_file, seed):
+        from game_session import GameSession
+
+        self.main = main
+        self.rng = random.Random(seed)
+        self.output = BotOutput()
+        self.session = GameSession("autoplay", save_file=session_file, use_voice=False, stdin=BotInput(self), stdout=self.output)
+        self.answers = 0
+        self.opponent = None
+        self.in_combat = False
+        self.avoided = set()
+        self.desperate = False
+        self.visited = set()
+
+    @property
+    def game_state(self):
+        return self.session.game_state
+
+    def required_items(self):
+        return {item for quest in self.game_state["quests"].values() for item in quest.get("required_items", [])}
+
+    def healing_items(self):
+        required = self.required_items()
+        return [
+            item_id(entry) for entry in self.game_state["player"]["inventory"]
+            if resolve_item(entry).get("type") == "healing" and item_id(entry) not in required
+        ]
+
+    def key_count(self):
+        return sum(1 for entry in self.game_state["player"]["inventory"] if resolve_item(entry).get("type") == "key")
+
+    def answer(self, prompt):
+        """
+        Chooses a reply to the prompt at the end of the game output.
+        """
+        self.answers += 1
+        if self.answers > MAX_ANSWERS_PER_COMMAND:
+            raise BotStuck(prompt[-80:])
+        player = self.game_state["player"]
+        if "Choose your action (roll" in prompt:
+            self.in_combat = True
+            healing = self.healing_items()
+            if player["hp"] < player["max_hp"] * 0.35 and healing:
+                return f"use {healing[0]}"
+            if player["hp"] < player["max_hp"] * 0.25 and not self.desperate:
+                self.avoided.add(player["location"])
+                return "quit"
+            return "roll"
+        if "Enter 1, 2, or 3" in prompt:
+            return "2"
+        if "(unlock, inventory, quit)" in prompt:
+            return "unlock" if self.answers == 1 else "quit"
+        if "Choose an item" in prompt:
+            return "a"
+        if "(yes/no)" in prompt:
+            return "yes"
+        if "enter the number" in prompt:
+            return "1"
+        return "0"
+
+    def active_npcs(self, location):
+        npcs = self.game_state["locations"][location].get("npcs", {})
+        return [npc for npc, data in npcs.items() if data.get("status") != "defeated"]
+
+    def pickable_items(self, location):
+        items = self.game_state["locations"][location].get("items", {})
+        if self.active_npcs(location):
+            return [item for item in items if item not in RESTRICTED_ITEMS]
+        return list(items)
+
+    def wants(self, location):
+        """
+        Returns True if there is still something to do at a location.
+        """
+        if location not in self.visited or self.pickable_items(location):
+            return True
+        return bool(self.active_npcs(location)) and location not in self.avoided
+
+    def next_direction(self):
+        """
+        Returns the first step on the shortest path to the nearest location worth visiting.
+        Locked paths count as open while the agent holds a key.
+        """
+        locations = self.game_state["locations"]
+        start = self.game_state["player"]["location"]
+        has_key = self.key_count() > 0
+        first_steps = {start: None}
+        queue = deque([start])
+        while queue:
+            location = queue.popleft()
+            if location != start and self.wants(location):
+                return first_steps[location]
+            location_data = locations[location]
+            locked = location_data.get("locked_paths", {})
+            for direction, neighbour in location_data["connections"].items():
+                if neighbour in first_steps or (locked.get(direction) and not has_key):
+                    continue
+                first_steps[neighbour] = first_steps[location] or direction
+                queue.append(neighbour)
+        return None
+
+    def choose_command(self):
+        player = self.game_state["player"]
+        location = player["location"]
+        self.visited.add(location)
+        healing = self.healing_items()
+        if player["hp"] < player["max_hp"] * 0.5 and healing:
+            self.avoided.clear()
+            self.desperate = False
+            return ["use", healing[0]]
+        if player["hp"] <= 5 and not healing:
+            return None
+        npcs = self.active_npcs(location)
+        if npcs and location not in self.avoided:
+            self.opponent = npcs[0]
+            return ["fight"]
+        if self.pickable_items(location):
+            return ["pick"]
+        direction = self.next_direction()
+        if direction is None and self.avoided:
+            self.avoided.clear()
+            self.desperate = True
+            return self.choose_command()
+        return ["move", direction] if direction else None
+
+    def quests_completed(self):
+        return all(quest.get("completed", False) for quest in self.game_state["quests"].values())
+
+    def play(self, world, max_turns):
+        """
+        Plays a fresh copy of the world and returns the outcome of the run.
+        """
+        from world_template import layer_game_state
+
+        self.session.game_state = layer_game_state(copy.deepcopy(world))
+        result = {"outcome": "timeout", "cause": None, "killer": None, "turns": 0, "keys_collected": 0, "keys_consumed": 0}
+        keys = self.key_count()
+        result["keys_collected"] = keys
+        while result["turns"] < max_turns:
+            if self.quests_completed():
+                result["outcome"] = "completed"
+                break
+            command = self.choose_command()
+            if command is None:
+                result["outcome"] = "stalled"
+                break
+            result["turns"] += 1
+            self.answers = 0
+            self.in_combat = False
+            try:
+                self.main.handle_command(command)
+            except SystemExit:
+                result["outcome"] = "died"
+                if self.in_combat:
+                    result["cause"], result["killer"] = "npc", self.opponent
+                else:
+                    location = self.game_state["player"]["location"]
+                    traps = self.game_state["locations"][location].get("traps", {})
+                    trap = next((name for name, data in traps.items() if not data.get("triggered", False)), location)
+                    result["cause"], result["killer"] = "trap", trap
+                break
+            except BotStuck:
+                result["outcome"] = "stalled"
+                break
+            after = self.key_count()
+            if after < keys and command[0] == "move":
+                result["keys_consumed"] += keys - after
+            elif after > keys:
+                result["keys_collected"] += after - keys
+            keys = after
+        result["level"] = self.game_state["player"]["level"]
+        return result
+
+def _init_worker(world, base_dir):
+    """
+    Prepares a worker process: its own directory for saves and world chunks, and the engine.
+    """
+    from game_session import install_session_streams
+
+    os.chdir(tempfile.mkdtemp(prefix="worker_", dir=base_dir))
+    _worker["main"] = import_engine()
+    _worker["world"] = world
+    install_session_streams()
+
+def play_once(seed, max_turns):
+    """
+    Runs one randomized playthrough in a worker process.
+    """
+    from game_session import run_in_session
+
+    random.seed(seed)
+    agent = AutoplayAgent(_worker["main"], "autoplay.json", seed)
+    result = run_in_session(agent.session, agent.play, _worker["world"], max_turns)
+    result["seed"] = seed
+    return result
+
+def distribution(samples):
+    """
+    Returns summary statistics for a list of numbers.
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {
+        "min": ordered[0], "p10": at(0.1), "p50": at(0.5), "p90": at(0.9), "max": ordered[-1],
+        "mean": round(statistics.mean(ordered), 2),
+    }
+
+def summarize_runs(results):
+    """
+    Builds the evaluation report from individual playthrough results.
+    """
+    outcomes = Counter(result["outcome"] for result in results)
+    completed = [result for result in results if result["outcome"] == "completed"]
+    deaths = [result for result in results if result["outcome"] == "died"]
+    return {
+        "playthroughs": len(results),
+        "completion_rate": round(len(completed) / len(results), 4) if results else 0.0,
+        "outcomes": dict(outcomes),
+        "deaths": dict(Counter(result["cause"] for result in deaths)),
+        "deadliest": [
+            {"cause": cause, "name": name, "deaths": count}
+            for (cause, name), count in Counter((result["cause"], result["killer"]) for result in deaths).most_common(10)
+        ],
+        "turns": distribution([result["turns"] for result in results]),
+        "turns_to_complete": distribution([result["turns"] for result in completed]),
+        "keys_collected": distribution([result["keys_collected"] for result in results]),
+        "keys_consumed": distribution([result["keys_consumed"] for result in results]),
+        "final_level": distribution([result["level"] for result in results]),
+    }
+
+def load_world(path):
+    if path:
+        with open(path, "r") as file:
+            return json.load(file)
+    main = import_engine()
+    return main.initialize_game_state()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Play a generated world many times with an automatic player and report how it goes.")
+    parser.add_argument("--world", help="JSON file with a full game state. Without it a world is generated the way a new game would be.")
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-turns", type=int, default=DEFAULT_MAX_TURNS)
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first playthrough; later runs count up from it.")
+    parser.add_argument("--save-world", help="Write the evaluated world to this file, so it can be evaluated again or handed to players.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    output_path = os.path.abspath(args.output) if args.output else None
+    world_path = os.path.abspath(args.world) if args.world else None
+    save_world_path = os.path.abspath(args.save_world) if args.save_world else None
+    working_dir = tempfile.mkdtemp(prefix="dm_autoplay_")
+    original_dir = os.getcwd()
+    os.chdir(working_dir)
+    try:
+        world = load_world(world_path)
+        if world is None:
+            print("Error: Failed to generate a world.", file=sys.stderr)
+            return 1
+        if world.get("expansion"):
+            print("Error: Expanding worlds are generated during play and cannot be evaluated ahead of time.", file=sys.stderr)
+            return 1
+        if save_world_path:
+            with open(save_world_path, "w") as file:
+                json.dump(world, file, indent=4)
+        start = time.perf_counter()
+        seeds = range(args.seed, args.seed + args.runs)
+        chunksize = max(1, args.runs // (args.workers * 4))
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(world, working_dir)) as executor:
+            results = list(executor.map(play_once, seeds, [args.max_turns] * args.runs, chunksize=chunksize))
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(original_dir)
+
+    report = summarize_runs(results)
+    report["workers"] = args.workers
+    report["seconds"] = round(elapsed, 2)
+    report_text = json.dumps(report, indent=4)
+    print(report_text)
+    if output_path:
+        with open(output_path, "w") as file:
+            file.write(report_text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
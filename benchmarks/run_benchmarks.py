@@ -0,0 +1,171 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASELINE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+PRESETS = {
+    "small": {"locations": 50, "npcs_per_location": 2, "items_per_location": 3, "inventory_size": 10, "history_depth": 5, "visited_locations": 10},
+    "medium": {"locations": 500, "npcs_per_location": 3, "items_per_location": 4, "inventory_size": 50, "history_depth": 20, "visited_locations": 50},
+    "large": {"locations": 2000, "npcs_per_location": 3, "items_per_location": 5, "inventory_size": 200, "history_depth": 50, "visited_locations": 200},
+}
+
+def import_engine():
+    """
+    Imports the game engine with the AI layer pointed at the offline provider.
+    """
+    os.environ.setdefault("AI_PROVIDER", "offline")
+    os.environ.setdefault("OFFLINE_LATENCY", "0")
+    os.environ.setdefault("OFFLINE_JITTER", "0")
+    import main
+
+    return main
+
+def time_call(function, repeat):
+    """
+    Runs a function repeatedly with output suppressed and returns its timings in milliseconds.
+    """
+    timings = []
+    sink = io.StringIO()
+    for _ in range(repeat):
+        sink.seek(0)
+        sink.truncate()
+        with contextlib.redirect_stdout(sink):
+            start = time.perf_counter()
+            function()
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def run_suite(size, repeat, include_map=True):
+    """
+    Times the engine hot paths against a synthetic world and returns a results document.
+    """
+    from benchmarks.synthetic_world import generate_synthetic_game_state
+    from game_session import GameSession, activate_session
+    from state_manager import load_game_state, save_game_state
+    from world_template import layer_game_state
+
+    main = import_engine()
+    world_size = {key: value for key, value in size.items() if key != "visited_locations"}
+    state = layer_game_state(generate_synthetic_game_state(**world_size))
+    for name in list(state["locations"])[:size["visited_locations"]]:
+        state["locations"].section_for_update(name, "npcs")
+    session = GameSession("benchmark", save_file="benchmark_state.json", use_voice=False)
+    session.game_state = state
+    activate_session(session)
+    save_game_state(state, session.save_file)
+
+    cases = {
+        "save_game_state": lambda: save_game_state(session.game_state, session.save_file),
+        "load_game_state": lambda: load_game_state(session.save_file),
+        "check_quest_completion": main.check_quest_completion,
+        "display_goal": main.display_goal,
+        "describe_location": main.describe_location,
+        "display_inventory": main.display_inventory,
+    }
+    if include_map:
+        cases["build_map"] = lambda: main.build_map(session.game_state)
+
+    results = {}
+    for name, function in cases.items():
+        timings = time_call(function, 1 if name == "build_map" else repeat)
+        results[name] = {
+            "runs": len(timings),
+            "median_ms": statistics.median(timings),
+            "min_ms": min(timings),
+            "max_ms": max(timings),
+        }
+    return {
+        "size": size,
+        "save_bytes": os.path.getsize(session.save_file),
+        "results": results,
+    }
+
+def compare_to_baseline(report, baseline, tolerance):
+    """
+    Returns a list of regressions where a median exceeds the baseline by more than the tolerance.
+    """
+    regressions = []
+    for name, result in report["results"].items():
+        expected = baseline.get("results", {}).get(name)
+        if expected is None:
+            continue
+        limit = expected["median_ms"] * (1 + tolerance)
+        if result["median_ms"] > limit and result["median_ms"] - expected["median_ms"] > 1.0:
+            regressions.append((name, expected["median_ms"], result["median_ms"]))
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the game engine hot paths on synthetic worlds.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    parser.add_argument("--locations", type=int)
+    parser.add_argument("--npcs-per-location", type=int)
+    parser.add_argument("--items-per-location", type=int)
+    parser.add_argument("--inventory-size", type=int)
+    parser.add_argument("--history-depth", type=int)
+    parser.add_argument("--visited-locations", type=int, help="Locations whose NPC state (and conversations) live in the player's save.")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--skip-map", action="store_true", help="Skip the networkx map build.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    parser.add_argument("--baseline", help="Baseline file (default: baselines/<preset>.json).")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline.")
+    parser.add_argument("--allow-missing-baseline", action="store_true",
+                        help="Exit 0 when there is no baseline recorded for this world size.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown over baseline (0.5 = 50%%).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    size = dict(PRESETS[args.preset])
+    for key in size:
+        override = getattr(args, key)
+        if override is not None:
+            size[key] = override
+
+    baseline_path = os.path.abspath(args.baseline or os.path.join(BASELINE_FOLDER, f"{args.preset}.json"))
+    output_path = os.path.abspath(args.output) if args.output else None
+    working_dir = tempfile.mkdtemp(prefix="dm_bench_")
+    original_dir = os.getcwd()
+    os.chdir(working_dir)
+    try:
+        report = run_suite(size, args.repeat, include_map=not args.skip_map)
+    finally:
+        os.chdir(original_dir)
+
+    report_text = json.dumps(report, indent=4)
+    print(report_text)
+    if output_path:
+        with open(output_path, "w") as file:
+            file.write(report_text)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as file:
+            file.write(report_text)
+        print(f"Baseline saved to {baseline_path}.", file=sys.stderr)
+        return 0
+
+    missing_status = 0 if args.allow_missing_baseline else 2
+    if not os.path.exists(baseline_path):
+        print(f"No baseline found at {baseline_path}. Run with --save-baseline to record one.", file=sys.stderr)
+        return missing_status
+
+    with open(baseline_path, "r") as file:
+        baseline = json.load(file)
+    if baseline.get("size") != report["size"]:
+        print("Baseline was recorded with a different world size; nothing to compare against.", file=sys.stderr)
+        return missing_status
+
+    regressions = compare_to_baseline(report, baseline, args.tolerance)
+    for name, expected, actual in regressions:
+        print(f"REGRESSION: {name} median {actual:.2f} ms vs baseline {expected:.2f} ms", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
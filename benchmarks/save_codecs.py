@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.run_benchmarks import PRESETS
+
+def synthetic_documents(preset):
+    """
+    Returns save documents built from a synthetic world: the per-player overlay save
+    written today and a full-world save as written before world templates existed.
+    """
+    from benchmarks.synthetic_world import generate_synthetic_game_state
+    from world_template import layer_game_state, to_save_document
+
+    size = PRESETS[preset]
+    world_size = {key: value for key, value in size.items() if key != "visited_locations"}
+    full_state = generate_synthetic_game_state(**world_size)
+    full_document = json.loads(json.dumps(full_state))
+    state = layer_game_state(full_state)
+    for name in list(state["locations"])[:size["visited_locations"]]:
+        state["locations"].section_for_update(name, "npcs")
+        state["locations"].section_for_update(name, "items")
+    return {f"synthetic-{preset}": to_save_document(state), f"synthetic-{preset}-full": full_document}
+
+def real_documents(paths):
+    """
+    Reads existing save files in whatever codec they were written with.
+    """
+    from state_manager import decode_document
+
+    documents = {}
+    for path in paths:
+        with open(path, "rb") as file:
+            documents[os.path.basename(path)] = decode_document(file.read())
+    return documents
+
+def time_codec(document, codec, repeat):
+    """
+    Returns the encoded size and median save and load times in milliseconds for one codec,
+    counting the file write and read.
+    """
+    from state_manager import decode_document, encode_document
+
+    file_path = f"codec_{codec}.sav"
+    save_times = []
+    load_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = encode_document(document, codec)
+        with open(file_path, "wb") as file:
+            file.write(data)
+        save_times.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        with open(file_path, "rb") as file:
+            decoded = decode_document(file.read())
+        load_times.append((time.perf_counter() - start) * 1000)
+    if json.dumps(decoded, sort_keys=True) != json.dumps(document, sort_keys=True):
+        raise ValueError(f"Codec '{codec}' did not round-trip the save.")
+    return {
+        "bytes": len(data),
+        "save_ms": round(statistics.median(save_times), 3),
+        "load_ms": round(statistics.median(load_times), 3),
+    }
+
+def run_suite(documents, repeat):
+    from state_manager import CODECS
+
+    report = {}
+    for name, document in documents.items():
+        results = {codec: time_codec(document, codec, repeat) for codec in CODECS}
+        baseline = results["pretty"]["bytes"]
+        for result in results.values():
+            result["ratio"] = round(result["bytes"] / baseline, 3)
+        report[name] = results
+    return report
+
+def print_table(report):
+    for name, results in report.items():
+        print(f"\n=== {name} ===", file=sys.stderr)
+        print(f"{'Codec':<10}{'Bytes':>12}{'Ratio':>8}{'Save ms':>10}{'Load ms':>10}", file=sys.stderr)
+        for codec, result in results.items():
+            print(f"{codec:<10}{result['bytes']:>12}{result['ratio']:>8.3f}{result['save_ms']:>10.2f}{result['load_ms']:>10.2f}", file=sys.stderr)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare save codecs by size and save/load time.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), action="append", help="Synthetic world sizes to test (repeatable).")
+    parser.add_argument("--save", action="append", default=[], help="Existing save file to test (repeatable).")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    save_paths = [os.path.abspath(path) for path in args.save]
+    output_path = os.path.abspath(args.output) if args.output else None
+    presets = args.preset or (["small", "medium"] if not save_paths else [])
+    working_dir = tempfile.mkdtemp(prefix="dm_codecs_")
+    original_dir = os.getcwd()
+    os.chdir(working_dir)
+    try:
+        documents = real_documents(save_paths)
+        for preset in presets:
+            documents.update(synthetic_documents(preset))
+        report = run_suite(documents, args.repeat)
+    finally:
+        os.chdir(original_dir)
+
+    print_table(report)
+    report_text = json.dumps(report, indent=4)
+    print(report_text)
+    if output_path:
+        with open(output_path, "w") as file:
+            file.write(report_text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
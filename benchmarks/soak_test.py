@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+from benchmarks.run_benchmarks import import_engine
+from item_catalog import item_id, resolve_item
+
+COMMAND_WEIGHTS = {"move": 5, "look": 3, "pick": 2, "fight": 2, "talk": 1, "use": 2}
+TALK_LINES = ["Hello there.", "What do you know about this place?", "Have you seen the Shadow Lord?"]
+MAX_ANSWERS_PER_COMMAND = 200
+TAIL_CHARS = 300
+
+class BotStuck(Exception):
+    """
+    Raised when a bot keeps answering prompts without its command finishing.
+    """
+
+class BotOutput:
+    """
+    Discards game output but keeps its tail, so the bot can see which prompt is waiting.
+    """
+
+    def __init__(self):
+        self.tail = ""
+        self.characters = 0
+
+    def write(self, data):
+        self.tail = (self.tail + data)[-TAIL_CHARS:]
+        self.characters += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+class BotInput:
+    """
+    Feeds the bot's answer to whatever prompt the game just printed.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def readline(self, *args):
+        return self.bot.answer(self.bot.output.tail) + "\n"
+
+class LatencyRecorder:
+    """
+    Collects command latencies from every bot, for the whole run and for the current sampling window.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = defaultdict(list)
+        self.window = []
+        self.commands = 0
+
+    def record(self, command, seconds):
+        with self.lock:
+            self.totals[command].append(seconds)
+            self.window.append(seconds)
+            self.commands += 1
+
+    def take_window(self):
+        with self.lock:
+            window, self.window = self.window, []
+            return window, self.commands
+
+class Bot:
+    """
+    A randomized player that drives the real command handlers through its own session.
+    """
+
+    def __init__(self, index, main, recorder, seed, working_dir):
+        from game_session import GameSession
+
+        self.index = index
+        self.main = main
+        self.recorder = recorder
+        self.rng = random.Random(seed)
+        self.output = BotOutput()
+        self.session = GameSession(
+            f"bot-{index}",
+            save_file=os.path.join(working_dir, f"bot_{index}.json"),
+            use_voice=False,
+            stdin=BotInput(self),
+            stdout=self.output,
+        )
+        self.answers = 0
+        self.talk_turns = 0
+        self.in_combat = False
+        self.games = 0
+        self.deaths = Counter()
+        self.completions = 0
+        self.stuck = 0
+        self.unexpected_prompts = 0
+
+    def new_game(self):
+        from world_template import layer_game_state
+
+        self.session.game_state = layer_game_state(self.main.initialize_game_state())
+        self.session.save()
+        self.games += 1
+
+    def answer(self, prompt):
+        """
+        Chooses a reply to the prompt at the end of the game output.
+        """
+        self.answers += 1
+        if self.answers > MAX_ANSWERS_PER_COMMAND:
+            raise BotStuck(prompt[-80:])
+        player = self.session.game_state["player"]
+        if "Choose your action (roll" in prompt:
+            self.in_combat = True
+            healing = [item_id(entry) for entry in player["inventory"] if resolve_item(entry).get("type") == "healing"]
+            if player["hp"] < player["max_hp"] * 0.4 and healing:
+                return f"use {healing[0]}"
+            if player["hp"] < player["max_hp"] * 0.2 and self.rng.random() < 0.5:
+                return "quit"
+            return "roll"
+        self.in_combat = False
+        if "Enter 1, 2, or 3" in prompt:
+            return self.rng.choice(["1", "2", "2", "3"])
+        if "(unlock, inventory, quit)" in prompt:
+            return "unlock" if self.answers == 1 else "quit"
+        if "Choose an item" in prompt:
+            return "a"
+        if "You: " in prompt:
+            self.talk_turns += 1
+            return self.rng.choice(TALK_LINES) if self.talk_turns < 3 else "stop"
+        if "(yes/no)" in prompt:
+            return "yes"
+        if "enter the number" in prompt:
+            return "1"
+        self.unexpected_prompts += 1
+        return "0"
+
+    def choose_command(self):
+        """
+        Picks the next command, weighted by COMMAND_WEIGHTS and shaped by what is at hand.
+        """
+        game_state = self.session.game_state
+        player = game_state["player"]
+        quests = game_state.get("quests", {})
+        if quests and all(quest.get("completed", False) for quest in quests.values()):
+            return None
+        location = game_state["locations"][player["location"]]
+        action = self.rng.choices(list(COMMAND_WEIGHTS), weights=list(COMMAND_WEIGHTS.values()))[0]
+        if action == "move":
+            return ["move", self.rng.choice(list(location["connections"]))]
+        if action == "use":
+            if not player["inventory"]:
+                return ["look"]
+            return ["use", item_id(self.rng.choice(player["inventory"]))]
+        return [action]
+
+    def run_command(self, command):
+        self.answers = 0
+        self.talk_turns = 0
+        start = time.perf_counter()
+        try:
+            with self.main.command_trace(command[0]):
+                self.main.handle_command(command)
+        finally:
+            self.recorder.record(command[0], time.perf_counter() - start)
+
+    def run(self, deadline, max_commands):
+        """
+        Plays until the deadline or the command budget runs out, starting over after each death or win.
+        """
+        self.new_game()
+        issued = 0
+        while time.monotonic() < deadline and (max_commands is None or issued < max_commands):
+            command = self.choose_command()
+            if command is None:
+                self.completions += 1
+                self.new_game()
+                continue
+            issued += 1
+            try:
+                self.run_command(command)
+            except SystemExit:
+                self.deaths["npc" if self.in_combat else "trap"] += 1
+                self.new_game()
+            except BotStuck:
+                self.stuck += 1
+            self.in_combat = False
+            self.session.drain_notifications()
+        return issued
+
+def current_rss_kib():
+    """
+    Returns the resident set size of this process in KiB, or the peak RSS where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/status", "r") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def save_file_sizes(bots):
+    sizes = [os.path.getsize(bot.session.save_file) for bot in bots if os.path.exists(bot.session.save_file)]
+    if not sizes:
+        return {"max": 0, "mean": 0}
+    return {"max": max(sizes), "mean": sum(sizes) // len(sizes)}
+
+def take_sample(started, interval, recorder, bots, top_allocators):
+    """
+    Returns one point of the timeline: throughput and latency since the last sample, memory and save sizes.
+    """
+    from instrumentation import percentile
+
+    window, commands = recorder.take_window()
+    sample = {
+        "elapsed": round(time.monotonic() - started, 2),
+        "commands": commands,
+        "throughput": round(len(window) / interval, 2),
+        "p50_ms": round(percentile(window, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(window, 0.95) * 1000, 3),
+        "rss_kib": current_rss_kib(),
+        "save_bytes": save_file_sizes(bots),
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        sample["traced_kib"] = current // 1024
+        sample["top_allocators"] = [
+            f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size // 1024} KiB in {stat.count} blocks"
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:top_allocators]
+        ]
+    return sample
+
+def run_soak(bots_count, duration, max_commands, interval, seed, top_allocators, trace_memory):
+    """
+    Runs the bots concurrently and returns a report with the sampled timeline and a summary.
+    """
+    from game_session import install_session_streams, run_in_session
+    from instrumentation import percentile
+
+    main = import_engine()
+    install_session_streams()
+    random.seed(seed)
+    if trace_memory:
+        tracemalloc.start()
+
+    recorder = LatencyRecorder()
+    working_dir = os.getcwd()
+    bots = [Bot(index, main, recorder, seed + index, working_dir) for index in range(bots_count)]
+    started = time.monotonic()
+    deadline = started + duration
+    rss_start = current_rss_kib()
+    issued = [0] * bots_count
+
+    def play(bot):
+        issued[bot.index] = run_in_session(bot.session, bot.run, deadline, max_commands)
+
+    threads = [threading.Thread(target=play, args=(bot,), daemon=True) for bot in bots]
+    for thread in threads:
+        thread.start()
+
+    samples = []
+    last_sample = started
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=max(0.0, last_sample + interval - time.monotonic()))
+        now = time.monotonic()
+        if now - last_sample >= interval or not any(thread.is_alive() for thread in threads):
+            samples.append(take_sample(started, max(now - last_sample, 1e-6), recorder, bots, top_allocators))
+            last_sample = now
+
+    elapsed = time.monotonic() - started
+    latencies = {
+        command: {
+            "count": len(timings),
+            "p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+            "max_ms": round(max(timings) * 1000, 3),
+        }
+        for command, timings in sorted(recorder.totals.items())
+    }
+    deaths = Counter()
+    for bot in bots:
+        deaths.update(bot.deaths)
+    rss_end = current_rss_kib()
+    if trace_memory:
+        tracemalloc.stop()
+    return {
+        "bots": bots_count,
+        "seconds": round(elapsed, 2),
+        "commands": sum(issued),
+        "throughput": round(sum(issued) / elapsed, 2) if elapsed else 0.0,
+        "latency": latencies,
+        "games": sum(bot.games for bot in bots),
+        "completions": sum(bot.completions for bot in bots),
+        "deaths": dict(deaths),
+        "stuck_commands": sum(bot.stuck for bot in bots),
+        "unexpected_prompts": sum(bot.unexpected_prompts for bot in bots),
+        "rss_kib": {"start": rss_start, "end": rss_end, "growth": rss_end - rss_start},
+        "save_bytes": save_file_sizes(bots),
+        "samples": samples,
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run headless bot players against the engine and watch latency, memory and save growth.")
+    parser.add_argument("--bots", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run for.")
+    parser.add_argument("--commands", type=int, help="Stop each bot after this many commands.")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between timeline samples.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top-allocators", type=int, default=5)
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip allocation tracing, which slows the engine down.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    output_path = os.path.abspath(args.output) if args.output else None
+    working_dir = tempfile.mkdtemp(prefix="dm_soak_")
+    original_dir = os.getcwd()
+    os.chdir(working_dir)
+    try:
+        report = run_soak(
+            args.bots, args.duration, args.commands, args.interval, args.seed,
+            args.top_allocators, not args.no_tracemalloc,
+        )
+    finally:
+        os.chdir(original_dir)
+
+    report_text = json.dumps(report, indent=4)
+    print(report_text)
+    if output_path:
+        with open(output_path, "w") as file:
+            file.write(report_text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
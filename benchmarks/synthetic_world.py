@@ -0,0 +1,110 @@
+import copy
+import random
+
+DIRECTIONS = {"north": (0, -1), "south": (0, 1), "east": (1, 0), "west": (-1, 0)}
+
+ITEM_TEMPLATES = [
+    {"name": "healing_potion", "type": "healing", "healing_amount": 25, "description": "A potion that restores 25 HP."},
+    {"name": "silver_key", "type": "key", "description": "A shiny silver key with intricate engravings."},
+    {"name": "torch", "type": "tool", "description": "A torch that helps find hidden items."},
+    {"name": "dagger", "type": "weapon", "attack_boost": 10, "description": "A small but sharp dagger."},
+]
+
+QUESTS = {
+    "retrieve_ancient_artifact": {
+        "description": "Retrieve the Ancient Artifact protected by the Shadow Lord in the Cursed Castle.",
+        "completed": False,
+        "required_items": ["ancient_artifact"],
+        "required_npcs": [],
+    },
+    "find_mystic_gem": {
+        "description": "Locate the Mystic Gem concealed in the Crystal Caves.",
+        "completed": False,
+        "required_items": ["mystic_gem"],
+        "required_npcs": [],
+    },
+    "vanquish_final_boss": {
+        "description": "Slay the Shadow Lord in the Cursed Castle.",
+        "completed": False,
+        "required_items": [],
+        "required_npcs": ["final_boss"],
+    },
+}
+
+def location_name(index):
+    return "starting_location" if index == 0 else f"location_{index}"
+
+def make_item(rng, index):
+    template = rng.choice(ITEM_TEMPLATES)
+    return f"{template['name']}_{index}", {key: value for key, value in template.items() if key != "name"}
+
+def make_npc(rng, history_depth):
+    hp = rng.randint(30, 90)
+    return {
+        "hp": hp,
+        "max_hp": hp,
+        "attack": rng.randint(3, 12),
+        "status": "active",
+        "conversation_history": [
+            {"player": f"Tell me about the road ahead ({turn}).", "npc": "The road is long and the shadows are longer still."}
+            for turn in range(history_depth)
+        ],
+    }
+
+def generate_synthetic_game_state(locations=100, npcs_per_location=2, items_per_location=3,
+                                  inventory_size=10, history_depth=5, seed=0):
+    """
+    Builds a schema-valid game state of the requested size for benchmarking.
+    Locations are laid out on a grid and connected to their neighbours.
+    """
+    rng = random.Random(seed)
+    width = max(1, int(locations ** 0.5))
+    world = {}
+
+    for index in range(locations):
+        x, y = index % width, index // width
+        connections = {}
+        for direction, (dx, dy) in DIRECTIONS.items():
+            nx_, ny_ = x + dx, y + dy
+            neighbour = ny_ * width + nx_
+            if 0 <= nx_ < width and ny_ >= 0 and neighbour < locations:
+                connections[direction] = location_name(neighbour)
+
+        world[location_name(index)] = {
+            "description": f"Synthetic location {index}, a windswept stretch of ruins and old stone.",
+            "generated_description": "Cold wind threads through broken arches while distant bells toll. " * 3,
+            "npcs": {f"npc_{index}_{n}": make_npc(rng, history_depth) for n in range(npcs_per_location)},
+            "items": dict(make_item(rng, f"{index}_{n}") for n in range(items_per_location)),
+            "connections": connections,
+            "locked_paths": {direction: rng.random() < 0.1 for direction in connections},
+            "hidden_items": {},
+            "traps": {},
+        }
+
+    boss_location = world[location_name(locations - 1)]
+    boss_location["npcs"]["final_boss"] = {"hp": 200, "max_hp": 200, "attack": 20, "status": "active"}
+    boss_location["items"]["ancient_artifact"] = {"type": "scroll", "description": "An artifact humming with power."}
+    world[location_name(locations // 2)]["items"]["mystic_gem"] = {
+        "type": "healing", "healing_amount": 999, "description": "A gem that restores all HP.",
+    }
+
+    inventory = []
+    for index in range(inventory_size):
+        name, item = make_item(rng, f"inv_{index}")
+        inventory.append({"name": name, **item})
+
+    return {
+        "player": {
+            "location": "starting_location",
+            "location_history": [],
+            "hp": 120,
+            "max_hp": 120,
+            "attack": 10,
+            "xp": 0,
+            "level": 1,
+            "xp_to_next_level": 75,
+            "inventory": inventory,
+        },
+        "quests": copy.deepcopy(QUESTS),
+        "locations": world,
+    }
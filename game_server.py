@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import os
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
+from game_session import GameSession, current_session, install_session_streams, run_in_session
+import main
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 4000
+DEFAULT_MAX_SESSIONS = 32
+DEFAULT_IDLE_TIMEOUT = 600
+DEFAULT_SAVE_FOLDER = "saves"
+
+class LineInput:
+    """
+    Blocking line source fed by the server's socket reader.
+    An empty string marks end of input, which makes input() raise EOFError.
+    """
+
+    def __init__(self):
+        self.lines = queue.Queue()
+
+    def feed(self, line):
+        self.lines.put(line)
+
+    def close(self):
+        self.lines.put("")
+
+    def readline(self, *args):
+        return self.lines.get()
+
+class SocketOutput:
+    """
+    Writes text from a game thread to the player's socket on the event loop.
+    """
+
+    def __init__(self, loop, writer):
+        self.loop = loop
+        self.writer = writer
+
+    def write(self, data):
+        if not self.writer.is_closing():
+            self.loop.call_soon_threadsafe(self._write, data)
+        return len(data)
+
+    def _write(self, data):
+        if not self.writer.is_closing():
+            self.writer.write(data.encode("utf-8"))
+
+    def flush(self):
+        pass
+
+def sanitize_player_name(name):
+    """
+    Turns a player-supplied name into a safe save-file identifier.
+    """
+    return re.sub(r"[^a-z0-9_]", "", name.strip().lower().replace(" ", "_"))[:32]
+
+def play_session():
+    """
+    Runs the game for the session bound to the current context until the player leaves.
+    """
+    try:
+        main.load_or_initialize_game()
+        main.game_loop()
+    except (SystemExit, EOFError):
+        pass
+    finally:
+        current_session().save()
+
+class GameServer:
+    """
+    Line-protocol TCP server that hosts one independent game session per connection.
+    Each session runs its blocking game loop on a worker thread, so one player's
+    AI calls, saves and speech never hold up another player.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_sessions=DEFAULT_MAX_SESSIONS,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, save_folder=DEFAULT_SAVE_FOLDER):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.save_folder = save_folder
+        self.sessions = {}
+        self.reserved = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix="session")
+
+    async def handle_client(self, reader, writer):
+        """
+        Turns a connection away if the server is full, otherwise plays it to the end.
+        The slot is reserved before the name prompt, so clients still choosing a name
+        count towards max_sessions.
+        """
+        if self.reserved >= self.max_sessions:
+            writer.write(b"The server is full. Please try again later.\n")
+            await writer.drain()
+            writer.close()
+            return
+
+        self.reserved += 1
+        try:
+            await self.run_client(reader, writer)
+        finally:
+            self.reserved -= 1
+
+    async def run_client(self, reader, writer):
+        """
+        Greets a new connection, binds it to a session and runs the game until it ends.
+        """
+        writer.write(b"Enter your adventurer name: ")
+        await writer.drain()
+        try:
+            raw_name = await asyncio.wait_for(reader.readline(), timeout=self.idle_timeout)
+        except asyncio.TimeoutError:
+            writer.close()
+            return
+        player_name = sanitize_player_name(raw_name.decode("utf-8", errors="ignore"))
+
+        if not player_name:
+            writer.write(b"Invalid name.\n")
+            writer.close()
+            return
+        if player_name in self.sessions:
+            writer.write(b"That adventurer is already playing.\n")
+            writer.close()
+            return
+
+        loop = asyncio.get_running_loop()
+        session = GameSession(
+            player_name,
+            save_file=os.path.join(self.save_folder, f"{player_name}.json"),
+            use_voice=False,
+            stdin=LineInput(),
+            stdout=SocketOutput(loop, writer),
+        )
+        session.tasks.loop = loop
+        self.sessions[player_name] = (session, writer)
+        print(f"Session started: {player_name} ({len(self.sessions)}/{self.max_sessions})")
+
+        pump = asyncio.create_task(self.pump_input(reader, session))
+        try:
+            await loop.run_in_executor(self.executor, run_in_session, session, play_session)
+        finally:
+            pump.cancel()
+            session.tasks.cancel_all()
+            del self.sessions[player_name]
+            if not writer.is_closing():
+                await writer.drain()
+                writer.close()
+            print(f"Session ended: {player_name} ({len(self.sessions)}/{self.max_sessions})")
+
+    async def pump_input(self, reader, session):
+        """
+        Forwards lines from the socket into the session's input queue.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                session.touch()
+                session.stdin.feed(line.decode("utf-8", errors="ignore").replace("\r", ""))
+        finally:
+            session.stdin.close()
+
+    async def evict_idle_sessions(self):
+        """
+        Periodically disconnects players who have been inactive for too long.
+        Their progress is saved when the session thread unwinds.
+        """
+        while True:
+            await asyncio.sleep(min(30, self.idle_timeout))
+            for player_name, (session, writer) in list(self.sessions.items()):
+                if session.idle_seconds() > self.idle_timeout:
+                    print(f"Evicting idle session: {player_name}")
+                    writer.write(b"\nDisconnected due to inactivity. Your progress has been saved.\n")
+                    session.stdin.close()
+                    writer.close()
+
+    async def serve(self):
+        """
+        Starts listening and serves players until cancelled.
+        """
+        if not os.path.exists(self.save_folder):
+            os.makedirs(self.save_folder)
+        install_session_streams()
+
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        print(f"Game server listening on {self.host}:{self.port} (max {self.max_sessions} sessions)")
+        eviction = asyncio.create_task(self.evict_idle_sessions())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            eviction.cancel()
+            for session, writer in self.sessions.values():
+                session.stdin.close()
+            self.executor.shutdown(wait=True)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Host AI Dungeon Master games for many players over TCP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS)
+    parser.add_argument("--idle-timeout", type=int, default=DEFAULT_IDLE_TIMEOUT, help="Seconds before an idle player is disconnected.")
+    parser.add_argument("--save-folder", default=DEFAULT_SAVE_FOLDER)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        asyncio.run(GameServer(args.host, args.port, args.max_sessions, args.idle_timeout, args.save_folder).serve())
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
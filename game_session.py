@@ -0,0 +1,152 @@
+import contextvars
+import sys
+import threading
+import time
+from collections import deque
+from state_manager import load_game_state, save_game_state
+from task_registry import TaskRegistry
+from state_history import StateHistory
+
+_current_session = contextvars.ContextVar("current_session", default=None)
+
+class GameSession:
+    """
+    Holds everything that belongs to one player: the game state, where it is saved,
+    voice preferences, the streams the player reads from and writes to, NPC greetings
+    generated ahead of time, its background jobs, their messages waiting to be shown,
+    the undo history, the save slots it can switch between (local games only), and the
+    lock that keeps its spoken lines from overlapping.
+    """
+
+    def __init__(self, session_id, save_file="game_state.json", use_voice=True, stdin=None, stdout=None):
+        self.session_id = session_id
+        self.save_file = save_file
+        self.game_state = None
+        self.use_voice = use_voice
+        self.stdin = stdin
+        self.stdout = stdout
+        self.lock = threading.RLock()
+        self.speech_lock = threading.Lock()
+        self.last_active = time.monotonic()
+        self.greetings = {}
+        self.notifications = deque()
+        self.on_notify = None
+        self.tasks = TaskRegistry()
+        self.history = StateHistory()
+        self.slots = None
+        self.slot = None
+
+    def load(self):
+        """
+        Loads this session's game state from its save file.
+        """
+        self.game_state = load_game_state(self.save_file)
+        return self.game_state
+
+    def save(self, force=False):
+        """
+        Saves this session's game state to its save file and updates the slot index.
+        Autosaves refresh the index at most every few seconds; force writes it now.
+        """
+        if self.game_state is None:
+            return
+        with self.lock:
+            save_game_state(self.game_state, self.save_file)
+            if self.slots is not None and self.slot:
+                self.slots.record(self.slot, self.game_state, force=force)
+
+    def notify(self, message):
+        """
+        Queues a message from a background job; the game loop shows it before the next prompt.
+        A console that can print it sooner registers itself as on_notify.
+        """
+        self.notifications.append(message)
+        if self.on_notify is not None:
+            self.on_notify()
+
+    def drain_notifications(self):
+        """
+        Returns and clears the queued background messages.
+        """
+        messages = []
+        while self.notifications:
+            messages.append(self.notifications.popleft())
+        return messages
+
+    def touch(self):
+        """
+        Records player activity for idle-session eviction.
+        """
+        self.last_active = time.monotonic()
+
+    def idle_seconds(self):
+        """
+        Returns how long the player has been inactive.
+        """
+        return time.monotonic() - self.last_active
+
+def current_session():
+    """
+    Returns the session bound to the running context.
+    """
+    session = _current_session.get()
+    if session is None:
+        raise RuntimeError("No active game session.")
+    return session
+
+def activate_session(session):
+    """
+    Binds a session to the running context and returns a token for resetting it.
+    """
+    return _current_session.set(session)
+
+def run_in_session(session, function, *args):
+    """
+    Runs a function in a fresh context bound to the given session.
+    """
+    context = contextvars.Context()
+    return context.run(_run_bound, session, function, *args)
+
+def _run_bound(session, function, *args):
+    activate_session(session)
+    return function(*args)
+
+class SessionStream:
+    """
+    File-like object that forwards to the active session's stream,
+    or to the process stream when no session provides one.
+    """
+
+    def __init__(self, attribute, fallback):
+        self.attribute = attribute
+        self.fallback = fallback
+
+    def _target(self):
+        session = _current_session.get()
+        stream = getattr(session, self.attribute, None) if session is not None else None
+        return stream if stream is not None else self.fallback
+
+    def write(self, data):
+        return self._target().write(data)
+
+    def flush(self):
+        return self._target().flush()
+
+    def readline(self, *args):
+        line = self._target().readline(*args)
+        session = _current_session.get()
+        if session is not None:
+            session.touch()
+        return line
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+def install_session_streams():
+    """
+    Routes print() and input() through the active session's streams.
+    """
+    if not isinstance(sys.stdout, SessionStream):
+        sys.stdout = SessionStream("stdout", sys.stdout)
+    if not isinstance(sys.stdin, SessionStream):
+        sys.stdin = SessionStream("stdin", sys.stdin)
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DEFAULT_IMAGE_DIR = "generated_images"
+DEFAULT_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", str(200 * 1024 * 1024)))
+INDEX_FILE = "index.json"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (160, 160)
+
+def prompt_key(text):
+    """
+    Returns the content hash used to recognise an image prompt that was already rendered.
+    """
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:24]
+
+def make_thumbnail(file_path):
+    """
+    Writes a small PNG preview next to an image and returns its path, or None if Pillow
+    is not available or the image cannot be read.
+    """
+    if Image is None:
+        return None
+    thumbnail_path = f"{os.path.splitext(file_path)[0]}_thumb.png"
+    try:
+        with Image.open(file_path) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            image.save(thumbnail_path, "PNG")
+    except Exception:
+        return None
+    return thumbnail_path
+
+class ImageStore:
+    """
+    Generated location images on disk, indexed by the hash of the prompt that produced them
+    so identical prompts share one file and never reach DeepAI twice. The store is bounded
+    by total size with least-recently-used eviction.
+    """
+
+    def __init__(self, folder=DEFAULT_IMAGE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(folder, INDEX_FILE)
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.index = self._load_index()
+
+    def _load_index(self):
+        """
+        Loads the image index, dropping entries whose files no longer exist.
+        """
+        try:
+            with open(self.index_path, "r") as file:
+                index = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {key: entry for key, entry in index.items() if self.is_valid(entry)}
+
+    def is_valid(self, entry):
+        """
+        Checks that an image entry points at an existing file inside this store.
+        """
+        file_path = entry.get("file_path") if entry else None
+        if not file_path:
+            return False
+        folder = os.path.realpath(self.folder)
+        return os.path.realpath(file_path).startswith(folder + os.sep) and os.path.isfile(file_path)
+
+    def total_bytes(self):
+        """
+        Returns the combined size of all stored images and thumbnails.
+        """
+        return sum(entry["size"] for entry in self.index.values())
+
+    def _save_index(self):
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.index, file, indent=4)
+        os.replace(temp_path, self.index_path)
+
+    def key_lock(self, key):
+        """
+        Returns the lock that serialises work on one prompt, so concurrent requests for it are rendered once.
+        """
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def lookup(self, key):
+        """
+        Returns the stored image entry for a prompt hash, or None if it is unknown or its file is gone.
+        """
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            if not self.is_valid(entry):
+                del self.index[key]
+                return None
+            entry["last_used"] = time.time()
+            return dict(entry)
+
+    def save_stream(self, key, url, chunks, expected_size=None):
+        """
+        Writes downloaded chunks to disk while computing their SHA-256, then records the image.
+        The file only appears under its final name once the download is complete.
+        """
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        file_path = os.path.join(self.folder, f"{key}.png")
+        temp_path = f"{file_path}.part"
+        checksum = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, "wb") as file:
+                for chunk in chunks:
+                    if chunk:
+                        file.write(chunk)
+                        checksum.update(chunk)
+                        size += len(chunk)
+            if expected_size is not None and size != expected_size:
+                raise IOError(f"Image download was truncated ({size} of {expected_size} bytes).")
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        thumbnail_path = make_thumbnail(file_path)
+        if thumbnail_path:
+            size += os.path.getsize(thumbnail_path)
+        entry = {
+            "file_path": file_path,
+            "thumbnail_path": thumbnail_path,
+            "url": url,
+            "sha256": checksum.hexdigest(),
+            "size": size,
+            "last_used": time.time(),
+        }
+        with self.lock:
+            self.index[key] = entry
+            self.evict(keep=key)
+            self._save_index()
+        return dict(entry)
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used images until the store fits within its size budget.
+        The entry named by keep is never removed. Call with the lock held.
+        """
+        by_age = sorted(self.index.items(), key=lambda pair: pair[1].get("last_used", 0))
+        total = self.total_bytes()
+        for key, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for path in (entry.get("file_path"), entry.get("thumbnail_path")):
+                if path:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            total -= entry["size"]
+            del self.index[key]
+
+    def close(self):
+        """
+        Persists the recency information gathered since the last download.
+        """
+        with self.lock:
+            if self.index:
+                self._save_index()
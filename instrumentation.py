@@ -0,0 +1,189 @@
+import contextvars
+import cProfile
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+WINDOW_SIZE = 500
+REPORT_FOLDER = "perf_reports"
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_lock = threading.Lock()
+
+command_timings = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
+span_timings = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
+span_tokens = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
+
+profiling_enabled = False
+
+class Span:
+    """
+    One timed step inside a command, such as an AI call or a save.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.duration = 0.0
+        self.tokens = 0
+
+    def add_usage(self, usage):
+        """
+        Records token usage reported by an OpenAI response.
+        """
+        if usage is not None:
+            self.tokens += getattr(usage, "total_tokens", 0) or 0
+
+class Trace:
+    """
+    All spans recorded while one player command was running.
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.duration = 0.0
+        self.spans = []
+
+@contextmanager
+def span(name):
+    """
+    Times a block of work and attaches it to the running command's trace.
+    """
+    record = Span(name)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.duration = time.perf_counter() - start
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append(record)
+        with _lock:
+            span_timings[name].append(record.duration)
+            if record.tokens:
+                span_tokens[name].append(record.tokens)
+
+def record_timing(name, seconds):
+    """
+    Records a duration measured outside a span block, such as time spent queued.
+    """
+    with _lock:
+        span_timings[name].append(seconds)
+
+@contextmanager
+def command_trace(command):
+    """
+    Opens a trace for one game_loop command and records its total latency.
+    """
+    trace = Trace(command)
+    token = _current_trace.set(trace)
+    profiler = _start_profiler() if profiling_enabled else None
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.duration = time.perf_counter() - start
+        _current_trace.reset(token)
+        if profiler is not None:
+            _dump_profile(profiler, command)
+        with _lock:
+            command_timings[command].append(trace.duration)
+
+def percentile(samples, fraction):
+    """
+    Returns the nearest-rank percentile of a list of samples.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(timings):
+    """
+    Returns (name, count, p50 ms, p95 ms) rows for a table of timings.
+    """
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in timings.items()}
+    return [
+        (name, len(samples), percentile(samples, 0.5) * 1000, percentile(samples, 0.95) * 1000)
+        for name, samples in sorted(snapshot.items())
+    ]
+
+def print_report():
+    """
+    Prints rolling p50/p95 latency per command and per span.
+    """
+    print(f"\n=== Command Latency (last {WINDOW_SIZE} samples) ===")
+    print(f"{'Command':<22}{'Count':>7}{'p50 ms':>11}{'p95 ms':>11}")
+    for name, count, p50, p95 in summarize(command_timings):
+        print(f"{name:<22}{count:>7}{p50:>11.1f}{p95:>11.1f}")
+
+    print("\n=== Span Latency ===")
+    print(f"{'Span':<22}{'Count':>7}{'p50 ms':>11}{'p95 ms':>11}{'avg tokens':>12}")
+    with _lock:
+        average_tokens = {name: sum(samples) / len(samples) for name, samples in span_tokens.items() if samples}
+    for name, count, p50, p95 in summarize(span_timings):
+        tokens = f"{average_tokens[name]:.0f}" if name in average_tokens else "-"
+        print(f"{name:<22}{count:>7}{p50:>11.1f}{p95:>11.1f}{tokens:>12}")
+
+    print(f"\nProfiling: {'on' if profiling_enabled else 'off'}, memory tracing: {'on' if tracemalloc.is_tracing() else 'off'}")
+
+def reset():
+    """
+    Clears all recorded timings.
+    """
+    with _lock:
+        command_timings.clear()
+        span_timings.clear()
+        span_tokens.clear()
+
+def _report_path(prefix, extension):
+    if not os.path.exists(REPORT_FOLDER):
+        os.makedirs(REPORT_FOLDER)
+    return os.path.join(REPORT_FOLDER, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}_{time.perf_counter_ns() % 1000000}.{extension}")
+
+def _start_profiler():
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+def _dump_profile(profiler, command):
+    profiler.disable()
+    profiler.dump_stats(_report_path(f"profile_{command}", "prof"))
+
+def set_profiling(enabled):
+    """
+    Turns per-command cProfile capture on or off.
+    """
+    global profiling_enabled
+    profiling_enabled = enabled
+
+def set_memory_tracing(enabled):
+    """
+    Starts or stops tracemalloc allocation tracing.
+    """
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def dump_memory_snapshot(limit=25):
+    """
+    Writes the top allocation sites to a report file and returns its path.
+    """
+    if not tracemalloc.is_tracing():
+        return None
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    file_path = _report_path("memory", "txt")
+    with open(file_path, "w") as file:
+        current, peak = tracemalloc.get_traced_memory()
+        file.write(f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+        for stat in statistics[:limit]:
+            file.write(f"{stat}\n")
+    return file_path
@@ -0,0 +1,132 @@
+import re
+from types import MappingProxyType
+
+ITEM_CATALOG = {}
+_COPY_SUFFIX = re.compile(r"^(.*?)(?:_\d+)+$")
+
+def register_item(item_id, definition):
+    """
+    Adds an item definition to the shared catalog. Locations and inventories store
+    only the id, so a change here applies to every world and save that references it.
+    """
+    ITEM_CATALOG[item_id] = MappingProxyType({"name": item_id, **definition})
+
+for _item_id, _definition in [
+    ("torch", {"type": "tool", "description": "A torch that helps find hidden items."}),
+    ("dagger", {"type": "weapon", "attack_boost": 5, "description": "A small but sharp dagger."}),
+    ("short_sword", {"type": "weapon", "attack_boost": 8, "description": "A well-balanced short sword."}),
+    ("war_axe", {"type": "weapon", "attack_boost": 12, "description": "A heavy axe notched from many battles."}),
+    ("silver_dagger", {"type": "weapon", "attack_boost": 5, "description": "A finely crafted silver dagger."}),
+    ("healing_potion", {"type": "healing", "healing_amount": 25, "description": "A potion that restores 25 HP."}),
+    ("herbal_remedy", {"type": "healing", "healing_amount": 15, "description": "A bundle of bitter healing herbs."}),
+    ("elixir_of_vigor", {"type": "healing", "healing_amount": 40, "description": "A shimmering elixir that restores 40 HP."}),
+    ("potion", {"type": "healing", "healing_amount": 15, "description": "Restores health."}),
+    ("magic_amulet", {"type": "healing", "healing_amount": 30, "description": "A powerful amulet of protection."}),
+    ("silver_key", {"type": "key", "description": "A shiny silver key with intricate engravings."}),
+    ("iron_key", {"type": "key", "description": "A heavy iron key, cold to the touch."}),
+    ("bronze_key", {"type": "key", "description": "A worn bronze key that fits old locks."}),
+    ("key", {"type": "key", "description": "A rusty key that seems to fit old locks."}),
+    ("ancient_scroll", {"type": "quest_item", "description": "A scroll with mysterious symbols."}),
+    ("ancient_artifact", {"type": "scroll", "description": "An ancient artifact pulsing with forgotten power."}),
+    ("mystic_gem", {"type": "healing", "healing_amount": 999, "description": "A radiant gem that fully restores your health."}),
+]:
+    register_item(_item_id, _definition)
+
+SEARCH_FINDS = [
+    "magic_amulet", "potion", "ancient_scroll", "silver_dagger", "key",
+    {"name": "torch", "type": "tool", "description": "A flickering torch that illuminates the darkness."},
+]
+
+def item_id(entry):
+    """
+    Returns the name of an inventory entry: the catalog id itself, or the name of an inline definition.
+    """
+    return entry if isinstance(entry, str) else entry["name"]
+
+def resolve_item(entry, name=None):
+    """
+    Returns the definition for a stored item. Entries are catalog ids, {"id": ...} references
+    for renamed copies such as 'silver_key_2', or full dicts for items the catalog does not
+    know (such as ones invented by the AI) and older saves.
+    """
+    if isinstance(entry, str):
+        definition = ITEM_CATALOG.get(entry)
+        if definition is None:
+            return {"name": entry, "type": "misc", "description": "No description available."}
+        return definition
+    if "id" in entry:
+        return {**resolve_item(entry["id"]), "name": entry.get("name", name or entry["id"])}
+    if "name" in entry:
+        return entry
+    return {"name": name, **entry}
+
+def _matches(definition, entry):
+    return dict(definition) == {"name": definition["name"], **{key: value for key, value in entry.items() if key != "name"}}
+
+def compact_item(name, entry):
+    """
+    Replaces a full item dict with its catalog id when it has the same name and definition,
+    or with an {"id": ...} reference when it is a renamed copy such as 'silver_key_2'.
+    Anything else stays inline, so compacting never changes what an item is.
+    """
+    if isinstance(entry, str) or "id" in entry:
+        return entry
+    item_name = entry.get("name", name)
+    definition = ITEM_CATALOG.get(item_name)
+    if definition is not None and _matches(definition, entry):
+        return item_name
+    copy = _COPY_SUFFIX.match(item_name or "")
+    definition = ITEM_CATALOG.get(copy.group(1)) if copy else None
+    if definition is not None and _matches(definition, entry):
+        reference = {"id": definition["name"]}
+        if "name" in entry:
+            reference["name"] = item_name
+        return reference
+    return entry
+
+def compact_items(items):
+    """
+    Compacts a location's `items` or `hidden_items` mapping in place.
+    """
+    for name, entry in items.items():
+        items[name] = compact_item(name, entry)
+    return items
+
+def compact_inventory(inventory):
+    inventory[:] = [compact_item(None, entry) for entry in inventory]
+    return inventory
+
+def compact_game_state(game_state):
+    """
+    Rewrites the item entries of a full game state as catalog ids where possible.
+    """
+    compact_inventory(game_state["player"]["inventory"])
+    for location_data in game_state["locations"].values():
+        compact_items(location_data.get("items", {}))
+        compact_items(location_data.get("hidden_items", {}))
+    return game_state
+
+def to_inventory_entry(name, entry):
+    """
+    Turns a location item (stored under `name`) into an inventory entry.
+    """
+    if isinstance(entry, str):
+        return entry
+    return {"name": name, **entry}
+
+def to_location_entry(entry):
+    """
+    Turns an inventory entry into the name and value to store in a location's items.
+    """
+    if isinstance(entry, str):
+        return entry, entry
+    return entry["name"], {key: value for key, value in entry.items() if key != "name"}
+
+def take_item(inventory, name):
+    """
+    Removes the first inventory entry with the given id and returns it, or None.
+    """
+    for index, entry in enumerate(inventory):
+        if item_id(entry) == name:
+            return inventory.pop(index)
+    return None
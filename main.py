@@ -1,16 +1,49 @@
+import asyncio
+import contextvars
+import os
 import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping
 import matplotlib.pyplot as plt
 import networkx as nx
 import pyttsx3
-from state_manager import load_game_state, save_game_state
+from audio_cache import AudioCache, normalize_text
+from game_session import GameSession, current_session, activate_session, install_session_streams
+from async_console import AsyncConsole
+from state_history import CommandRewound
+from state_manager import load_game_state
+from save_slots import SaveSlots, slot_name
+from world_template import layer_game_state
+from item_catalog import SEARCH_FINDS, item_id, resolve_item, take_item, to_inventory_entry, to_location_entry
+from world_expansion import is_pending, expand_around, ensure_generated
+import instrumentation
+from instrumentation import command_trace, span
 from ai_interactions import (
-    generate_description,
+    generate_descriptions_batch,
     initialize_game_state,
     generate_npc_response,
+    npc_prompt_fingerprint,
     generate_image_with_deepai,
+    generate_image_async,
+    scheduler,
+    router,
+    image_store,
+    DESCRIPTION_DEADLINE,
+    DESCRIPTION_FALLBACK,
+    NPC_FALLBACK,
 )
+from request_scheduler import RequestCancelled, request_class
 
 use_voice = True
+descriptions_lock = threading.Lock()
+descriptions_in_flight = {}
+greeting_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="npc-greetings")
+image_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="images")
+images_lock = threading.Lock()
+image_jobs = {}
 
 try:
     engine = pyttsx3.init()
@@ -21,36 +54,85 @@ except Exception as e:
     engine = None
     use_voice = False
 
-def speak(text):
+audio_cache = AudioCache(engine) if engine is not None else None
+
+WELCOME_MESSAGES = [
+    "\nWelcome to the AI Dungeon Master Adventure Game!",
+    "Embark on a journey through dark forests, mystical lakes, and ancient ruins in search of hidden treasures and legendary artifacts.",
+    "Face challenging enemies, level up your skills, and strategically use items to survive the dangers that await.",
+    "\nType 'help' to see available commands. Good luck, adventurer!",
+]
+
+COMMON_PHRASES = WELCOME_MESSAGES + [f"You rolled a {roll}!" for roll in range(1, 11)] + [
+    "You carefully search the area for hidden items...",
+    "You use a key to attempt unlocking the door.",
+    "Despite your efforts, the door remains locked.",
+    "Your inventory is empty.",
+    "No active NPCs to fight here.",
+    "You don't have a key to attempt unlocking this door.",
+    "You can't go that way. Here are the directions you can go:",
+    "Exiting the game. Thank you for playing!\n",
+]
+
+SKILL_CHECK_TASKS = ["Trying to avoid any traps", "Searching for traps", "Searching for hidden items"] + [
+    f"unlocking the door to {direction}" for direction in ("north", "south", "east", "west")
+]
+
+TEMPLATE_PHRASES = [
+    phrase
+    for task in SKILL_CHECK_TASKS
+    for phrase in (
+        f"\nAttempting: {task}",
+        f"Success! You manage to complete the task: {task}.",
+        f"Failure. You could not complete the task: {task}.",
+    )
+]
+
+CACHED_PHRASES = {normalize_text(phrase) for phrase in COMMON_PHRASES + TEMPLATE_PHRASES}
+
+COMMANDS = {
+    "new", "quit", "look", "stats", "inventory", "goal", "back", "help", "voice", "image",
+    "talk", "fight", "map", "pick", "use", "drop", "move", "unlock", "perf", "tasks",
+    "undo", "redo", "saves", "save", "load",
+}
+
+def speak(text, cache=False):
     """
     Prints and optionally speaks the given text.
+    Phrases in CACHED_PHRASES are played from the audio cache and everything else is
+    synthesized live; pass cache=True for other fixed text that recurs.
     """
-    global use_voice
+    session = current_session()
     print(text)
-    if use_voice and engine is not None:
+    if use_voice and session.use_voice and engine is not None:
         try:
-            engine.say(text)
-            engine.runAndWait()
+            with span("tts"), session.speech_lock:
+                cached = cache or normalize_text(text) in CACHED_PHRASES
+                if cached and audio_cache is not None and audio_cache.play(text):
+                    return
+                engine.say(text)
+                engine.runAndWait()
         except Exception as e:
             print(f"Error during speech synthesis: {e}")
-            use_voice = False
+            session.use_voice = False
 
 def toggle_voice():
     """
     Toggles the voice output on or off.
     """
-    global use_voice
-    if use_voice:
+    session = current_session()
+    if session.use_voice:
         speak("\nVoice output is now disabled.")
-        use_voice = False
+        session.use_voice = False
     else:
-        use_voice = True
+        session.use_voice = True
         speak("\nVoice output is now enabled.")
 
 def check_quest_completion():
     """
     Checks if quests are completed based on required items and defeated NPCs.
     """
+    game_state = current_session().game_state
     all_completed = True
 
     for quest_name, quest_data in game_state["quests"].items():
@@ -61,7 +143,7 @@ def check_quest_completion():
             if required_items:
                 for item in required_items:
                     if not any(
-                        player_item["name"] == item for player_item in game_state["player"]["inventory"]
+                        item_id(player_item) == item for player_item in game_state["player"]["inventory"]
                     ):
                         is_completed = False
                         break
@@ -69,13 +151,7 @@ def check_quest_completion():
             required_npcs = quest_data.get("required_npcs", [])
             if required_npcs:
                 for npc in required_npcs:
-                    npc_defeated = False
-                    for location_data in game_state["locations"].values():
-                        npc_data = location_data.get("npcs", {}).get(npc)
-                        if npc_data and npc_data.get("status") == "defeated":
-                            npc_defeated = True
-                            break
-                    if not npc_defeated:
+                    if not is_npc_defeated(game_state, npc):
                         is_completed = False
                         break
 
@@ -83,7 +159,7 @@ def check_quest_completion():
                 quest_data["completed"] = True
                 print(f"\n=== Quest Completed: {quest_name.replace('_', ' ').title()} ===")
                 speak(f"Quest completed: {quest_data['description']}!")
-                save_game_state(game_state)
+                current_session().save()
             else:
                 all_completed = False
         else:
@@ -94,20 +170,37 @@ def check_quest_completion():
         speak("Congratulations! You have completed all your quests and mastered the realm.")
         speak("You are a true hero!")
 
+def is_npc_defeated(game_state, npc):
+    """
+    Checks whether an NPC has been defeated, looking it up through the world index
+    so that only the regions holding it are loaded.
+    """
+    locations = game_state["locations"]
+    return any(
+        locations[location].get("npcs", {}).get(npc, {}).get("status") == "defeated"
+        for location in locations.locations_with_npc(npc)
+    )
+
 def load_or_initialize_game():
     """
-    Loads the game state or initializes it if none exists.
+    Loads the session's game state or initializes it if none exists.
     """
-    game_state = load_game_state()
-    if game_state is None:
-        game_state = initialize_game_state()
-        if game_state is None:
+    session = current_session()
+    if session.load() is None:
+        new_state = initialize_game_state()
+        if new_state is None:
             print("Error: Failed to initialize game state.")
             exit_game()
-        save_game_state(game_state)
-    return game_state
+        session.game_state = layer_game_state(new_state)
+        session.save()
+    return session.game_state
 
-game_state = load_or_initialize_game()
+def location_for_update(location, section):
+    """
+    Returns a writable section of a location ('items', 'npcs', 'traps', ...).
+    The first change copies the section from the shared world into the player's overlay.
+    """
+    return current_session().game_state["locations"].section_for_update(location, section)
 
 def extract_locations_from_game_state(game_state):
     """
@@ -121,80 +214,260 @@ def extract_locations_from_game_state(game_state):
         }
     return locations
 
-locations = extract_locations_from_game_state(game_state)
+def build_map(game_state):
+    """
+    Builds the graph and node layout for the map: the player's region and its neighbouring
+    regions, so drawing the map on a large world never loads the rest of it. Paths that
+    leave those regions end at nodes marked as outside.
+    """
+    with span("render.graph"):
+        G = nx.DiGraph()
+        locations = game_state["locations"]
+        names = locations.names_around(game_state["player"]["location"])
+        shown = set(names)
+
+        for location in names:
+            data = locations[location]
+            G.add_node(location, label=data["description"], pending=is_pending(data))
+            for direction, connected_location in data["connections"].items():
+                if connected_location not in shown:
+                    G.add_node(connected_location, outside=True)
+                G.add_edge(location, connected_location, direction=direction)
+
+    with span("render.layout"):
+        pos = nx.spring_layout(G, seed=42)
+    return G, pos
 
 def display_map():
     """
     Displays a visual map of the game world using NetworkX and Matplotlib.
     """
-    G = nx.DiGraph()
-
-    for location, data in game_state["locations"].items():
-        G.add_node(location, label=data["description"])
-        for direction, connected_location in data["connections"].items():
-            G.add_edge(location, connected_location, direction=direction)
-
-    pos = nx.spring_layout(G, seed=42)
+    game_state = current_session().game_state
+    G, pos = build_map(game_state)
     current_location = game_state["player"]["location"]
 
-    plt.figure(figsize=(14, 8))
-    node_colors = ["#ffa500" if node == current_location else "#87ceeb" for node in G.nodes]
-
-    node_sizes = [max(6000, len(node.replace("_", " ").title()) * 300) for node in G.nodes]
-
-    nx.draw(
-        G,
-        pos,
-        node_color=node_colors,
-        node_size=node_sizes,
-        with_labels=False,
-        edge_color="#555",
-        linewidths=2,
-        alpha=0.9,
-        arrows=True,
-        arrowsize=20,
-    )
+    with span("render.draw"):
+        plt.figure(figsize=(14, 8))
+        node_colors = [
+            "#ffa500" if node == current_location
+            else "#d3d3d3" if G.nodes[node].get("pending") or G.nodes[node].get("outside")
+            else "#87ceeb"
+            for node in G.nodes
+        ]
 
-    edge_labels = {(u, v): data["direction"].capitalize() for u, v, data in G.edges(data=True)}
-    nx.draw_networkx_edge_labels(
-        G,
-        pos,
-        edge_labels=edge_labels,
-        font_size=9,
-        font_color="#555",
-        label_pos=0.5,
-    )
+        node_sizes = [max(6000, len(node.replace("_", " ").title()) * 300) for node in G.nodes]
+
+        nx.draw(
+            G,
+            pos,
+            node_color=node_colors,
+            node_size=node_sizes,
+            with_labels=False,
+            edge_color="#555",
+            linewidths=2,
+            alpha=0.9,
+            arrows=True,
+            arrowsize=20,
+        )
 
-    node_labels = {node: node.replace('_', ' ').title() for node in G.nodes}
-    for node, (x, y) in pos.items():
-        text = node_labels[node]
-        plt.text(
-            x,
-            y,
-            text,
-            fontsize=9,
-            color="#222",
-            bbox=dict(facecolor="white", edgecolor="#333", boxstyle="round,pad=0.5", lw=1),
-            ha="center",
-            va="center",
-            clip_on=True,
+        edge_labels = {(u, v): data["direction"].capitalize() for u, v, data in G.edges(data=True)}
+        nx.draw_networkx_edge_labels(
+            G,
+            pos,
+            edge_labels=edge_labels,
+            font_size=9,
+            font_color="#555",
+            label_pos=0.5,
         )
 
-    plt.gca().set_facecolor("#f0f0f0")
-    plt.title(
-        "Game Map: Locations and Connections",
-        fontsize=14,
-        fontweight="bold",
-        color="#333",
-        pad=20,
-    )
-    plt.axis("off")
+        node_labels = {node: "Fog" if G.nodes[node].get("pending") else node.replace('_', ' ').title() for node in G.nodes}
+        for node, (x, y) in pos.items():
+            text = node_labels[node]
+            plt.text(
+                x,
+                y,
+                text,
+                fontsize=9,
+                color="#888" if G.nodes[node].get("pending") else "#222",
+                bbox=dict(facecolor="white", edgecolor="#333", boxstyle="round,pad=0.5", lw=1),
+                ha="center",
+                va="center",
+                clip_on=True,
+            )
+
+        plt.gca().set_facecolor("#f0f0f0")
+        plt.title(
+            "Game Map: Locations and Connections",
+            fontsize=14,
+            fontweight="bold",
+            color="#333",
+            pad=20,
+        )
+        plt.axis("off")
     plt.show()
 
+def location_label(location):
+    """
+    Returns the display name for a location, hiding ones that are still in fog.
+    """
+    location_data = current_session().game_state["locations"].get(location)
+    if location_data is not None and is_pending(location_data):
+        return "Unexplored"
+    return location.replace('_', ' ').title()
+
+def description_prompt(location_data):
+    return f"{location_data['description']} Give a brief, atmospheric paragraph in D&D style, no more than 5 sentences."
+
+def _description_key(locations, name):
+    """
+    Returns the in-flight key for a location: the world it belongs to and its name,
+    so same-named locations in different worlds never share a job.
+    """
+    template = getattr(locations, "template", None)
+    return (template.world_id if template is not None else id(locations), name)
+
+def _claim_descriptions(locations, names):
+    """
+    Marks locations that still need a description as in flight and returns them.
+    Locations already being generated by another job are skipped.
+    """
+    with descriptions_lock:
+        wanted = [
+            name for name in names
+            if name in locations and _description_key(locations, name) not in descriptions_in_flight
+            and not is_pending(locations[name]) and "generated_description" not in locations[name]
+        ]
+        for name in wanted:
+            descriptions_in_flight[_description_key(locations, name)] = threading.Event()
+    return wanted
+
+def _generate_descriptions(locations, wanted):
+    try:
+        if wanted:
+            prompts = {name: description_prompt(locations[name]) for name in wanted}
+            for name, text in generate_descriptions_batch(prompts).items():
+                if text != DESCRIPTION_FALLBACK:
+                    locations.set_generated(name, "generated_description", text)
+    finally:
+        with descriptions_lock:
+            for name in wanted:
+                descriptions_in_flight.pop(_description_key(locations, name)).set()
+
+def warm_descriptions(locations, names):
+    """
+    Fills in generated_description for every listed location that lacks one, using batched completions.
+    """
+    _generate_descriptions(locations, _claim_descriptions(locations, names))
+
+def request_description(locations, location):
+    """
+    Makes sure a description for the location is being generated and returns an Event
+    that is set once the job finishes, whether or not it succeeded.
+    """
+    wanted = _claim_descriptions(locations, [location])
+    if wanted:
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(_generate_descriptions, locations, wanted), daemon=True).start()
+    with descriptions_lock:
+        event = descriptions_in_flight.get(_description_key(locations, location))
+    if event is None:
+        event = threading.Event()
+        event.set()
+    return event
+
+def compose_local_description(location_data):
+    """
+    Builds a description from the location's own data, shown while the AI description is late.
+    """
+    parts = [location_data["description"]]
+    npcs = [npc.replace('_', ' ').title() for npc, data in location_data.get("npcs", {}).items() if data.get("status") != "defeated"]
+    if npcs:
+        parts.append(f"{', '.join(npcs)} {'is' if len(npcs) == 1 else 'are'} here.")
+    items = [item.replace('_', ' ') for item in location_data.get("items", {})]
+    if items:
+        parts.append(f"You notice {', '.join(items)}.")
+    if any(not trap.get("triggered") for trap in location_data.get("traps", {}).values()):
+        parts.append("Something about this place puts you on edge.")
+    return " ".join(parts)
+
+def prefetch_descriptions(location):
+    """
+    Warms the descriptions of a location and its neighbours in the background.
+    Prefetches still queued for the session's previous location are cancelled first.
+    """
+    session = current_session()
+    locations = session.game_state["locations"]
+    names = [location] + list(locations[location].get("connections", {}).values())
+    tag = f"prefetch:{session.session_id}"
+    scheduler.cancel(tag)
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(_prefetch_descriptions, locations, names, tag), daemon=True).start()
+
+def _prefetch_descriptions(locations, names, tag):
+    try:
+        with request_class("prefetch", tag):
+            for name in names:
+                ensure_generated(locations, name)
+            warm_descriptions(locations, names)
+    except RequestCancelled:
+        pass
+    except Exception as e:
+        print(f"Error prefetching descriptions: {e}")
+
+def prefetch_greetings(location):
+    """
+    Generates the opening line of every active NPC at a location in the background, so talk
+    starts instantly. Each greeting is stored with the fingerprint of the state its prompt used.
+    """
+    session = current_session()
+    game_state = session.game_state
+    tag = f"prefetch:{session.session_id}"
+    with session.lock:
+        session.greetings = {key: entry for key, entry in session.greetings.items() if key[0] == location}
+        for npc_name, data in game_state["locations"][location].get("npcs", {}).items():
+            if data.get("status") == "defeated":
+                continue
+            fingerprint = npc_prompt_fingerprint(npc_name, game_state)
+            cached = session.greetings.get((location, npc_name))
+            if cached is not None and cached[0] == fingerprint:
+                continue
+            context = contextvars.copy_context()
+            job = greeting_executor.submit(context.run, _generate_greeting, npc_name, location, game_state, tag)
+            session.tasks.track(f"greeting {npc_name}", job)
+            session.greetings[(location, npc_name)] = (fingerprint, job)
+
+def _generate_greeting(npc_name, location, game_state, tag):
+    if game_state["player"]["location"] != location:
+        return None
+    with request_class("prefetch", tag):
+        return generate_npc_response(npc_name, "start", game_state)
+
+def take_greeting(npc_name):
+    """
+    Returns the prefetched greeting for an NPC if it is ready and still matches the current
+    state, otherwise None. It never waits for a greeting that is still being generated.
+    """
+    session = current_session()
+    game_state = session.game_state
+    location = game_state["player"]["location"]
+    with session.lock:
+        cached = session.greetings.pop((location, npc_name), None)
+    if cached is None or cached[0] != npc_prompt_fingerprint(npc_name, game_state):
+        return None
+    if not cached[1].done():
+        cached[1].cancel()
+        return None
+    try:
+        greeting = cached[1].result()
+    except Exception:
+        return None
+    return greeting if greeting and greeting != NPC_FALLBACK else None
+
 def describe_location():
     """
     Describes the current location, including NPCs, items, and available paths.
     """
+    game_state = current_session().game_state
     location = game_state["player"]["location"]
     loc_data = game_state["locations"].get(location)
 
@@ -206,13 +479,14 @@ def describe_location():
     print(location.replace('_', ' ').title())
 
     if "generated_description" not in loc_data:
-        prompt = f"{loc_data['description']} Give a brief, atmospheric paragraph in D&D style, no more than 5 sentences."
-        loc_data["generated_description"] = generate_description(prompt)
-        game_state["locations"][location] = loc_data
-        save_game_state(game_state)
+        request_description(game_state["locations"], location).wait(DESCRIPTION_DEADLINE)
+        loc_data = game_state["locations"][location]
 
     print("\n=== Location Description ===")
-    print(loc_data["generated_description"])
+    if "generated_description" in loc_data:
+        print(loc_data["generated_description"])
+    else:
+        print(compose_local_description(loc_data))
 
     if loc_data.get("npcs"):
         print("\n=== NPCs Here ===")
@@ -225,7 +499,8 @@ def describe_location():
 
     if loc_data.get("items"):
         print("\n=== Items Available ===")
-        for item_name, item_data in loc_data["items"].items():
+        for item_name, entry in loc_data["items"].items():
+            item_data = resolve_item(entry, item_name)
             description = item_data.get("description", "No description available")
             item_type = item_data.get("type", "misc")
             print(f"- {item_name.replace('_', ' ').title()} ({item_type}) - {description}")
@@ -234,7 +509,7 @@ def describe_location():
         print("\n=== Paths Available ===")
         for direction, connected_location in loc_data["connections"].items():
             lock_status = "(locked)" if loc_data.get("locked_paths", {}).get(direction, False) else ""
-            print(f"- {direction.capitalize()}: {connected_location.replace('_', ' ').title()} {lock_status}")
+            print(f"- {direction.capitalize()}: {location_label(connected_location)} {lock_status}")
 
 def perform_skill_check(task_description, difficulty="simple"):
     """
@@ -264,6 +539,7 @@ def display_player_stats():
     """
     Displays the player's current stats.
     """
+    game_state = current_session().game_state
     player = game_state["player"]
     print("\n=== Player Stats ===")
     print(f"Level: {player['level']}")
@@ -275,6 +551,7 @@ def display_inventory():
     """
     Displays the player's inventory with item details.
     """
+    game_state = current_session().game_state
     inventory = game_state["player"]["inventory"]
     print("\n=== Inventory ===")
 
@@ -282,12 +559,12 @@ def display_inventory():
         speak("Your inventory is empty.")
     else:
         item_counts = {}
-        for item in inventory:
-            item_key = item["name"]
+        for entry in inventory:
+            item_key = item_id(entry)
             if item_key in item_counts:
                 item_counts[item_key]["count"] += 1
             else:
-                item_counts[item_key] = {"count": 1, "data": item}
+                item_counts[item_key] = {"count": 1, "data": resolve_item(entry)}
 
         for item_name, info in item_counts.items():
             count = info["count"]
@@ -309,10 +586,11 @@ def display_inventory():
 
             print(f"- {item_name.replace('_', ' ').title()} x{count} {additional_info}")
 
-def pick_specific_item_logic(item_name, items, location):
+def pick_specific_item_logic(item_name, location):
     """
     Logic to pick up a specific item, considering the state of NPCs in the location.
     """
+    game_state = current_session().game_state
     restricted_items = ["ancient_artifact"]
 
     if item_name in restricted_items:
@@ -326,16 +604,17 @@ def pick_specific_item_logic(item_name, items, location):
             speak(f"You cannot pick up the {item_name.replace('_', ' ').title()} until you defeat the following NPCs: {npc_names}.")
             return
 
-    item = items.pop(item_name)
-    game_state["player"]["inventory"].append({"name": item_name, **item})
+    entry = location_for_update(location, "items").pop(item_name)
+    game_state["player"]["inventory"].append(to_inventory_entry(item_name, entry))
     speak(f"You picked up {item_name.replace('_', ' ').title()}.")
-    save_game_state(game_state)
+    current_session().save()
 
 def pick_specific_item(item_name=None):
     """
     Allows the player to pick up an item from the current location.
     Prevents picking up certain items until all NPCs in the location are defeated.
     """
+    game_state = current_session().game_state
     location = game_state["player"]["location"]
     items = game_state["locations"][location].get("items", {})
 
@@ -345,7 +624,7 @@ def pick_specific_item(item_name=None):
 
     if item_name:
         if item_name in items:
-            pick_specific_item_logic(item_name, items, location)
+            pick_specific_item_logic(item_name, location)
             check_quest_completion()
         else:
             print(f"There is no {item_name.replace('_', ' ').title()} here to pick up.")
@@ -361,14 +640,14 @@ def pick_specific_item(item_name=None):
             return
         elif choice.lower() == 'a':
             for item in list(items.keys()):
-                pick_specific_item_logic(item, items, location)
+                pick_specific_item_logic(item, location)
             check_quest_completion()
         else:
             try:
                 idx = int(choice) - 1
                 if 0 <= idx < len(items):
                     item_name = list(items.keys())[idx]
-                    pick_specific_item_logic(item_name, items, location)
+                    pick_specific_item_logic(item_name, location)
                     check_quest_completion()
                 else:
                     print("Invalid selection.")
@@ -379,14 +658,16 @@ def use_item(item_name):
     """
     Uses an item from the player's inventory.
     """
+    game_state = current_session().game_state
     inventory = game_state["player"]["inventory"]
-    item = next((item for item in inventory if item["name"] == item_name), None)
+    entry = next((entry for entry in inventory if item_id(entry) == item_name), None)
 
-    if not item:
-        available_items = ', '.join([item["name"] for item in inventory])
+    if not entry:
+        available_items = ', '.join([item_id(entry) for entry in inventory])
         print(f"You don't have '{item_name.replace('_', ' ').title()}' in your inventory. Available items: {available_items}")
         return
 
+    item = resolve_item(entry)
     item_type = item.get("type")
 
     if item_type == "healing":
@@ -400,12 +681,13 @@ def use_item(item_name):
     else:
         speak(f"The {item_name.replace('_', ' ').title()} can't be used directly.")
 
-    save_game_state(game_state)
+    current_session().save()
 
 def use_healing_item(item, inventory, item_name):
     """
     Uses a healing item to restore player's HP.
     """
+    game_state = current_session().game_state
     player_hp = game_state["player"]["hp"]
     max_hp = game_state["player"]["max_hp"]
     if player_hp >= max_hp:
@@ -416,17 +698,18 @@ def use_healing_item(item, inventory, item_name):
     game_state["player"]["hp"] += healed_amount
     print(f"\n=== Item Used ===")
     speak(f"You used a {item_name.replace('_', ' ').title()} and restored {healed_amount} HP.")
-    inventory.remove(item)
+    take_item(inventory, item_name)
 
 def use_weapon_item(item, inventory, item_name):
     """
     Equips a weapon item to increase player's attack.
     """
+    game_state = current_session().game_state
     weapon_attack = item.get("attack_boost", 5)
     game_state["player"]["attack"] += weapon_attack
     print(f"\n=== Item Equipped ===")
     speak(f"You equipped {item_name.replace('_', ' ').title()} and permanently increased your attack by {weapon_attack}.")
-    inventory.remove(item)
+    take_item(inventory, item_name)
 
 def use_torch_item(item, inventory, item_name):
     """
@@ -435,12 +718,13 @@ def use_torch_item(item, inventory, item_name):
     print(f"\n=== Item Used ===")
     speak(f"You used a {item_name.replace('_', ' ').title()} to search for hidden items!")
     search_for_hidden_item()
-    inventory.remove(item)
+    take_item(inventory, item_name)
 
 def gain_xp(amount, npc_name):
     """
     Adds experience points to the player and checks for level up.
     """
+    game_state = current_session().game_state
     player = game_state["player"]
     player["xp"] += amount
     speak(f"You earned {amount} XP for defeating the {npc_name.replace('_', ' ').title()}!")
@@ -448,12 +732,13 @@ def gain_xp(amount, npc_name):
     if player["xp"] >= player["xp_to_next_level"]:
         level_up()
 
-    save_game_state(game_state)
+    current_session().save()
 
 def level_up():
     """
     Increases player's level and stats when enough XP is accumulated.
     """
+    game_state = current_session().game_state
     player = game_state["player"]
     player["level"] += 1
     player["xp"] -= player["xp_to_next_level"]
@@ -468,12 +753,13 @@ def level_up():
     print(
         f"New stats - HP: {player['hp']}/{player['max_hp']}, Attack: {player['attack']}, XP to next level: {player['xp_to_next_level']}"
     )
-    save_game_state(game_state)
+    current_session().save()
 
 def engage_combat():
     """
     Initiates combat with an NPC in the current location.
     """
+    game_state = current_session().game_state
     location = game_state["player"]["location"]
     npcs = game_state["locations"][location].get("npcs", {})
     active_npcs = {npc: data for npc, data in npcs.items() if data.get("status") != "defeated"}
@@ -519,7 +805,8 @@ def combat_loop(npc_name):
     """
     Handles the combat loop between the player and the NPC.
     """
-    npc = game_state["locations"][game_state["player"]["location"]]["npcs"][npc_name]
+    game_state = current_session().game_state
+    npc = location_for_update(game_state["player"]["location"], "npcs")[npc_name]
     player = game_state["player"]
 
     speak(f"\nYou engage in combat with {npc_name.replace('_', ' ').title()}!")
@@ -555,7 +842,7 @@ def combat_loop(npc_name):
             skip_npc_turn = True
         elif action[0] == "quit":
             speak("\nYou retreated from the combat.")
-            save_game_state(game_state)
+            current_session().save()
             return False
         else:
             print("\nInvalid action. Choose 'roll', 'use [item]', 'inventory', or 'quit'.")
@@ -567,7 +854,7 @@ def combat_loop(npc_name):
             speak(f"\nYou have defeated {npc_name.replace('_', ' ').title()}!")
             xp_gained = npc.get("xp", 20)
             gain_xp(xp_gained, npc_name)
-            save_game_state(game_state)
+            current_session().save()
             check_quest_completion()
             return True
 
@@ -585,8 +872,8 @@ def combat_loop(npc_name):
             if player["hp"] <= 0:
                 player["hp"] = 0
                 speak("\nYou have been defeated. Game over.")
-                save_game_state(game_state)
-                exit_game()
+                current_session().save()
+                game_over()
         else:
             skip_npc_turn = False
 
@@ -596,6 +883,7 @@ def trigger_trap(trap_name, trap_data):
     """
     Applies the trap's effects to the player.
     """
+    game_state = current_session().game_state
     speak(f"\nOh no! You've triggered a trap: {trap_name.replace('_', ' ').title()}!")
     speak(trap_data.get("description", "A trap activates!"))
     damage = trap_data.get("damage", 10)
@@ -605,8 +893,8 @@ def trigger_trap(trap_name, trap_data):
     if game_state["player"]["hp"] <= 0:
         game_state["player"]["hp"] = 0
         print("You have succumbed to your injuries from the trap. Game over.")
-        save_game_state(game_state)
-        exit_game()
+        current_session().save()
+        game_over()
     else:
         print(f"Your current HP: {game_state['player']['hp']}/{game_state['player']['max_hp']}")
 
@@ -616,11 +904,13 @@ def check_for_traps(location):
     """
     Checks for traps in the specified location and handles player interaction.
     """
+    game_state = current_session().game_state
     location_data = game_state["locations"].get(location, {})
     traps = location_data.get("traps", {})
 
     for trap_name, trap_data in traps.items():
         if not trap_data.get("triggered", False):
+            trap_data = location_for_update(location, "traps")[trap_name]
             print(f"\nAs you enter {location.replace('_', ' ').title()}, you feel that something is amiss...")
             print("What would you like to do?")
             print("1. Proceed carefully")
@@ -645,15 +935,14 @@ def check_for_traps(location):
             else:
                 trigger_trap(trap_name, trap_data)
 
-            location_data["traps"][trap_name] = trap_data
-            game_state["locations"][location] = location_data
-            save_game_state(game_state)
+            current_session().save()
             break
 
 def move_player(direction=None):
     """
     Moves the player to a new location based on the given direction.
     """
+    game_state = current_session().game_state
     location = game_state["player"]["location"]
     location_data = game_state["locations"][location]
 
@@ -669,15 +958,27 @@ def move_player(direction=None):
             handle_locked_path(location, direction, new_location)
             return
 
+        if is_pending(game_state["locations"][new_location]):
+            print("The fog ahead begins to lift...")
+            try:
+                ensure_generated(game_state["locations"], new_location)
+            except Exception as e:
+                print(f"Error generating location: {e}")
+                return
+
         game_state["player"]["location_history"].append(location)
         game_state["player"]["location"] = new_location
+        game_state["locations"].prefetch_around(new_location)
+        expand_around(game_state["locations"], new_location)
+        prefetch_descriptions(new_location)
         print(f"\nYou move {direction} to {new_location.replace('_', ' ').title()}.")
         check_for_traps(new_location)
-        save_game_state(game_state)
+        prefetch_greetings(new_location)
+        current_session().save()
     else:
         speak("You can't go that way. Here are the directions you can go:")
         for available_direction, connected_location in location_data["connections"].items():
-            print(f"- {available_direction.capitalize()}: {connected_location.replace('_', ' ').title()}")
+            print(f"- {available_direction.capitalize()}: {location_label(connected_location)}")
 
 def select_direction_to_move(location_data):
     """
@@ -688,7 +989,7 @@ def select_direction_to_move(location_data):
     for idx, available_direction in enumerate(available_directions, start=1):
         connected_location = location_data["connections"][available_direction]
         locked_status = " (Locked)" if location_data.get("locked_paths", {}).get(available_direction, False) else ""
-        print(f"{idx}. {available_direction.capitalize()} -> {connected_location.replace('_', ' ').title()}{locked_status}")
+        print(f"{idx}. {available_direction.capitalize()} -> {location_label(connected_location)}{locked_status}")
 
     try:
         choice = int(input("Choose a direction (enter the number or 0 to cancel): "))
@@ -704,8 +1005,9 @@ def handle_locked_path(location, direction, new_location):
     """
     Handles the scenario when the player encounters a locked path.
     """
-    print(f"The path to {new_location.replace('_', ' ').title()} is locked.")
-    key_item = next((item for item in game_state["player"]["inventory"] if item["type"] == "key"), None)
+    game_state = current_session().game_state
+    print(f"The path to {location_label(new_location)} is locked.")
+    key_item = next((entry for entry in game_state["player"]["inventory"] if resolve_item(entry)["type"] == "key"), None)
     if not key_item:
         speak("You don't have a key to attempt unlocking this door.")
         return
@@ -715,7 +1017,7 @@ def handle_locked_path(location, direction, new_location):
 
         if action == "unlock":
             if unlock_door(location, direction):
-                speak(f"You successfully unlocked the path to {new_location.replace('_', ' ').title()}!")
+                speak(f"You successfully unlocked the path to {location_label(new_location)}!")
                 move_player(direction)
                 break
             else:
@@ -733,11 +1035,12 @@ def move_back():
     """
     Moves the player back to the previous location.
     """
+    game_state = current_session().game_state
     if game_state["player"]["location_history"]:
         previous_location = game_state["player"]["location_history"].pop()
         game_state["player"]["location"] = previous_location
         print(f"\nYou move back to {previous_location.replace('_', ' ').title()}.")
-        save_game_state(game_state)
+        current_session().save()
     else:
         print("You can't go back any further.")
 
@@ -745,6 +1048,7 @@ def talk_to_npc():
     """
     Initiates a conversation with an NPC in the current location.
     """
+    game_state = current_session().game_state
     location = game_state["player"]["location"]
     npcs = game_state["locations"][location].get("npcs", {})
 
@@ -758,7 +1062,7 @@ def talk_to_npc():
     if not npc_name:
         return
 
-    npc = game_state["locations"][location]["npcs"][npc_name]
+    npc = location_for_update(location, "npcs")[npc_name]
 
     if npc["status"] == "defeated":
         print(f"{npc_name.replace('_', ' ').title()} is defeated and cannot respond.")
@@ -793,6 +1097,7 @@ def initiate_conversation(npc_name, npc):
     """
     Manages the conversation loop with an NPC.
     """
+    game_state = current_session().game_state
     has_previous_conversation = "conversation_history" in npc and npc["conversation_history"]
     if has_previous_conversation:
         print(f"\n=== Previous Conversation with {npc_name.replace('_', ' ').title()} ===\n")
@@ -805,7 +1110,7 @@ def initiate_conversation(npc_name, npc):
 
     if has_previous_conversation:
         print(f"\n=== Current Conversation with {npc_name.replace('_', ' ').title()} ===\n")
-    npc_initial_response = generate_npc_response(npc_name, "start")
+    npc_initial_response = take_greeting(npc_name) or generate_npc_response(npc_name, "start", game_state)
     speak(f"{npc_name.replace('_', ' ').title()}: {npc_initial_response}")
     npc["conversation_history"].append({"player": "start", "npc": npc_initial_response})
 
@@ -816,33 +1121,28 @@ def initiate_conversation(npc_name, npc):
             speak(f"\nYou ended the conversation with {npc_name.replace('_', ' ').title()}.")
             break
 
-        npc_response = generate_npc_response(npc_name, player_input)
+        npc_response = generate_npc_response(npc_name, player_input, game_state)
         speak(f"{npc_name.replace('_', ' ').title()}: {npc_response}\n")
 
         npc["conversation_history"].append({"player": player_input, "npc": npc_response})
 
-    save_game_state(game_state)
+    current_session().save()
 
 def search_for_hidden_item():
     """
     Allows the player to search for hidden items in the current location.
     """
+    game_state = current_session().game_state
     speak("You carefully search the area for hidden items...")
 
     if perform_skill_check("Searching for hidden items", "challenging"):
-        possible_items = [
-            {"name": "magic_amulet", "type": "healing", "healing_amount": 30, "description": "A powerful amulet of protection."},
-            {"name": "potion", "type": "healing", "healing_amount": 15, "description": "Restores health."},
-            {"name": "ancient_scroll", "type": "quest_item", "description": "A scroll with mysterious symbols."},
-            {"name": "silver_dagger", "type": "weapon", "attack_boost": 5, "description": "A finely crafted silver dagger."},
-            {"name": "key", "type": "key", "description": "A rusty key that seems to fit old locks."},
-            {"name": "torch", "type": "tool", "description": "A flickering torch that illuminates the darkness."},
-        ]
-        found_item = random.choice(possible_items)
+        found_item = random.choice(SEARCH_FINDS)
+        if isinstance(found_item, dict):
+            found_item = dict(found_item)
 
         game_state["player"]["inventory"].append(found_item)
-        speak(f"Success! You found a hidden item: {found_item['name'].replace('_', ' ').title()}!")
-        save_game_state(game_state)
+        speak(f"Success! You found a hidden item: {item_id(found_item).replace('_', ' ').title()}!")
+        current_session().save()
     else:
         speak("Despite your best efforts, you couldn't find anything hidden.")
 
@@ -850,6 +1150,7 @@ def unlock_door(location, direction):
     """
     Attempts to unlock a locked door in the specified direction.
     """
+    game_state = current_session().game_state
     current_location = game_state["locations"].get(location)
     locked_paths = current_location.get("locked_paths", {})
 
@@ -858,7 +1159,7 @@ def unlock_door(location, direction):
         return False
 
     speak("You use a key to attempt unlocking the door.")
-    key_item = next((item for item in game_state["player"]["inventory"] if item["type"] == "key"), None)
+    key_item = next((entry for entry in game_state["player"]["inventory"] if resolve_item(entry)["type"] == "key"), None)
     if key_item:
         game_state["player"]["inventory"].remove(key_item)
     else:
@@ -870,8 +1171,8 @@ def unlock_door(location, direction):
     success = perform_skill_check(task_description, difficulty)
 
     if success:
-        current_location["locked_paths"][direction] = False
-        save_game_state(game_state)
+        location_for_update(location, "locked_paths")[direction] = False
+        current_session().save()
         speak(f"The door to {direction} unlocks with a satisfying click!")
         return True
     else:
@@ -882,43 +1183,56 @@ def drop_item(item_name):
     """
     Drops an item from the player's inventory into the current location.
     """
+    game_state = current_session().game_state
     inventory = game_state["player"]["inventory"]
 
-    item = next((item for item in inventory if item["name"] == item_name), None)
+    entry = take_item(inventory, item_name)
 
-    if not item:
+    if entry is None:
         speak(f"You don't have '{item_name.replace('_', ' ').title()}' in your inventory.")
         return
 
-    inventory.remove(item)
     speak(f"You dropped {item_name.replace('_', ' ').title()}.")
 
     current_location = game_state["player"]["location"]
-    game_state["locations"][current_location].setdefault("items", {})[item_name] = item
+    name, value = to_location_entry(entry)
+    location_for_update(current_location, "items")[name] = value
 
-    save_game_state(game_state)
+    current_session().save()
 
 def start_new_game():
     """
     Starts a new game, resetting the game state.
     """
-    global game_state
-    confirm = input("\nAre you sure you want to start a new game? This will erase your current progress. (yes/no): ").strip().lower()
+    session = current_session()
+    if session.slots is not None:
+        question = f"Start a new game? Your current game stays in slot '{session.slot}'."
+    else:
+        question = "Are you sure you want to start a new game? This will erase your current progress."
+    confirm = input(f"\n{question} (yes/no): ").strip().lower()
 
     if confirm == "yes":
-        game_state = initialize_game_state()
-        if game_state is None:
+        new_state = initialize_game_state()
+        if new_state is None:
             print("Error: Failed to initialize game state.")
             exit_game()
-        save_game_state(game_state)
+        session.game_state = layer_game_state(new_state)
+        if session.slots is not None:
+            switch_slot(session, time.strftime("game_%Y%m%d_%H%M%S"))
+            print(f"Your new game is saved in slot '{session.slot}'.")
+        else:
+            session.save()
         speak("\nA new game has started!")
     else:
         speak("\nNew game canceled. Continuing with the current progress.")
 
 def generate_location_image():
     """
-    Generates an AI image for the current location.
+    Generates an AI image for the current location as a background job.
+    The player is notified before the next prompt once it is ready.
     """
+    session = current_session()
+    game_state = session.game_state
     location = game_state["player"]["location"]
     loc_data = game_state["locations"].get(location)
 
@@ -926,33 +1240,66 @@ def generate_location_image():
         print(f"Error: The location '{location}' does not exist in the game state.")
         return
 
-    if "generated_image" in loc_data and isinstance(loc_data["generated_image"], dict):
+    if "generated_image" in loc_data and isinstance(loc_data["generated_image"], Mapping):
         generated_data = loc_data["generated_image"]
-        if "file_path" in generated_data and "url" in generated_data:
+        if "file_path" in generated_data and "url" in generated_data and image_store.is_valid(generated_data):
             print(f"Image already generated for {location.replace('_', ' ').title()}:")
-            print(f" - Local File: {generated_data['file_path']}")
-            print(f" - URL: {generated_data['url']}")
+            print_image_paths(generated_data)
             return
+        elif "file_path" in generated_data:
+            print(f"The image file for {location.replace('_', ' ').title()} is missing. Regenerating...")
         else:
             print(f"Error: The 'generated_image' field for {location} is invalid. Regenerating...")
 
-    print(f"Generating an image for {location.replace('_', ' ').title()}...")
-    description = loc_data.get("generated_description", loc_data["description"])
-    generated_data = generate_image_with_deepai(description, location)
-    if generated_data:
-        loc_data["generated_image"] = generated_data
-        game_state["locations"][location] = loc_data
-        save_game_state(game_state)
-        print(f"Image generated for {location.replace('_', ' ').title()}:")
-        print(f" - Local File: {generated_data['file_path']}")
-        print(f" - URL: {generated_data['url']}")
+    key = (session.session_id, location)
+    with images_lock:
+        job = image_jobs.get(key)
+        if job is not None and not job.done():
+            print(f"An image for {location.replace('_', ' ').title()} is already being generated.")
+            return
+        description = loc_data.get("generated_description", loc_data["description"])
+        name = f"image {location}"
+        if session.tasks.loop is not None:
+            job = session.tasks.spawn(name, generate_image_async(description, location))
+        else:
+            context = contextvars.copy_context()
+            job = session.tasks.track(name, image_executor.submit(context.run, generate_image_with_deepai, description, location))
+        image_jobs[key] = job
+    job.add_done_callback(lambda finished: _image_finished(session, location, finished))
+    print(f"Generating an image for {location.replace('_', ' ').title()} in the background. You can keep playing.")
+
+def image_path_lines(generated_data):
+    lines = [f" - Local File: {generated_data['file_path']}"]
+    if generated_data.get("thumbnail_path"):
+        lines.append(f" - Thumbnail: {generated_data['thumbnail_path']}")
+    lines.append(f" - URL: {generated_data['url']}")
+    return lines
+
+def print_image_paths(generated_data):
+    for line in image_path_lines(generated_data):
+        print(line)
+
+def _image_finished(session, location, job):
+    """
+    Records a finished image job on the world and tells the player about it.
+    Jobs cancelled because the player quit or disconnected are dropped quietly.
+    """
+    with images_lock:
+        image_jobs.pop((session.session_id, location), None)
+    if job.cancelled():
+        return
+    generated_data = None if job.exception() else job.result()
+    if generated_data and location in session.game_state["locations"]:
+        session.game_state["locations"].set_generated(location, "generated_image", generated_data)
+        session.notify(f"Image generated for {location.replace('_', ' ').title()}:\n" + "\n".join(image_path_lines(generated_data)))
     else:
-        print("Failed to generate an image for this location.")
+        session.notify(f"Failed to generate an image for {location.replace('_', ' ').title()}.")
 
 def display_goal():
     """
     Displays the player's current quests and their statuses.
     """
+    game_state = current_session().game_state
     quests = game_state.get("quests", {})
     if not quests:
         print("No active quests available.")
@@ -972,18 +1319,14 @@ def display_goal():
             print(f"  Required Items to Complete:")
             for item in required_items:
                 item_status = "Obtained" if any(
-                    inventory_item["name"] == item for inventory_item in game_state["player"]["inventory"]
+                    item_id(inventory_item) == item for inventory_item in game_state["player"]["inventory"]
                 ) else "Not Obtained"
                 print(f"    - {item.replace('_', ' ').title()} ({item_status})")
 
         if required_npcs:
             print(f"  Required NPCs to Defeat:")
             for npc in required_npcs:
-                npc_defeated = any(
-                    location_data.get("npcs", {}).get(npc, {}).get("status") == "defeated"
-                    for location_data in game_state["locations"].values()
-                )
-                npc_status = "Defeated" if npc_defeated else "Not Defeated"
+                npc_status = "Defeated" if is_npc_defeated(game_state, npc) else "Not Defeated"
                 print(f"    - {npc.replace('_', ' ').title()} ({npc_status})")
 
         print("-" * 60)
@@ -993,6 +1336,7 @@ def check_game_state_before_start():
     Checks the game state before starting the game loop.
     If the player is dead or all quests are completed, prompt to start a new game.
     """
+    game_state = current_session().game_state
     player = game_state["player"]
     quests = game_state.get("quests", {})
 
@@ -1015,12 +1359,29 @@ def check_game_state_before_start():
             speak("Exiting the game. Thank you for playing!\n")
             exit()
 
+def game_over():
+    """
+    Ends the game after the player dies, unless they take back the command that killed them.
+    """
+    session = current_session()
+    if session.history.tracks(session.game_state):
+        choice = input("Type 'undo' to take back your last command, or anything else to quit: ").strip().lower()
+        if choice == "undo":
+            session.history.rewind(session.game_state)
+            session.save()
+            raise CommandRewound()
+    exit_game()
+
 def exit_game():
     """
     Exits the game gracefully.
     """
-    save_game_state(game_state)
+    current_session().save(force=True)
     speak("Exiting the game. Thank you for playing!\n")
+    if audio_cache is not None:
+        audio_cache.close()
+    router.save()
+    image_store.close()
     exit()
 
 def show_help():
@@ -1028,7 +1389,7 @@ def show_help():
     Displays a list of available commands to the player.
     """
     print("\n=== Available Commands ===\n")
-    print("  new                 - Start a new game, erasing current progress.")
+    print("  new                 - Start a new game in a fresh save slot.")
     print("  look                - Describe your current surroundings, including NPCs, items, and possible paths.")
     print("  image               - Generate an image for the current location using AI.")
     print("  stats               - Show your current stats including HP, level, attack power, and XP.")
@@ -1044,82 +1405,362 @@ def show_help():
     print("  voice               - Enable or disable voice output for game text.")
     print("  goal                - Display the current quest and progress of the game.")
     print("  map                 - Display the visual map of the game's world.")
+    print("  perf                - Show command latency statistics ('perf profile on', 'perf memory dump').")
+    print("  tasks               - List background jobs that are still running.")
+    print("  undo                - Take back your last command ('redo' puts it back).")
+    print("  saves               - List your save slots.")
+    print("  save [slot]         - Save the game, optionally to a named slot that becomes the current one.")
+    print("  load <slot>         - Switch to another save slot.")
     print("  quit                - Exit the game. Progress will be saved.")
     print("\nType 'help' anytime to see this list again.")
 
-def game_loop():
+def start_game():
     """
-    Main game loop that processes player commands and updates the game state.
+    Prepares the session for play: checks for a finished game, starts background
+    generation around the player, warms the speech cache and greets the player.
     """
     check_game_state_before_start()
+    game_state = current_session().game_state
+    expand_around(game_state["locations"], game_state["player"]["location"])
+    prefetch_descriptions(game_state["player"]["location"])
+
+    if use_voice and current_session().use_voice and audio_cache is not None:
+        with current_session().speech_lock:
+            audio_cache.warm(COMMON_PHRASES)
 
-    speak("\nWelcome to the AI Dungeon Master Adventure Game!")
-    speak("Embark on a journey through dark forests, mystical lakes, and ancient ruins in search of hidden treasures and legendary artifacts.")
-    speak("Face challenging enemies, level up your skills, and strategically use items to survive the dangers that await.")
-    speak("\nType 'help' to see available commands. Good luck, adventurer!")
+    for message in WELCOME_MESSAGES:
+        speak(message)
+
+def run_command(command):
+    """
+    Runs one player command under a latency trace and records the state it leaves for undo.
+    """
+    session = current_session()
+    session.history.begin(session.game_state)
+    traced_name = command[0] if command[0] in COMMANDS else "unknown"
+    try:
+        with command_trace(traced_name):
+            handle_command(command)
+    except CommandRewound:
+        print("\nYou take back your last command.")
+        return
+    if command[0] not in ("undo", "redo"):
+        session.history.record(session.game_state, " ".join(command))
 
+def game_loop():
+    """
+    Main game loop that processes player commands and updates the game state.
+    Used by the game server, where each player's loop has a thread of its own.
+    """
+    start_game()
     while True:
+        for message in current_session().drain_notifications():
+            print(f"\n{message}")
         command = input("\n> ").lower().split()
         if not command:
             continue
-        action = command[0]
+        run_command(command)
 
-        if action == "new":
-            start_new_game()
-        elif action == "quit":
-            exit_game()
-        elif action == "look":
-            describe_location()
-        elif action == "stats":
-            display_player_stats()
-        elif action == "inventory":
-            display_inventory()
-        elif action == "goal":
-            display_goal()
-        elif action == "back":
-            move_back()
-        elif action == "help":
-            show_help()
-        elif action == "voice":
-            toggle_voice()
-        elif action == "image":
-            generate_location_image()
-        elif action == "talk":
-            talk_to_npc()
-        elif action == "fight":
-            engage_combat()
-        elif action == "map":
-            display_map()
-        elif action == "pick":
-            if len(command) > 1:
-                print("Invalid action. Use 'pick' without specifying an item to select items from the menu.")
-            else:
-                pick_specific_item()
-        elif action == "use":
-            if len(command) > 1:
-                use_item(command[1])
-            else:
-                print("Specify an item to use. For example, 'use potion'.")
-        elif action == "drop":
-            if len(command) > 1:
-                drop_item(command[1])
-            else:
-                print("Specify an item to drop. For example, 'drop potion'.")
-        elif action == "move":
-            if len(command) > 1:
-                direction = command[1]
-                move_player(direction)
-            else:
-                move_player()
-        elif action == "unlock":
-            handle_unlock_command(command)
+async def game_loop_async(console):
+    """
+    Main game loop on asyncio. The prompt is awaited on the event loop, so background
+    jobs keep running and report back while the player is thinking. Each command runs
+    on a worker thread; its own prompts (combat, traps, conversations) are answered
+    through the console.
+    """
+    await asyncio.to_thread(start_game)
+    while True:
+        line = await console.read_line("\n> ")
+        if not line:
+            await asyncio.to_thread(exit_game)
+        command = line.lower().split()
+        if not command:
+            continue
+        await asyncio.to_thread(run_command, command)
+
+async def play_in_console(session):
+    """
+    Hosts a session in this terminal on an event loop until the player quits.
+    """
+    console = AsyncConsole(asyncio.get_running_loop(), sys.stdin, sys.stdout, session)
+    session.stdin = console
+    session.stdout = console.output
+    session.tasks.loop = asyncio.get_running_loop()
+    install_session_streams()
+    console.start()
+    try:
+        await game_loop_async(console)
+    except (SystemExit, EOFError):
+        pass
+    finally:
+        console.stop()
+        session.tasks.cancel_all()
+        session.tasks.loop = None
+
+def handle_command(command):
+    """
+    Dispatches a single player command.
+    """
+    action = command[0]
+
+    if action == "new":
+        start_new_game()
+    elif action == "quit":
+        exit_game()
+    elif action == "look":
+        describe_location()
+        prefetch_greetings(current_session().game_state["player"]["location"])
+    elif action == "stats":
+        display_player_stats()
+    elif action == "inventory":
+        display_inventory()
+    elif action == "goal":
+        display_goal()
+    elif action == "back":
+        move_back()
+    elif action == "help":
+        show_help()
+    elif action == "voice":
+        toggle_voice()
+    elif action == "image":
+        generate_location_image()
+    elif action == "talk":
+        talk_to_npc()
+    elif action == "fight":
+        engage_combat()
+    elif action == "map":
+        display_map()
+    elif action == "pick":
+        if len(command) > 1:
+            print("Invalid action. Use 'pick' without specifying an item to select items from the menu.")
         else:
-            print("Unknown command. Type 'help' to see available actions.")
+            pick_specific_item()
+    elif action == "use":
+        if len(command) > 1:
+            use_item(command[1])
+        else:
+            print("Specify an item to use. For example, 'use potion'.")
+    elif action == "drop":
+        if len(command) > 1:
+            drop_item(command[1])
+        else:
+            print("Specify an item to drop. For example, 'drop potion'.")
+    elif action == "move":
+        if len(command) > 1:
+            direction = command[1]
+            move_player(direction)
+        else:
+            move_player()
+    elif action == "unlock":
+        handle_unlock_command(command)
+    elif action == "perf":
+        handle_perf_command(command)
+    elif action == "tasks":
+        display_tasks()
+    elif action == "saves":
+        list_save_slots()
+    elif action == "save":
+        save_to_slot(command)
+    elif action == "load":
+        load_from_slot(command)
+    elif action == "undo":
+        undo_last_command()
+    elif action == "redo":
+        redo_last_command()
+    else:
+        print("Unknown command. Type 'help' to see available actions.")
+
+def print_scheduler_status():
+    """
+    Prints queued, in-flight and cancelled AI requests per priority class.
+    Queue wait percentiles appear in the span table as queue.<class>.
+    """
+    print("\n=== AI Request Queue ===")
+    print(f"{'Class':<22}{'Queued':>8}{'Running':>9}{'Cancelled':>11}")
+    for priority, counts in scheduler.status().items():
+        print(f"{priority:<22}{counts['queued']:>8}{counts['in_flight']:>9}{counts['cancelled']:>11}")
+
+def print_model_table():
+    """
+    Prints the observed latency, token usage and failure rate per call site and model.
+    """
+    print("\n=== Model Routing ===")
+    print(f"{'Site':<20}{'Model':<16}{'Calls':>7}{'Fail %':>8}{'Latency s':>11}{'Avg tokens':>12}")
+    for site, model, calls, failure_rate, latency, tokens in router.table():
+        print(f"{site:<20}{model:<16}{calls:>7}{failure_rate * 100:>8.1f}{latency:>11.2f}{tokens:>12.0f}")
+    for site, route in router.routes.items():
+        upgrade = f", promoted to {route['upgrade']} within budget" if route.get("upgrade") else ""
+        print(f"{site}: {route['model']}, falls back to {route['fallback'] or '-'} over {route['latency_budget'] or '-'} s{upgrade}")
+
+def handle_perf_command(command):
+    """
+    Shows latency statistics or toggles profiling and memory tracing.
+    """
+    if len(command) == 1:
+        instrumentation.print_report()
+        print_scheduler_status()
+        print_model_table()
+    elif command[1] == "reset":
+        instrumentation.reset()
+        print("Performance statistics cleared.")
+    elif command[1] == "profile" and len(command) > 2 and command[2] in ("on", "off"):
+        instrumentation.set_profiling(command[2] == "on")
+        print(f"Per-command profiling is now {command[2]}. Profiles are written to '{instrumentation.REPORT_FOLDER}/'.")
+    elif command[1] == "memory" and len(command) > 2 and command[2] in ("on", "off"):
+        instrumentation.set_memory_tracing(command[2] == "on")
+        print(f"Memory tracing is now {command[2]}.")
+    elif command[1] == "memory" and len(command) > 2 and command[2] == "dump":
+        file_path = instrumentation.dump_memory_snapshot()
+        if file_path:
+            print(f"Memory snapshot written to {file_path}.")
+        else:
+            print("Memory tracing is off. Use 'perf memory on' first.")
+    else:
+        print("Usage: perf [reset | profile on|off | memory on|off|dump]")
+
+def open_active_slot(session):
+    """
+    Points the session at the active save slot. A game_state.json from before save slots
+    existed is copied into a 'default' slot.
+    """
+    slots = session.slots
+    slot = slots.active
+    if slot is None or not slots.exists(slot):
+        slot = "default"
+        if not os.path.exists(slots.path_for(slot)) and os.path.exists(session.save_file):
+            slots.adopt(slot, session.save_file)
+        slots.activate(slot)
+    session.slot = slot
+    session.save_file = slots.path_for(slot)
+
+def switch_slot(session, slot):
+    """
+    Makes a slot the session's current one, saves the game there and applies the retention policy.
+    """
+    session.slot = slot
+    session.save_file = session.slots.path_for(slot)
+    session.save(force=True)
+    session.slots.activate(slot)
+    for removed in session.slots.prune():
+        print(f"Removed old save slot '{removed}'.")
+
+def list_save_slots():
+    """
+    Lists the save slots from the slot index, without opening any save file.
+    """
+    session = current_session()
+    if session.slots is None:
+        print("Save slots are not available in this game.")
+        return
+    entries = session.slots.entries()
+    if not entries:
+        print("There are no save slots yet. Use 'save <slot>' to create one.")
+        return
+    print("\n=== Save Slots ===")
+    print(f"  {'Slot':<24}{'Level':>6}  {'Location':<24}{'Quests':>7}  {'Updated':<17}{'Size':>9}")
+    for entry in entries:
+        marker = "*" if entry["slot"] == session.slot else " "
+        quests = f"{entry['quests_completed']}/{entry['quests_total']}"
+        updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["updated"]))
+        location = entry["location"].replace("_", " ").title()
+        print(f"{marker} {entry['slot']:<24}{entry['level']:>6}  {location:<24}{quests:>7}  {updated:<17}{entry['size'] / 1024:>7.1f} KB")
+
+def save_to_slot(command):
+    """
+    Saves the game to the current slot, or to a named slot that becomes the current one.
+    """
+    session = current_session()
+    if session.slots is None:
+        session.save()
+        print("Game saved.")
+        return
+    if len(command) == 1:
+        session.save(force=True)
+        print(f"Game saved to slot '{session.slot}'.")
+        return
+    slot = slot_name(" ".join(command[1:]))
+    if not slot:
+        print("Invalid slot name. Use letters, numbers, '-' and '_'.")
+        return
+    switch_slot(session, slot)
+    print(f"Game saved to slot '{slot}'. Further progress is saved there.")
+
+def load_from_slot(command):
+    """
+    Saves the current game and switches to another save slot.
+    """
+    session = current_session()
+    if session.slots is None:
+        print("Save slots are not available in this game.")
+        return
+    if len(command) == 1:
+        print("Specify a slot to load, for example 'load my_run'. Type 'saves' to list them.")
+        return
+    slot = slot_name(" ".join(command[1:]))
+    if slot == session.slot:
+        print(f"You are already playing slot '{slot}'.")
+        return
+    if not session.slots.exists(slot):
+        print(f"There is no save slot named '{slot}'.")
+        return
+    game_state = load_game_state(session.slots.path_for(slot))
+    if game_state is None:
+        print(f"Error: Could not read save slot '{slot}'.")
+        return
+    session.save(force=True)
+    session.game_state = game_state
+    session.greetings = {}
+    session.slot = slot
+    session.save_file = session.slots.path_for(slot)
+    session.slots.activate(slot)
+    location = game_state["player"]["location"]
+    expand_around(game_state["locations"], location)
+    prefetch_descriptions(location)
+    print(f"Loaded slot '{slot}'. You are at {location.replace('_', ' ').title()}.")
+
+def undo_last_command():
+    """
+    Restores the game to how it was before the last command that changed it.
+    """
+    session = current_session()
+    label = session.history.undo(session.game_state)
+    if label is None:
+        print("There is nothing to undo.")
+        return
+    session.save()
+    location = session.game_state["player"]["location"]
+    print(f"Undid '{label}'. You are back at {location.replace('_', ' ').title()}.")
+
+def redo_last_command():
+    """
+    Re-applies the last undone command.
+    """
+    session = current_session()
+    label = session.history.redo(session.game_state)
+    if label is None:
+        print("There is nothing to redo.")
+        return
+    session.save()
+    location = session.game_state["player"]["location"]
+    print(f"Redid '{label}'. You are at {location.replace('_', ' ').title()}.")
+
+def display_tasks():
+    """
+    Lists the session's background jobs that are still running.
+    """
+    running = current_session().tasks.running()
+    if not running:
+        print("No background tasks are running.")
+        return
+    print("\n=== Background Tasks ===")
+    for name, seconds in running:
+        print(f"  {name.replace('_', ' ').title():<40}{seconds:>8.1f} s")
 
 def handle_unlock_command(command):
     """
     Handles the unlock command to attempt unlocking a path.
     """
+    game_state = current_session().game_state
     current_location = game_state["player"]["location"]
     if len(command) == 1:
         locked_paths = {
@@ -1146,5 +1787,17 @@ def handle_unlock_command(command):
     else:
         print(f"There is no door in the {direction} direction.")
 
+def main():
+    """
+    Runs a single-player game in this terminal from the active save slot.
+    """
+    session = GameSession("local")
+    session.slots = SaveSlots()
+    open_active_slot(session)
+    activate_session(session)
+    load_or_initialize_game()
+    session.save(force=True)
+    asyncio.run(play_in_console(session))
+
 if __name__ == "__main__":
-    game_loop()
+    main()
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import time
+from request_scheduler import RequestCancelled
+
+STATS_FILE = "model_stats.json"
+MIN_SAMPLES = 5
+PROBE_EVERY = 10
+MAX_FAILURE_RATE = 0.5
+SMOOTHING = 0.2
+SAVE_INTERVAL = 5.0
+
+DEFAULT_ROUTES = {
+    "description": {"model": "gpt-3.5-turbo", "fallback": None, "upgrade": "gpt-4", "latency_budget": 4.0},
+    "description_batch": {"model": "gpt-4", "fallback": "gpt-3.5-turbo", "upgrade": None, "latency_budget": 15.0},
+    "npc_response": {"model": "gpt-3.5-turbo", "fallback": None, "upgrade": "gpt-4", "latency_budget": 3.0},
+    "world_generation": {"model": "gpt-4", "fallback": None, "upgrade": None, "latency_budget": None},
+}
+
+def load_routes():
+    """
+    Returns the routing table, with MODEL_<SITE>, MODEL_<SITE>_FALLBACK, MODEL_<SITE>_UPGRADE
+    and MODEL_<SITE>_BUDGET environment variables overriding the defaults.
+    """
+    routes = {}
+    for site, route in DEFAULT_ROUTES.items():
+        prefix = f"MODEL_{site.upper()}"
+        budget = os.getenv(f"{prefix}_BUDGET")
+        routes[site] = {
+            "model": os.getenv(prefix, route["model"]),
+            "fallback": os.getenv(f"{prefix}_FALLBACK", route["fallback"]) or None,
+            "upgrade": os.getenv(f"{prefix}_UPGRADE", route["upgrade"]) or None,
+            "latency_budget": float(budget) if budget else route["latency_budget"],
+        }
+    return routes
+
+class ModelRouter:
+    """
+    Picks a model for each AI call site from measured latency and failure rates.
+    A site uses its configured model until that model's smoothed latency exceeds the
+    site's budget or its smoothed failure rate passes MAX_FAILURE_RATE, then switches
+    to the fallback model. Every
+    PROBE_EVERY-th call still goes to the configured model so it can recover.
+    Latency-sensitive sites start on a fast model and are promoted to their upgrade model
+    while its smoothed latency stays within the budget; every PROBE_EVERY-th call measures
+    the model that is not in use.
+    """
+
+    def __init__(self, routes, stats_file=STATS_FILE):
+        self.routes = routes
+        self.stats_file = stats_file
+        self.stats = self._load()
+        self.decisions = {}
+        self.last_saved = 0.0
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.stats_file, "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        """
+        Writes the observed statistics to disk.
+        """
+        with self.lock:
+            document = json.dumps(self.stats, indent=4)
+            self.last_saved = time.monotonic()
+        temp_path = f"{self.stats_file}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(document)
+        os.replace(temp_path, self.stats_file)
+
+    def _entry(self, site, model):
+        return self.stats.setdefault(f"{site}/{model}", {
+            "calls": 0, "failures": 0, "failure_ewma": 0.0, "latency_ewma": 0.0, "latency_total": 0.0, "tokens_total": 0,
+        })
+
+    def _failure_rate(self, entry):
+        return entry["failures"] / entry["calls"] if entry["calls"] else 0.0
+
+    def choose(self, site):
+        """
+        Returns the model to use for the next call at a site.
+        """
+        route = self.routes[site]
+        primary, fallback, budget = route["model"], route["fallback"], route["latency_budget"]
+        upgrade = route.get("upgrade")
+        with self.lock:
+            count = self.decisions.get(site, 0) + 1
+            self.decisions[site] = count
+            current = dict(self._entry(site, primary))
+            alternative = dict(self._entry(site, fallback)) if fallback else None
+            better = dict(self._entry(site, upgrade)) if upgrade else None
+        probe = count % PROBE_EVERY == 0
+        if better is not None and upgrade != primary and budget is not None:
+            promoted = (better["calls"] >= MIN_SAMPLES and better["latency_ewma"] <= budget
+                        and better["failure_ewma"] <= MAX_FAILURE_RATE)
+            if promoted != probe:
+                return upgrade
+        if not fallback or fallback == primary:
+            return primary
+        if current["calls"] < MIN_SAMPLES or probe:
+            return primary
+        too_slow = budget is not None and current["latency_ewma"] > budget
+        unreliable = current["failure_ewma"] > MAX_FAILURE_RATE
+        if not (too_slow or unreliable):
+            return primary
+        if alternative["calls"] < MIN_SAMPLES:
+            return fallback
+        if alternative["failure_ewma"] <= MAX_FAILURE_RATE and (unreliable or alternative["latency_ewma"] < current["latency_ewma"]):
+            return fallback
+        return primary
+
+    def record(self, site, model, latency=None, tokens=0, failed=False):
+        """
+        Adds one observed call to the statistics table.
+        """
+        with self.lock:
+            entry = self._entry(site, model)
+            entry["calls"] += 1
+            entry["failure_ewma"] = SMOOTHING * (1.0 if failed else 0.0) + (1 - SMOOTHING) * entry.get("failure_ewma", 0.0)
+            if failed:
+                entry["failures"] += 1
+            else:
+                successes = entry["calls"] - entry["failures"]
+                entry["latency_ewma"] = latency if successes == 1 else (
+                    SMOOTHING * latency + (1 - SMOOTHING) * entry["latency_ewma"]
+                )
+                entry["latency_total"] += latency
+                entry["tokens_total"] += tokens
+            due = time.monotonic() - self.last_saved >= SAVE_INTERVAL
+        if due:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Error saving model statistics: {e}")
+
+    def timed(self, site, function, *args, **kwargs):
+        """
+        Calls function(*args, **kwargs) and records its latency, token usage or failure
+        against the model named in kwargs.
+        """
+        model = kwargs.get("model")
+        start = time.perf_counter()
+        try:
+            response = function(*args, **kwargs)
+        except Exception:
+            self.record(site, model, failed=True)
+            raise
+        usage = getattr(response, "usage", None)
+        self.record(site, model, time.perf_counter() - start, getattr(usage, "total_tokens", 0) or 0)
+        return response
+
+    def complete(self, site, attempt):
+        """
+        Runs attempt(model) with the chosen model, retrying once if it fails: on the
+        configured model after a promoted call, otherwise on the fallback model.
+        """
+        model = self.choose(site)
+        try:
+            return attempt(model)
+        except RequestCancelled:
+            raise
+        except Exception:
+            route = self.routes[site]
+            fallback = route["model"] if model == route.get("upgrade") else route["fallback"]
+            if not fallback or fallback == model:
+                raise
+            return attempt(fallback)
+
+    def table(self):
+        """
+        Returns (site, model, calls, failure rate, smoothed latency, average tokens) rows.
+        """
+        with self.lock:
+            snapshot = {key: dict(entry) for key, entry in self.stats.items()}
+        rows = []
+        for key, entry in sorted(snapshot.items()):
+            site, model = key.split("/", 1)
+            successes = entry["calls"] - entry["failures"]
+            average_tokens = entry["tokens_total"] / successes if successes else 0.0
+            rows.append((site, model, entry["calls"], self._failure_rate(entry), entry["latency_ewma"], average_tokens))
+        return rows
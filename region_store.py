@@ -0,0 +1,249 @@
+import json
+import os
+import threading
+from collections import Counter, OrderedDict, deque
+from collections.abc import Mapping
+
+REGION_SIZE = int(os.getenv("WORLD_REGION_SIZE", "256"))
+RESIDENT_REGIONS = int(os.getenv("WORLD_RESIDENT_REGIONS", "16"))
+INDEX_FILE = "index.json"
+
+def partition_regions(locations, region_size=REGION_SIZE):
+    """
+    Splits locations into regions of graph neighbours by growing each region breadth-first.
+    Returns a mapping of location name to region id.
+    """
+    location_region = {}
+    region_id = 0
+    for seed in locations:
+        if seed in location_region:
+            continue
+        members = 0
+        queue = deque([seed])
+        while queue and members < region_size:
+            current = queue.popleft()
+            if current in location_region:
+                continue
+            location_region[current] = region_id
+            members += 1
+            for neighbour in locations[current].get("connections", {}).values():
+                if neighbour in locations and neighbour not in location_region:
+                    queue.append(neighbour)
+        region_id += 1
+    return location_region
+
+def build_index(locations, location_region, quests=None, expansion=None):
+    """
+    Builds the global index: region membership, region adjacency, and where the
+    NPCs and items named by quests live, so quest checks never load every region.
+    """
+    quests = quests or {}
+    tracked_npcs = {npc for quest in quests.values() for npc in quest.get("required_npcs", [])}
+    tracked_items = {item for quest in quests.values() for item in quest.get("required_items", [])}
+
+    region_neighbours = {}
+    npc_locations = {}
+    item_locations = {}
+    for name, data in locations.items():
+        region = location_region[name]
+        neighbours = region_neighbours.setdefault(str(region), set())
+        for target in data.get("connections", {}).values():
+            target_region = location_region.get(target)
+            if target_region is not None and target_region != region:
+                neighbours.add(target_region)
+        for npc in data.get("npcs", {}):
+            if npc in tracked_npcs:
+                npc_locations.setdefault(npc, []).append(name)
+        for item in data.get("items", {}):
+            if item in tracked_items:
+                item_locations.setdefault(item, []).append(name)
+
+    index = {
+        "location_region": location_region,
+        "region_neighbours": {region: sorted(neighbours) for region, neighbours in region_neighbours.items()},
+        "npc_locations": {npc: npc_locations.get(npc, []) for npc in sorted(tracked_npcs)},
+        "item_locations": {item: item_locations.get(item, []) for item in sorted(tracked_items)},
+    }
+    if expansion is not None:
+        index["expansion"] = expansion
+    return index
+
+class RegionStore(Mapping):
+    """
+    Read-only mapping of location name to frozen location data, backed by one chunk file
+    per region. Only recently used regions stay in memory, up to the resident budget.
+    """
+
+    def __init__(self, folder, freeze, max_resident=RESIDENT_REGIONS):
+        self.folder = folder
+        self.freeze = freeze
+        self.max_resident = max(1, max_resident)
+        with open(os.path.join(folder, INDEX_FILE), "r") as file:
+            self.index = json.load(file)
+        self.location_region = self.index["location_region"]
+        self.region_sizes = Counter(self.location_region.values())
+        self.resident = OrderedDict()
+        self.lock = threading.RLock()
+
+    @classmethod
+    def create(cls, folder, locations, freeze, quests=None, expansion=None, region_size=REGION_SIZE):
+        """
+        Partitions a full world into region chunk files plus the global index.
+        """
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        location_region = partition_regions(locations, region_size)
+        chunks = {}
+        for name, region in location_region.items():
+            chunks.setdefault(region, {})[name] = locations[name]
+        for region, chunk in chunks.items():
+            _write_json(os.path.join(folder, f"region_{region}.json"), chunk)
+        _write_json(os.path.join(folder, INDEX_FILE), build_index(locations, location_region, quests, expansion))
+        return cls(folder, freeze)
+
+    def region_of(self, name):
+        return self.location_region[name]
+
+    def _region_path(self, region):
+        return os.path.join(self.folder, f"region_{region}.json")
+
+    def _load_region(self, region):
+        """
+        Returns a resident region, reading its chunk file and evicting the least recently used region if needed.
+        """
+        with self.lock:
+            entry = self.resident.get(region)
+            if entry is not None:
+                self.resident.move_to_end(region)
+                return entry
+            with open(self._region_path(region), "r") as file:
+                raw = json.load(file)
+            entry = (raw, {name: self.freeze(data) for name, data in raw.items()})
+            self.resident[region] = entry
+            self._evict()
+            return entry
+
+    def _evict(self):
+        while len(self.resident) > self.max_resident:
+            self.resident.popitem(last=False)
+
+    def __getitem__(self, name):
+        region = self.location_region[name]
+        return self._load_region(region)[1][name]
+
+    def __iter__(self):
+        return iter(list(self.location_region))
+
+    def __len__(self):
+        return len(self.location_region)
+
+    def __contains__(self, name):
+        return name in self.location_region
+
+    def regions_around(self, name):
+        """
+        Returns the neighbouring regions of a location's region that fit in the resident
+        budget, followed by the region itself; empty if the location is unknown.
+        """
+        region = self.location_region.get(name)
+        if region is None:
+            return []
+        return self.index["region_neighbours"].get(str(region), [])[: self.max_resident - 1] + [region]
+
+    def prefetch_around(self, name):
+        """
+        Makes the region holding a location and its neighbouring regions resident.
+        The location's own region is touched last so it is the most recently used.
+        """
+        for region in self.regions_around(name):
+            self._load_region(region)
+
+    def names_around(self, name):
+        """
+        Returns the locations in a location's region and its neighbouring regions, read
+        from the index, after making those regions resident. Nothing else is loaded.
+        """
+        regions = set(self.regions_around(name))
+        self.prefetch_around(name)
+        return [location for location, region in self.location_region.items() if region in regions]
+
+    def update_location(self, name, field, value):
+        """
+        Sets a field on a location and rewrites its region chunk.
+        """
+        with self.lock:
+            region = self.location_region[name]
+            raw, frozen = self._load_region(region)
+            raw[name][field] = value
+            frozen[name] = self.freeze(raw[name])
+            _write_json(self._region_path(region), raw)
+
+    def replace_location(self, name, data):
+        """
+        Replaces a whole location and rewrites its region chunk.
+        """
+        with self.lock:
+            region = self.location_region[name]
+            raw, frozen = self._load_region(region)
+            raw[name] = data
+            frozen[name] = self.freeze(data)
+            _write_json(self._region_path(region), raw)
+            self._track(name, data)
+
+    def add_location(self, name, data, near, region_size=REGION_SIZE):
+        """
+        Adds a new location to the region of a neighbouring location, or opens a new
+        region once that one is full. Call save_index() after a batch of additions.
+        """
+        with self.lock:
+            region = self.location_region[near]
+            if self.region_sizes[region] >= region_size:
+                new_region = max(self.region_sizes) + 1
+                neighbours = self.index["region_neighbours"]
+                neighbours.setdefault(str(region), []).append(new_region)
+                neighbours.setdefault(str(new_region), []).append(region)
+                region = new_region
+                raw, frozen = {}, {}
+                self.resident[region] = (raw, frozen)
+                self._evict()
+            else:
+                raw, frozen = self._load_region(region)
+            raw[name] = data
+            frozen[name] = self.freeze(data)
+            self.location_region[name] = region
+            self.region_sizes[region] += 1
+            _write_json(self._region_path(region), raw)
+            self._track(name, data)
+
+    def _track(self, name, data):
+        for npc, found in self.index["npc_locations"].items():
+            if npc in data.get("npcs", {}) and name not in found:
+                found.append(name)
+        for item, found in self.index["item_locations"].items():
+            if item in data.get("items", {}) and name not in found:
+                found.append(name)
+
+    def save_index(self):
+        """
+        Writes the global index after locations were added or replaced.
+        """
+        with self.lock:
+            _write_json(os.path.join(self.folder, INDEX_FILE), self.index)
+
+    def locations_with_npc(self, npc):
+        """
+        Returns the locations holding a quest NPC, or None if the index does not track it.
+        """
+        return self.index["npc_locations"].get(npc)
+
+    def locations_with_item(self, item):
+        """
+        Returns the locations holding a quest item, or None if the index does not track it.
+        """
+        return self.index["item_locations"].get(item)
+
+def _write_json(file_path, document):
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(document, file)
+    os.replace(temp_path, file_path)
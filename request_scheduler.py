@@ -0,0 +1,175 @@
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from collections import Counter
+from instrumentation import record_timing
+
+PRIORITIES = {"interactive": 0, "prefetch": 1, "bulk": 2}
+STALE_AFTER = {"interactive": None, "prefetch": 30.0, "bulk": 300.0}
+
+_request_class = contextvars.ContextVar("request_class", default=("interactive", None))
+
+class RequestCancelled(Exception):
+    """
+    Raised when a queued request is cancelled or goes stale before it runs.
+    """
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """
+        Returns how many seconds until a token is available.
+        """
+        self._refill()
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+class Ticket:
+    def __init__(self, provider, priority, tag, sequence):
+        self.provider = provider
+        self.priority = priority
+        self.tag = tag
+        self.sequence = sequence
+        self.enqueued = time.monotonic()
+        stale_after = STALE_AFTER.get(priority)
+        self.expires = self.enqueued + stale_after if stale_after else None
+        self.cancelled = False
+
+    def order(self):
+        return (PRIORITIES[self.priority], self.sequence)
+
+@contextmanager
+def request_class(priority, tag=None):
+    """
+    Runs AI calls made inside the block at the given priority, tagged for cancellation.
+    """
+    token = _request_class.set((priority, tag))
+    try:
+        yield
+    finally:
+        _request_class.reset(token)
+
+class RequestScheduler:
+    """
+    Admits AI requests in priority order (interactive, then prefetch, then bulk),
+    within per-provider token buckets and a cap on requests in flight.
+    Background classes never take the last slot, so an interactive call always has room.
+    """
+
+    def __init__(self, buckets, max_in_flight=4):
+        self.buckets = buckets
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = Counter()
+        self.queue = []
+        self.cancelled = Counter()
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+
+    def _slots_for(self, priority):
+        if priority == "interactive" or self.max_in_flight == 1:
+            return self.max_in_flight
+        return self.max_in_flight - 1
+
+    def _ready(self, ticket):
+        """
+        Returns 0 if the ticket may start now, otherwise a suggested wait in seconds (None to wait for a notify).
+        """
+        for other in self.queue:
+            if other is ticket:
+                break
+            if other.provider == ticket.provider:
+                return None
+        running = sum(self.in_flight.values())
+        background = running - self.in_flight["interactive"]
+        if running >= self.max_in_flight:
+            return None
+        if ticket.priority != "interactive" and background >= self._slots_for(ticket.priority):
+            return None
+        bucket = self.buckets.get(ticket.provider)
+        return bucket.delay() if bucket is not None else 0.0
+
+    def run(self, provider, function, *args, priority=None, **kwargs):
+        """
+        Waits for a slot, then calls function(*args, **kwargs) and returns its result.
+        The priority defaults to the class set by the surrounding request_class block.
+        """
+        current_priority, tag = _request_class.get()
+        priority = priority or current_priority
+        with self.condition:
+            ticket = Ticket(provider, priority, tag, next(self.sequence))
+            self.queue.append(ticket)
+            self.queue.sort(key=Ticket.order)
+            try:
+                while True:
+                    if ticket.expires is not None and time.monotonic() > ticket.expires:
+                        ticket.cancelled = True
+                    if ticket.cancelled:
+                        self.cancelled[priority] += 1
+                        raise RequestCancelled(f"{priority} request to {provider} was cancelled")
+                    delay = self._ready(ticket)
+                    if delay == 0:
+                        break
+                    if ticket.expires is not None:
+                        remaining = max(0.0, ticket.expires - time.monotonic())
+                        delay = remaining if delay is None else min(delay, remaining)
+                    self.condition.wait(delay)
+            finally:
+                self.queue.remove(ticket)
+                self.condition.notify_all()
+            bucket = self.buckets.get(provider)
+            if bucket is not None:
+                bucket.take()
+            self.in_flight[priority] += 1
+        record_timing(f"queue.{priority}", time.monotonic() - ticket.enqueued)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            with self.condition:
+                self.in_flight[priority] -= 1
+                self.condition.notify_all()
+
+    def cancel(self, tag=None, priorities=("prefetch", "bulk")):
+        """
+        Cancels queued requests of the given classes, optionally only those with a tag.
+        Requests already in flight finish normally.
+        """
+        with self.condition:
+            count = 0
+            for ticket in self.queue:
+                if ticket.priority in priorities and (tag is None or ticket.tag == tag) and not ticket.cancelled:
+                    ticket.cancelled = True
+                    count += 1
+            self.condition.notify_all()
+        return count
+
+    def status(self):
+        """
+        Returns queued, in-flight and cancelled counts per priority class.
+        """
+        with self.condition:
+            queued = Counter(ticket.priority for ticket in self.queue)
+            return {
+                priority: {"queued": queued[priority], "in_flight": self.in_flight[priority], "cancelled": self.cancelled[priority]}
+                for priority in PRIORITIES
+            }
@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+SAVE_SLOT_FOLDER = os.getenv("SAVE_SLOT_FOLDER", "save_slots")
+SAVE_SLOT_RETENTION = int(os.getenv("SAVE_SLOT_RETENTION", "10"))
+SAVE_SLOT_MAX_AGE_DAYS = float(os.getenv("SAVE_SLOT_MAX_AGE_DAYS", "0"))
+INDEX_FILE = "index.json"
+INDEX_INTERVAL = 5.0
+
+def slot_name(name):
+    """
+    Turns a player-supplied slot name into a safe file name, or returns an empty string.
+    """
+    return re.sub(r"[^a-z0-9_\-]", "", name.strip().lower().replace(" ", "_"))[:32]
+
+def slot_summary(game_state):
+    """
+    Returns the index fields describing a game: level, location and quest progress.
+    """
+    quests = game_state.get("quests", {})
+    return {
+        "level": game_state["player"].get("level", 1),
+        "location": game_state["player"]["location"],
+        "quests_completed": sum(1 for quest in quests.values() if quest.get("completed", False)),
+        "quests_total": len(quests),
+    }
+
+class SaveSlots:
+    """
+    Named save files in one folder, described by a small index.json so the slots can be
+    listed without parsing any save. The index remembers the active slot, and slots
+    beyond the retention policy are pruned oldest first; the active slot is never pruned.
+    """
+
+    def __init__(self, folder=SAVE_SLOT_FOLDER, retention=SAVE_SLOT_RETENTION, max_age_days=SAVE_SLOT_MAX_AGE_DAYS):
+        self.folder = folder
+        self.retention = retention
+        self.max_age_days = max_age_days
+        self.index_path = os.path.join(folder, INDEX_FILE)
+        self.lock = threading.Lock()
+        self.last_written = 0.0
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r") as file:
+                index = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"active": None, "slots": {}}
+        index.setdefault("active", None)
+        index.setdefault("slots", {})
+        return index
+
+    def _save_index(self):
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.index, file, indent=4)
+        os.replace(temp_path, self.index_path)
+        self.last_written = time.monotonic()
+
+    @property
+    def active(self):
+        return self.index["active"]
+
+    def path_for(self, slot):
+        return os.path.join(self.folder, f"{slot}.json")
+
+    def exists(self, slot):
+        return slot in self.index["slots"] and os.path.exists(self.path_for(slot))
+
+    def entries(self):
+        """
+        Returns the index entries, most recently updated first.
+        """
+        with self.lock:
+            entries = [dict(entry) for entry in self.index["slots"].values()]
+        return sorted(entries, key=lambda entry: entry["updated"], reverse=True)
+
+    def record(self, slot, game_state, force=False):
+        """
+        Updates a slot's index entry after its file was saved. Routine autosaves only
+        rewrite the index every INDEX_INTERVAL seconds; pass force for explicit saves.
+        """
+        file_path = self.path_for(slot)
+        now = time.time()
+        with self.lock:
+            entry = self.index["slots"].setdefault(slot, {"slot": slot, "file": file_path, "created": now})
+            entry.update(slot_summary(game_state))
+            entry["updated"] = now
+            entry["size"] = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            if force or time.monotonic() - self.last_written >= INDEX_INTERVAL:
+                self._save_index()
+
+    def activate(self, slot):
+        with self.lock:
+            self.index["active"] = slot
+            self._save_index()
+
+    def adopt(self, slot, file_path):
+        """
+        Copies a save from outside the folder (such as a pre-slot game_state.json) into a slot.
+        """
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        shutil.copyfile(file_path, self.path_for(slot))
+
+    def prune(self):
+        """
+        Deletes slots beyond the retention count or older than the maximum age and
+        returns their names. The active slot is always kept.
+        """
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days > 0 else None
+        removed = []
+        with self.lock:
+            ordered = sorted(self.index["slots"].values(), key=lambda entry: entry["updated"], reverse=True)
+            kept = 0
+            for entry in ordered:
+                slot = entry["slot"]
+                if slot == self.index["active"]:
+                    kept += 1
+                    continue
+                if kept < self.retention and (cutoff is None or entry["updated"] >= cutoff):
+                    kept += 1
+                    continue
+                try:
+                    os.remove(self.path_for(slot))
+                except FileNotFoundError:
+                    pass
+                del self.index["slots"][slot]
+                removed.append(slot)
+            if removed:
+                self._save_index()
+        return removed
@@ -0,0 +1,168 @@
+import os
+from collections import deque
+from collections.abc import Mapping
+from types import MappingProxyType
+from world_template import thaw
+
+DEFAULT_HISTORY_DEPTH = int(os.getenv("UNDO_DEPTH", "20"))
+OVERLAY_BUCKETS = 32
+
+def freeze_shared(value, previous=None):
+    """
+    Freezes a JSON-style value like world_template.freeze, but reuses every part of the
+    previous frozen version that is unchanged, so consecutive versions share all the
+    subtrees a command did not touch.
+    """
+    if isinstance(value, dict):
+        old = previous if isinstance(previous, Mapping) else {}
+        items = {key: freeze_shared(item, old.get(key)) for key, item in value.items()}
+        if old is previous and len(items) == len(old) and all(key in old and old[key] is item for key, item in items.items()):
+            return previous
+        return MappingProxyType(items)
+    if isinstance(value, list):
+        old = previous if isinstance(previous, tuple) else ()
+        items = tuple(freeze_shared(item, old[index] if index < len(old) else None) for index, item in enumerate(value))
+        if old is previous and len(items) == len(old) and all(item is old_item for item, old_item in zip(items, old)):
+            return previous
+        return items
+    if type(value) is type(previous) and value == previous:
+        return previous
+    return value
+
+class CommandRewound(Exception):
+    """
+    Raised to abandon the running command after the player took it back.
+    """
+
+class Version:
+    """
+    One frozen state of a player's game. The location overlay is split into buckets,
+    so a new version copies only the buckets holding the locations that changed.
+    """
+
+    __slots__ = ("player", "quests", "overlay", "label")
+
+    def __init__(self, player, quests, overlay, label):
+        self.player = player
+        self.quests = quests
+        self.overlay = overlay
+        self.label = label
+
+    def section(self, name, section):
+        return self.overlay[hash(name) % OVERLAY_BUCKETS].get(name, {}).get(section)
+
+    def with_sections(self, changes):
+        """
+        Returns the overlay buckets with the changed sections replaced.
+        """
+        buckets = list(self.overlay)
+        copied = set()
+        for name, sections in changes.items():
+            index = hash(name) % OVERLAY_BUCKETS
+            if index not in copied:
+                buckets[index] = dict(buckets[index])
+                copied.add(index)
+            merged = dict(buckets[index].get(name, {}))
+            merged.update(sections)
+            buckets[index][name] = MappingProxyType(merged)
+        return tuple(buckets)
+
+    def thaw_overlay(self):
+        return {name: thaw(sections) for bucket in self.overlay for name, sections in bucket.items()}
+
+class StateHistory:
+    """
+    Undo and redo for one player's game, keeping at most `depth` earlier versions.
+    A version is recorded after each command. The player and quests are re-frozen
+    against the previous version, and of the location overlay only the sections the
+    command asked to write (through LayeredLocations.section_for_update) are.
+    """
+
+    def __init__(self, depth=DEFAULT_HISTORY_DEPTH):
+        self.depth = depth
+        self.versions = deque(maxlen=depth + 1)
+        self.redo_versions = []
+        self.state = None
+
+    def reset(self, game_state):
+        """
+        Starts a new history whose only version is the given state.
+        """
+        locations = game_state["locations"]
+        locations.touched = set()
+        buckets = [{} for _ in range(OVERLAY_BUCKETS)]
+        for name, sections in locations.overlay.items():
+            buckets[hash(name) % OVERLAY_BUCKETS][name] = freeze_shared(sections)
+        self.versions.clear()
+        self.redo_versions = []
+        self.versions.append(Version(freeze_shared(game_state["player"]), freeze_shared(game_state["quests"]), tuple(buckets), None))
+        self.state = game_state
+
+    def begin(self, game_state):
+        """
+        Makes sure the history follows the given state, starting over if it was replaced.
+        """
+        if game_state is not self.state:
+            self.reset(game_state)
+
+    def tracks(self, game_state):
+        return self.state is game_state and bool(self.versions)
+
+    def record(self, game_state, label):
+        """
+        Adds the state reached by a command as a new version. Returns False if nothing changed.
+        """
+        if game_state is not self.state:
+            self.reset(game_state)
+            return False
+        locations = game_state["locations"]
+        touched, locations.touched = locations.touched, set()
+        previous = self.versions[-1]
+        player = freeze_shared(game_state["player"], previous.player)
+        quests = freeze_shared(game_state["quests"], previous.quests)
+        changes = {}
+        for name, section in touched:
+            old = previous.section(name, section)
+            frozen = freeze_shared(locations.overlay.get(name, {}).get(section), old)
+            if frozen is not old:
+                changes.setdefault(name, {})[section] = frozen
+        if player is previous.player and quests is previous.quests and not changes:
+            return False
+        overlay = previous.with_sections(changes) if changes else previous.overlay
+        self.versions.append(Version(player, quests, overlay, label))
+        self.redo_versions = []
+        return True
+
+    def _restore(self, game_state, version):
+        game_state["player"] = thaw(version.player)
+        game_state["quests"] = thaw(version.quests)
+        game_state["locations"].overlay = version.thaw_overlay()
+        game_state["locations"].touched = set()
+
+    def rewind(self, game_state):
+        """
+        Drops any changes made since the last recorded version.
+        """
+        self._restore(game_state, self.versions[-1])
+
+    def undo(self, game_state):
+        """
+        Steps back one version and returns the label of the command undone, or None.
+        """
+        if game_state is not self.state or len(self.versions) < 2:
+            return None
+        undone = self.versions.pop()
+        self.redo_versions.append(undone)
+        self._restore(game_state, self.versions[-1])
+        return undone.label
+
+    def redo(self, game_state):
+        """
+        Re-applies the last undone version and returns its command label, or None.
+        """
+        if game_state is not self.state or not self.redo_versions:
+            return None
+        version = self.redo_versions.pop()
+        self.versions.append(version)
+        self._restore(game_state, version)
+        return version.label
@@ -1,18 +1,115 @@
+import io
 import json
+import lzma
+import marshal
+import os
+import pickle
+import zlib
+from instrumentation import span
+from world_template import to_save_document, from_save_document
 
-def save_game_state(state, filename="game_state.json"):
+SAVE_FORMAT = os.getenv("SAVE_FORMAT", "compact")
+BINARY_MAGIC = b"DMSAVE"
+BINARY_VERSION = 2
+BINARY_PICKLE_PROTOCOL = 4
+ZLIB_LEVEL = 6
+
+CODECS = {}
+
+def register_codec(name, encode, decode, magic=None):
+    """
+    Adds a save encoding. encode turns a save document into bytes and decode reverses it.
+    magic is the byte prefix that identifies the encoding on load; codecs without one are read as JSON text.
+    """
+    CODECS[name] = {"encode": encode, "decode": decode, "magic": magic}
+
+def _json_bytes(document):
+    return json.dumps(document, separators=(",", ":")).encode("utf-8")
+
+def _json_document(data):
+    return json.loads(data.decode("utf-8"))
+
+register_codec("pretty", lambda document: json.dumps(document, indent=4).encode("utf-8"), _json_document)
+register_codec("compact", _json_bytes, _json_document)
+register_codec(
+    "zlib",
+    lambda document: zlib.compress(_json_bytes(document), ZLIB_LEVEL),
+    lambda data: _json_document(zlib.decompress(data)),
+    magic=(b"\x78\x01", b"\x78\x5e", b"\x78\x9c", b"\x78\xda"),
+)
+register_codec(
+    "lzma",
+    lambda document: lzma.compress(_json_bytes(document)),
+    lambda data: _json_document(lzma.decompress(data)),
+    magic=(b"\xfd7zXZ\x00",),
+)
+
+class _DocumentUnpickler(pickle.Unpickler):
+    """
+    Unpickler for save documents, which hold only dicts, lists, strings, numbers,
+    booleans and None; it refuses to import anything, so a save cannot run code.
+    """
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Save files cannot reference {module}.{name}.")
+
+def _binary_bytes(document):
+    return BINARY_MAGIC + bytes([BINARY_VERSION]) + pickle.dumps(document, protocol=BINARY_PICKLE_PROTOCOL)
+
+def _binary_document(data):
+    """
+    Reads a binary save. Version 2 is pickle at a fixed protocol, which every later Python
+    can read; version 1 saves were written with marshal, whose format may change between
+    Python versions, and are only readable by a compatible interpreter.
+    """
+    version = data[len(BINARY_MAGIC)]
+    payload = data[len(BINARY_MAGIC) + 1:]
+    if version == 1:
+        return marshal.loads(payload)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported binary save version {version}.")
+    return _DocumentUnpickler(io.BytesIO(payload)).load()
+
+register_codec("binary", _binary_bytes, _binary_document, magic=(BINARY_MAGIC,))
+
+def detect_codec(data):
+    """
+    Returns the name of the codec that wrote the data, judged by its leading bytes.
+    """
+    for name, codec in CODECS.items():
+        if codec["magic"] and data.startswith(codec["magic"]):
+            return name
+    return "compact"
+
+def encode_document(document, codec=None):
+    name = codec or SAVE_FORMAT
+    if name not in CODECS:
+        raise ValueError(f"Unknown save format '{name}'. Choose one of: {', '.join(CODECS)}.")
+    return CODECS[name]["encode"](document)
+
+def decode_document(data):
+    return CODECS[detect_codec(data)]["decode"](data)
+
+def save_game_state(state, filename="game_state.json", codec=None):
     """
-    Saves the current game state to a JSON file.
+    Saves the current game state in the given codec, SAVE_FORMAT by default.
+    Only the player's overlay is written; the shared world lives in its template file.
+    The filename keeps its .json extension in every codec: loading detects the codec
+    from the leading bytes, so changing SAVE_FORMAT never leaves an existing save behind.
     """
-    with open(filename, "w") as file:
-        json.dump(state, file, indent=4)
+    with span("persistence.save"):
+        data = encode_document(to_save_document(state), codec)
+        with open(filename, "wb") as file:
+            file.write(data)
 
 def load_game_state(filename="game_state.json"):
     """
-    Loads the game state from a JSON file.
+    Loads the game state from a save in any registered codec.
     """
     try:
-        with open(filename, "r") as file:
-            return json.load(file)
+        with span("persistence.load"):
+            with open(filename, "rb") as file:
+                data = file.read()
+            return from_save_document(decode_document(data))
     except FileNotFoundError:
         return None
@@ -0,0 +1,58 @@
+import asyncio
+import itertools
+import threading
+import time
+
+class TaskRegistry:
+    """
+    Keeps track of a session's background jobs, whether they are coroutines on the
+    session's event loop or futures from a thread pool, so they can be listed and
+    cancelled together. Coroutines can only be spawned once a loop is attached.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.jobs = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def track(self, name, future):
+        """
+        Registers a concurrent.futures.Future and forgets it once it finishes.
+        """
+        job_id = next(self.ids)
+        with self.lock:
+            self.jobs[job_id] = (name, future, time.monotonic())
+        future.add_done_callback(lambda finished: self._forget(job_id))
+        return future
+
+    def _forget(self, job_id):
+        with self.lock:
+            self.jobs.pop(job_id, None)
+
+    def spawn(self, name, coroutine):
+        """
+        Schedules a coroutine on the attached loop from any thread and returns its future.
+        """
+        if self.loop is None or self.loop.is_closed():
+            coroutine.close()
+            raise RuntimeError("No event loop is attached to this task registry.")
+        return self.track(name, asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+    def running(self):
+        """
+        Returns (name, seconds running) for every unfinished job, oldest first.
+        """
+        now = time.monotonic()
+        with self.lock:
+            jobs = sorted(self.jobs.values(), key=lambda job: job[2])
+        return [(name, now - started) for name, future, started in jobs if not future.done()]
+
+    def cancel_all(self):
+        """
+        Cancels every unfinished job and returns how many were cancelled.
+        Thread pool jobs that have already started run to completion.
+        """
+        with self.lock:
+            futures = [future for name, future, started in self.jobs.values()]
+        return sum(1 for future in futures if future.cancel())
@@ -0,0 +1,74 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import span
+from world_generator import generate_frontier_location
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="world-expansion")
+pending_jobs = {}
+jobs_lock = threading.Lock()
+
+def is_pending(location_data):
+    return bool(location_data.get("pending"))
+
+def _template_of(locations):
+    return getattr(locations, "template", None)
+
+def _expandable(template):
+    return template is not None and "expansion" in template.locations.index
+
+def schedule_expansion(locations, name):
+    """
+    Starts generating a pending location in the background and returns its future,
+    or None if the location is already generated. Repeated calls share one job.
+    """
+    template = _template_of(locations)
+    if not _expandable(template) or name not in template.locations or not is_pending(template.locations[name]):
+        return None
+    key = (template.world_id, name)
+    with jobs_lock:
+        job = pending_jobs.get(key)
+        if job is None:
+            job = executor.submit(_generate, template, name)
+            pending_jobs[key] = job
+            job.add_done_callback(lambda finished: _forget(key))
+        return job
+
+def _forget(key):
+    with jobs_lock:
+        pending_jobs.pop(key, None)
+
+def expand_around(locations, name):
+    """
+    Queues generation for every pending location connected to the given one.
+    """
+    if not _expandable(_template_of(locations)) or name not in locations:
+        return
+    for target in locations[name].get("connections", {}).values():
+        schedule_expansion(locations, target)
+
+def ensure_generated(locations, name):
+    """
+    Blocks until a pending location has been generated. Used when the player walks into one
+    before its background job has finished.
+    """
+    job = schedule_expansion(locations, name)
+    if job is not None:
+        job.result()
+
+def _generate(template, name):
+    """
+    Replaces a pending stub in the shared template with a generated location and adds
+    the stubs beyond it. The stubs go in first so no reader ever follows a connection
+    to a missing location; the expansion lock keeps quest placement consistent between jobs.
+    """
+    store = template.locations
+    with template.expansion_lock, span("world.expand"):
+        stub = store[name]
+        if not is_pending(stub):
+            return
+        expansion = store.index["expansion"]
+        location, stubs = generate_frontier_location(name, stub, expansion, lambda candidate: candidate in store)
+        for stub_name, stub_data in stubs.items():
+            store.add_location(stub_name, stub_data, near=name)
+        store.replace_location(name, location)
+        store.save_index()
@@ -0,0 +1,398 @@
+import random
+from bisect import bisect
+from collections import deque
+from item_catalog import resolve_item
+
+DIRECTIONS = {"north": (0, -1), "south": (0, 1), "east": (1, 0), "west": (-1, 0)}
+OPPOSITE = {"north": "south", "south": "north", "east": "west", "west": "east"}
+
+QUESTS = {
+    "retrieve_ancient_artifact": {
+        "description": "Retrieve the Ancient Artifact protected by the Shadow Lord in the Cursed Castle.",
+        "required_items": ["ancient_artifact"],
+        "required_npcs": [],
+    },
+    "find_mystic_gem": {
+        "description": "Locate the Mystic Gem concealed in the Crystal Caves.",
+        "required_items": ["mystic_gem"],
+        "required_npcs": [],
+    },
+    "vanquish_final_boss": {
+        "description": "Slay the Shadow Lord in the Cursed Castle.",
+        "required_items": [],
+        "required_npcs": ["final_boss"],
+    },
+}
+
+ITEM_TYPE_WEIGHTS = {"tool": 10, "weapon": 20, "healing": 50, "key": 30}
+
+ITEMS = {
+    "tool": ["torch"],
+    "weapon": ["dagger", "short_sword", "war_axe"],
+    "healing": ["healing_potion", "herbal_remedy", "elixir_of_vigor"],
+    "key": ["silver_key", "iron_key", "bronze_key"],
+}
+
+PLACE_ADJECTIVES = [
+    "whispering", "forgotten", "misty", "sunken", "frozen", "burning", "silent", "hollow", "emerald",
+    "shadowed", "ancient", "crimson", "withered", "gilded", "howling", "moonlit", "drowned", "ashen",
+]
+PLACE_NOUNS = [
+    "forest", "lake", "ruins", "mine", "marsh", "hollow", "crypt", "tower", "canyon", "grove",
+    "village", "bridge", "caverns", "shrine", "pass", "fortress", "glade", "catacombs",
+]
+PLACE_DETAILS = [
+    "where old banners rot on broken poles",
+    "echoing with the drip of unseen water",
+    "half-swallowed by creeping roots",
+    "lit by a pale and sickly glow",
+    "littered with the bones of careless travellers",
+    "watched over by weathered stone statues",
+    "where the wind carries distant whispers",
+    "scarred by some long-forgotten battle",
+]
+CREATURES = [
+    "goblin_scout", "skeleton_warrior", "dire_wolf", "cave_troll", "bandit", "giant_spider",
+    "wandering_monk", "hermit", "cultist", "wraith", "orc_raider", "stone_golem",
+]
+TRAPS = [
+    ("pit_trap", "A concealed pit opens beneath your feet."),
+    ("poison_darts", "Tiny darts hiss out of the walls."),
+    ("falling_rocks", "Loose rocks tumble from above."),
+    ("snare", "A hidden snare yanks you off your feet."),
+    ("fire_glyph", "A glowing rune erupts in flame."),
+]
+
+ITEM_TYPES = list(ITEM_TYPE_WEIGHTS)
+ITEM_TYPE_CUMULATIVE = [sum(list(ITEM_TYPE_WEIGHTS.values())[:index + 1]) for index in range(len(ITEM_TYPES))]
+
+def _pick(rng, options):
+    """
+    Uniform choice that avoids random.choice's per-call overhead on hot paths.
+    """
+    return options[int(rng.random() * len(options))]
+
+def _weighted_pick(rng, options, cumulative_weights):
+    return options[bisect(cumulative_weights, rng.random() * cumulative_weights[-1])]
+
+def _random_item_type(rng):
+    return _weighted_pick(rng, ITEM_TYPES, ITEM_TYPE_CUMULATIVE)
+
+def _place_cells(rng, count):
+    """
+    Grows a connected blob of grid cells from the origin.
+    Returns the cells in the order they were added and the cell each one grew from.
+    """
+    cells = [(0, 0)]
+    parents = {(0, 0): None}
+    frontier = [(0, 0)]
+    while len(cells) < count:
+        index = int(rng.random() * len(frontier))
+        x, y = frontier[index]
+        options = [(x + dx, y + dy) for dx, dy in DIRECTIONS.values() if (x + dx, y + dy) not in parents]
+        if not options:
+            frontier[index] = frontier[-1]
+            frontier.pop()
+            continue
+        cell = _pick(rng, options)
+        parents[cell] = (x, y)
+        cells.append(cell)
+        frontier.append(cell)
+    return cells, parents
+
+def _direction_between(a, b):
+    delta = (b[0] - a[0], b[1] - a[1])
+    for direction, offset in DIRECTIONS.items():
+        if offset == delta:
+            return direction
+    return None
+
+def _name_locations(rng, count):
+    names = ["starting_location"]
+    seen = {}
+    while len(names) < count:
+        base = f"{_pick(rng, PLACE_ADJECTIVES)}_{_pick(rng, PLACE_NOUNS)}"
+        seen[base] = seen.get(base, 0) + 1
+        names.append(base if seen[base] == 1 else f"{base}_{seen[base]}")
+    return names
+
+def _describe(rng, name):
+    words = name.replace("_", " ").rstrip("0123456789 ")
+    return f"A {words} {_pick(rng, PLACE_DETAILS)}."
+
+def _bfs_distances(connections, start):
+    distances = {start: 0}
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        for neighbour in connections[current].values():
+            if neighbour not in distances:
+                distances[neighbour] = distances[current] + 1
+                parents[neighbour] = current
+                queue.append(neighbour)
+    return distances, parents
+
+def _make_item(rng, item_type):
+    """
+    Returns the catalog id of a random item of the given type.
+    """
+    return _pick(rng, ITEMS[item_type])
+
+def generate_procedural_game_state(locations=12, seed=None, extra_connection_rate=0.15):
+    """
+    Builds a complete game state locally from a seed, following the same placement rules
+    as the world-generation prompt. Only the short `description` is written here; the
+    atmospheric `generated_description` is filled in by the AI the first time a location is seen.
+    """
+    rng = random.Random(seed)
+    count = max(3, locations)
+
+    cells, grown_from = _place_cells(rng, count)
+    names = _name_locations(rng, count)
+    cell_names = dict(zip(cells, names))
+
+    connections = {name: {} for name in names}
+    for cell in cells[1:]:
+        parent = grown_from[cell]
+        direction = _direction_between(parent, cell)
+        connections[cell_names[parent]][direction] = cell_names[cell]
+        connections[cell_names[cell]][OPPOSITE[direction]] = cell_names[parent]
+    for cell, name in cell_names.items():
+        for direction, (dx, dy) in DIRECTIONS.items():
+            neighbour = cell_names.get((cell[0] + dx, cell[1] + dy))
+            if neighbour and direction not in connections[name] and rng.random() < extra_connection_rate:
+                connections[name][direction] = neighbour
+                connections[neighbour][OPPOSITE[direction]] = name
+
+    distances, path_parents = _bfs_distances(connections, "starting_location")
+    farthest = max(names, key=lambda name: distances[name])
+    boss_location = "cursed_castle"
+    gem_candidates = [name for name in names if name not in ("starting_location", farthest)]
+    gem_location = "crystal_caves"
+    gem_original = _pick(rng, gem_candidates)
+
+    renames = {farthest: boss_location, gem_original: gem_location}
+    names = [renames.get(name, name) for name in names]
+    connections = {
+        renames.get(name, name): {direction: renames.get(target, target) for direction, target in links.items()}
+        for name, links in connections.items()
+    }
+    distances = {renames.get(name, name): distance for name, distance in distances.items()}
+    path_parents = {
+        renames.get(name, name): renames.get(parent, parent) if parent else None
+        for name, parent in path_parents.items()
+    }
+
+    locked = {name: {} for name in names}
+    for name, links in connections.items():
+        for direction, target in links.items():
+            if target == boss_location:
+                locked[name][direction] = True
+
+    target_locks = max(rng.randint(4, 6), count // 20)
+    route = []
+    step = path_parents[boss_location]
+    while step and step != "starting_location":
+        route.append(step)
+        step = path_parents[step]
+    for child in route[:2]:
+        parent = path_parents[child]
+        if parent == "starting_location":
+            continue
+        direction = next(d for d, t in connections[parent].items() if t == child)
+        locked[parent][direction] = True
+
+    all_paths = [(name, direction) for name, links in connections.items() for direction in links]
+    rng.shuffle(all_paths)
+    locked_count = sum(len(paths) for paths in locked.values())
+    for name, direction in all_paths:
+        if locked_count >= target_locks:
+            break
+        if name == "starting_location" or locked[name].get(direction):
+            continue
+        locked[name][direction] = True
+        locked_count += 1
+
+    world = {}
+    max_distance = max(distances.values()) or 1
+    for name in names:
+        npcs, items, traps = _populate(rng, name, distances[name] / max_distance)
+        world[name] = {
+            "description": _describe(rng, name),
+            "npcs": npcs,
+            "items": items,
+            "connections": connections[name],
+            "locked_paths": locked[name],
+            "hidden_items": {},
+            "traps": traps,
+        }
+
+    _place_boss(world["cursed_castle"])
+    _place_gem(world["crystal_caves"])
+
+    keys_needed = 2 * locked_count - sum(
+        1 for location in world.values() for item in location["items"].values() if resolve_item(item)["type"] == "key"
+    )
+    reachable = [name for name in names if name != "cursed_castle"]
+    for _ in range(max(0, keys_needed)):
+        _add_key(rng, world[_pick(rng, reachable)]["items"])
+
+    return _new_game_state(rng, world)
+
+def _populate(rng, name, danger):
+    """
+    Rolls the NPCs, items and traps for a location; danger runs from 0 near the start to 1 at the far edge.
+    """
+    npcs = {}
+    npc_count = 0 if name == "starting_location" else _weighted_pick(rng, (0, 1, 2), (30, 80, 100))
+    for _ in range(npc_count):
+        creature = _pick(rng, CREATURES)
+        while creature in npcs:
+            creature = f"{creature}_{len(npcs) + 1}"
+        hp = int(rng.randint(30, 60) * (1 + danger))
+        npcs[creature] = {"hp": hp, "max_hp": hp, "attack": int(rng.randint(3, 7) * (1 + danger)), "status": "active"}
+
+    items = {}
+    for _ in range(_weighted_pick(rng, (0, 1, 2, 3), (20, 60, 90, 100))):
+        item = _make_item(rng, _random_item_type(rng))
+        items.setdefault(item, item)
+
+    traps = {}
+    if name != "starting_location":
+        for _ in range(_weighted_pick(rng, (0, 1, 2), (60, 92, 100))):
+            trap_name, trap_description = _pick(rng, TRAPS)
+            traps[trap_name] = {
+                "description": trap_description,
+                "damage": rng.randint(5, 30),
+                "disarm_difficulty": _pick(rng, ["simple", "challenging", "very_challenging"]),
+                "triggered": False,
+            }
+    return npcs, items, traps
+
+def _place_boss(location):
+    location["description"] = "A ruined castle wreathed in storm clouds, seat of the Shadow Lord."
+    location["npcs"]["final_boss"] = {"hp": 200, "max_hp": 200, "attack": 18, "status": "active", "xp": 100}
+    location["items"]["ancient_artifact"] = "ancient_artifact"
+
+def _place_gem(location):
+    location["description"] = "Glittering caves where crystals hum with a faint inner light."
+    location["items"]["mystic_gem"] = "mystic_gem"
+
+def _add_key(rng, location_items):
+    key_item = _make_item(rng, "key")
+    suffix = 2
+    unique_name = key_item
+    while unique_name in location_items:
+        unique_name = f"{key_item}_{suffix}"
+        suffix += 1
+    location_items[unique_name] = key_item if unique_name == key_item else {"id": key_item}
+
+def _new_game_state(rng, world):
+    max_hp = rng.randint(80, 140)
+    inventory = [_make_item(rng, "key")] + [_make_item(rng, _random_item_type(rng)) for _ in range(rng.randint(1, 3))]
+
+    return {
+        "player": {
+            "location": "starting_location",
+            "location_history": [],
+            "hp": max_hp,
+            "max_hp": max_hp,
+            "attack": rng.randint(6, 14),
+            "xp": 0,
+            "level": 1,
+            "xp_to_next_level": _pick(rng, [50, 75, 100]),
+            "inventory": inventory,
+        },
+        "quests": {name: {**quest, "completed": False, "required_items": list(quest["required_items"]),
+                          "required_npcs": list(quest["required_npcs"])} for name, quest in QUESTS.items()},
+        "locations": world,
+    }
+
+def pending_stub(depth, connections):
+    """
+    Placeholder for a location that has not been generated yet. It only knows its way back.
+    """
+    return {
+        "pending": True,
+        "description": "Unexplored land, still hidden in fog.",
+        "depth": depth,
+        "connections": connections,
+    }
+
+def generate_frontier_location(name, stub, expansion, is_taken):
+    """
+    Generates a pending location and the new stubs beyond it, under the same placement rules
+    as a full world: the Crystal Caves appear at gem_depth, the Cursed Castle at boss_depth
+    behind a locked path, and two keys are placed for every lock. Updates `expansion` in place.
+    Returns the location and a mapping of new stub names to stub data.
+    """
+    rng = random.Random(f"{expansion['seed']}:{name}")
+    depth = stub.get("depth", 0)
+    connections = dict(stub.get("connections", {}))
+    locked = {}
+    npcs, items, traps = _populate(rng, name, min(1.0, depth / max(1, expansion["boss_depth"])))
+    location = {
+        "description": _describe(rng, name),
+        "npcs": npcs,
+        "items": items,
+        "connections": connections,
+        "locked_paths": locked,
+        "hidden_items": {},
+        "traps": traps,
+        "depth": depth,
+    }
+    if name == "cursed_castle":
+        _place_boss(location)
+        return location, {}
+    if name == "crystal_caves":
+        _place_gem(location)
+
+    free = [direction for direction in DIRECTIONS if direction not in connections]
+    exits = min(len(free), _weighted_pick(rng, (1, 2, 3), (35, 85, 100)))
+    rng.shuffle(free)
+    stubs = {}
+    for direction in free[:exits]:
+        if not expansion["boss_placed"] and depth + 1 >= expansion["boss_depth"]:
+            stub_name = "cursed_castle"
+            expansion["boss_placed"] = True
+            locked[direction] = True
+        elif not expansion["gem_placed"] and depth + 1 >= expansion["gem_depth"]:
+            stub_name = "crystal_caves"
+            expansion["gem_placed"] = True
+        else:
+            base = f"{_pick(rng, PLACE_ADJECTIVES)}_{_pick(rng, PLACE_NOUNS)}"
+            stub_name = base
+            suffix = 2
+            while is_taken(stub_name) or stub_name in stubs:
+                stub_name = f"{base}_{suffix}"
+                suffix += 1
+            if name != "starting_location" and rng.random() < expansion["lock_rate"]:
+                locked[direction] = True
+        connections[direction] = stub_name
+        stubs[stub_name] = pending_stub(depth + 1, {OPPOSITE[direction]: name})
+
+    for _ in range(2 * len(locked)):
+        _add_key(rng, items)
+    return location, stubs
+
+def generate_expanding_game_state(seed=None, boss_depth=8, gem_depth=4, lock_rate=0.15):
+    """
+    Builds a game state holding only the starting location and pending stubs around it.
+    The rest of the world is generated on demand as the player approaches it.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    expansion = {
+        "seed": str(seed),
+        "boss_depth": max(2, boss_depth),
+        "gem_depth": max(1, min(gem_depth, boss_depth - 1)),
+        "lock_rate": lock_rate,
+        "boss_placed": False,
+        "gem_placed": False,
+    }
+    start, stubs = generate_frontier_location("starting_location", pending_stub(0, {}), expansion, lambda name: False)
+    world = {"starting_location": start, **stubs}
+    game_state = _new_game_state(random.Random(expansion["seed"]), world)
+    game_state["expansion"] = expansion
+    return game_state
@@ -0,0 +1,260 @@
+import ast
+import json
+from world_generator import QUESTS
+
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+DISARM_DIFFICULTIES = ("simple", "challenging", "very_challenging")
+
+PLAYER_DEFAULTS = {
+    "location_history": [],
+    "attack": 10,
+    "xp": 0,
+    "level": 1,
+    "xp_to_next_level": 75,
+    "inventory": [],
+}
+LOCATION_SECTIONS = ("npcs", "items", "connections", "locked_paths", "hidden_items", "traps")
+NPC_DEFAULTS = {"hp": 30, "attack": 5, "status": "active"}
+TRAP_DEFAULTS = {"description": "A hidden trap.", "damage": 10, "disarm_difficulty": "simple", "triggered": False}
+
+def _fix_syntax(text):
+    """
+    Rewrites JSON-like text character by character, outside of strings: drops text around
+    the root object, trailing commas and Python literals. If the text ends early, it is cut
+    back to the last complete member and the open brackets are closed.
+    Returns the text, the fixes made and the key path of the containers that were closed
+    early (empty if the text was complete).
+    """
+    start = text.find("{")
+    if start == -1:
+        return None, [], []
+    fixes = []
+    if text[:start].strip():
+        fixes.append("dropped text before the JSON object")
+
+    out = []
+    stack = []
+    last_string = None
+    string_start = None
+    safe = None
+    in_string = False
+    escaped = False
+    index = start
+    end = len(text)
+    while index < end:
+        char = text[index]
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                token = "".join(out[string_start:])
+                try:
+                    last_string = json.loads(token, strict=False)
+                except json.JSONDecodeError:
+                    last_string = token[1:-1]
+            index += 1
+            continue
+
+        if char == '"':
+            in_string = True
+            string_start = len(out)
+            out.append(char)
+        elif char in "{[":
+            parent_key = stack[-1]["key"] if stack and stack[-1]["bracket"] == "{" else None
+            stack.append({"bracket": char, "key": None, "parent_key": parent_key})
+            out.append(char)
+        elif char in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+                if "removed trailing commas" not in fixes:
+                    fixes.append("removed trailing commas")
+            out.append(char)
+            if stack:
+                stack.pop()
+            if not stack:
+                if text[index + 1:].strip():
+                    fixes.append("dropped text after the JSON object")
+                return "".join(out), fixes, []
+            safe = (len(out), [dict(entry) for entry in stack])
+        elif char == ":":
+            if stack and stack[-1]["bracket"] == "{":
+                stack[-1]["key"] = last_string
+            out.append(char)
+        elif char == ",":
+            safe = (len(out), [dict(entry) for entry in stack])
+            out.append(char)
+        elif char.isalpha():
+            word_end = index
+            while word_end < end and (text[word_end].isalnum() or text[word_end] == "_"):
+                word_end += 1
+            word = text[index:word_end]
+            if word in PYTHON_LITERALS:
+                word = PYTHON_LITERALS[word]
+                if "converted Python literals" not in fixes:
+                    fixes.append("converted Python literals")
+            out.append(word)
+            index = word_end
+            continue
+        else:
+            out.append(char)
+        index += 1
+
+    if safe is None:
+        return None, fixes, []
+    length, open_containers = safe
+    repaired = "".join(out[:length]).rstrip().rstrip(",")
+    repaired += "".join("}" if entry["bracket"] == "{" else "]" for entry in reversed(open_containers))
+    fixes.append("closed a truncated response")
+    path = [entry["parent_key"] for entry in open_containers[1:]]
+    return repaired, fixes, path
+
+def parse_world_text(text):
+    """
+    Parses the model's world JSON, repairing its syntax where needed.
+    Returns the parsed value (or None), the fixes made and the key path cut short by truncation.
+    """
+    try:
+        return json.loads(text, strict=False), [], []
+    except json.JSONDecodeError:
+        pass
+    try:
+        return ast.literal_eval(text), ["parsed as a Python literal"], []
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+    repaired, fixes, path = _fix_syntax(text)
+    if repaired is None:
+        return None, fixes, path
+    try:
+        return json.loads(repaired, strict=False), fixes, path
+    except json.JSONDecodeError:
+        return None, fixes, path
+
+def _fill(target, defaults, label, fixes):
+    missing = [key for key in defaults if key not in target]
+    for key in missing:
+        value = defaults[key]
+        target[key] = value.copy() if isinstance(value, (dict, list)) else value
+    if missing:
+        fixes.append(f"{label}: added {', '.join(missing)}")
+
+def _reachable(locations, start):
+    """
+    Returns the locations connected to start, treating locked paths as passable.
+    """
+    seen = {start}
+    frontier = [start]
+    while frontier:
+        for target in locations[frontier.pop()].get("connections", {}).values():
+            if target not in seen:
+                seen.add(target)
+                frontier.append(target)
+    return seen
+
+def fill_world_defaults(game_state, truncated_path=()):
+    """
+    Completes a parsed world in place: drops a location cut short by truncation, fills
+    missing keys with safe defaults and removes paths to locations that do not exist.
+    Returns the fixes made, or raises ValueError if the world cannot be played: when
+    a quest's items or NPCs are missing or cannot be reached from the start.
+    """
+    fixes = []
+    if not isinstance(game_state, dict):
+        raise ValueError("The response is not a JSON object.")
+    locations = game_state.get("locations")
+    if not isinstance(locations, dict) or not locations:
+        raise ValueError("The response has no locations.")
+    if len(truncated_path) >= 2 and truncated_path[0] == "locations" and truncated_path[1] in locations:
+        del locations[truncated_path[1]]
+        fixes.append(f"dropped incomplete location '{truncated_path[1]}'")
+    for name in [name for name, data in locations.items() if not isinstance(data, dict)]:
+        del locations[name]
+        fixes.append(f"dropped malformed location '{name}'")
+    if not locations:
+        raise ValueError("The response has no complete locations.")
+
+    for name, location in locations.items():
+        if location.get("pending"):
+            continue
+        if not isinstance(location.get("description"), str):
+            location["description"] = name.replace("_", " ").title()
+            fixes.append(f"location '{name}': added description")
+        for section in LOCATION_SECTIONS:
+            if not isinstance(location.get(section), dict):
+                location[section] = {}
+                fixes.append(f"location '{name}': added {section}")
+        for direction, target in list(location["connections"].items()):
+            if not isinstance(target, str) or target not in locations:
+                del location["connections"][direction]
+                location["locked_paths"].pop(direction, None)
+                fixes.append(f"location '{name}': removed path {direction} to unknown '{target}'")
+        for npc_name, npc in list(location["npcs"].items()):
+            if not isinstance(npc, dict):
+                npc = location["npcs"][npc_name] = {}
+            _fill(npc, {**NPC_DEFAULTS, "max_hp": npc.get("hp", NPC_DEFAULTS["hp"])}, f"NPC '{npc_name}'", fixes)
+        for trap_name, trap in list(location["traps"].items()):
+            if not isinstance(trap, dict):
+                trap = location["traps"][trap_name] = {}
+            _fill(trap, TRAP_DEFAULTS, f"trap '{trap_name}'", fixes)
+            if trap["disarm_difficulty"] not in DISARM_DIFFICULTIES:
+                trap["disarm_difficulty"] = "challenging"
+                fixes.append(f"trap '{trap_name}': unknown disarm difficulty")
+
+    player = game_state.get("player")
+    if not isinstance(player, dict):
+        player = game_state["player"] = {}
+    if not isinstance(player.get("location"), str) or player["location"] not in locations:
+        player["location"] = "starting_location" if "starting_location" in locations else next(iter(locations))
+        fixes.append(f"player: starts at '{player['location']}'")
+    max_hp = player.get("max_hp", player.get("hp", 100))
+    _fill(player, {**PLAYER_DEFAULTS, "max_hp": max_hp, "hp": max_hp}, "player", fixes)
+    for key in ("location_history", "inventory"):
+        if not isinstance(player[key], list):
+            player[key] = []
+            fixes.append(f"player: replaced malformed {key}")
+    player["location_history"] = [name for name in player["location_history"] if name in locations]
+
+    quests = game_state.get("quests")
+    if not isinstance(quests, dict) or not quests:
+        quests = game_state["quests"] = {}
+        fixes.append("added the standard quests")
+        for quest_name, quest in QUESTS.items():
+            quests[quest_name] = {**quest, "completed": False, "required_items": list(quest["required_items"]),
+                                  "required_npcs": list(quest["required_npcs"])}
+    for quest_name, quest in quests.items():
+        standard = QUESTS.get(quest_name, {})
+        defaults = {
+            "description": standard.get("description", quest_name.replace("_", " ").capitalize() + "."),
+            "completed": False,
+            "required_items": list(standard.get("required_items", [])),
+            "required_npcs": list(standard.get("required_npcs", [])),
+        }
+        _fill(quest, defaults, f"quest '{quest_name}'", fixes)
+
+    reachable = _reachable(locations, player["location"])
+    placed_items = {item for name in reachable for section in ("items", "hidden_items")
+                    for item in locations[name].get(section, {})}
+    placed_items.update(item if isinstance(item, str) else item.get("name") for item in player["inventory"]
+                        if isinstance(item, (str, dict)))
+    placed_npcs = {npc for name in reachable for npc in locations[name].get("npcs", {})}
+    for quest_name, quest in quests.items():
+        missing = [item for item in quest["required_items"] if item not in placed_items]
+        missing += [npc for npc in quest["required_npcs"] if npc not in placed_npcs]
+        if missing:
+            raise ValueError(f"Quest '{quest_name}' cannot be completed; missing or unreachable: {', '.join(missing)}")
+    return fixes
+
+def repair_world(text):
+    """
+    Turns the model's world text into a playable game state without another request.
+    Returns the game state and the fixes made, or raises ValueError if it is unusable.
+    """
+    game_state, fixes, truncated_path = parse_world_text(text)
+    if game_state is None:
+        raise ValueError("The response could not be parsed as JSON.")
+    return game_state, fixes + fill_world_defaults(game_state, truncated_path)
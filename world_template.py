@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from region_store import RegionStore
+from item_catalog import compact_game_state, compact_inventory, compact_items
+
+WORLD_FOLDER = "worlds"
+TEMPLATE_FIELDS = {"generated_description", "generated_image"}
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+def freeze(value):
+    """
+    Returns a read-only deep view of a JSON-style value.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    """
+    Returns a mutable deep copy of a frozen or JSON-style value.
+    """
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+class WorldTemplate:
+    """
+    Immutable world layout shared by every player who starts from it.
+    Locations live in region chunk files under worlds/<world_id>/ and are loaded on demand.
+    Only AI-generated flavor fields (descriptions, images) are ever added to it, plus
+    newly generated locations when the world expands on demand.
+    """
+
+    def __init__(self, world_id, locations):
+        self.world_id = world_id
+        self.locations = locations
+        self.expansion_lock = threading.Lock()
+
+    def set_generated(self, location, field, value):
+        """
+        Stores AI-generated flavor for a location so every player shares it.
+        """
+        if field not in TEMPLATE_FIELDS:
+            raise ValueError(f"'{field}' is player state and cannot be written to the world template.")
+        self.locations.update_location(location, field, value)
+
+class LayeredLocation(Mapping):
+    """
+    Read view of one location: sections the player changed come from the overlay,
+    everything else from the shared template.
+    """
+
+    def __init__(self, base, overlay):
+        self.base = base
+        self.overlay = overlay or {}
+
+    def __getitem__(self, key):
+        if key in self.overlay:
+            return self.overlay[key]
+        return self.base[key]
+
+    def __iter__(self):
+        yield from self.base
+        for key in self.overlay:
+            if key not in self.base:
+                yield key
+
+    def __len__(self):
+        return len(set(self.base) | set(self.overlay))
+
+class LayeredLocations(Mapping):
+    """
+    The locations of one player's game, resolved overlay-then-template.
+    Sections are copied into the overlay the first time they are changed, and every
+    section handed out for writing is noted in `touched` for the undo history.
+    """
+
+    def __init__(self, template, overlay=None):
+        self.template = template
+        self.overlay = overlay if overlay is not None else {}
+        self.touched = set()
+
+    def __getitem__(self, name):
+        return LayeredLocation(self.template.locations[name], self.overlay.get(name))
+
+    def __iter__(self):
+        return iter(self.template.locations)
+
+    def __len__(self):
+        return len(self.template.locations)
+
+    def __contains__(self, name):
+        return name in self.template.locations
+
+    def section_for_update(self, name, section):
+        """
+        Returns a writable copy of a location section owned by this player.
+        """
+        self.touched.add((name, section))
+        sections = self.overlay.setdefault(name, {})
+        if section not in sections:
+            sections[section] = thaw(self.template.locations[name].get(section, {}))
+        return sections[section]
+
+    def set_generated(self, name, field, value):
+        """
+        Records shared AI-generated flavor for a location on the template.
+        """
+        self.template.set_generated(name, field, value)
+
+    def prefetch_around(self, name):
+        """
+        Keeps the region around a location resident ahead of the player's next moves.
+        """
+        self.template.locations.prefetch_around(name)
+
+    def names_around(self, name):
+        """
+        Returns the locations in the regions around a location without loading any others.
+        """
+        return self.template.locations.names_around(name)
+
+    def locations_with_npc(self, npc):
+        """
+        Returns where a quest NPC lives using the world index, falling back to a full scan.
+        """
+        found = self.template.locations.locations_with_npc(npc)
+        if found is None:
+            found = [name for name in self if npc in self[name].get("npcs", {})]
+        return found
+
+def world_id_for(locations):
+    """
+    Derives a stable identifier from the world layout.
+    """
+    canonical = json.dumps(locations, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(canonical).hexdigest()[:16]
+
+def register_world(locations, quests=None, expansion=None, folder=WORLD_FOLDER):
+    """
+    Creates (or reuses) the shared template for a world layout, writing its region chunks.
+    """
+    world_id = world_id_for(locations)
+    world_folder = os.path.join(folder, world_id)
+    with _templates_lock:
+        template = _templates.get(world_id)
+        if template is None:
+            if os.path.exists(os.path.join(world_folder, "index.json")):
+                store = RegionStore(world_folder, freeze)
+            else:
+                store = RegionStore.create(world_folder, locations, freeze, quests, expansion)
+            template = WorldTemplate(world_id, store)
+            _templates[world_id] = template
+    return template
+
+def load_world(world_id, folder=WORLD_FOLDER):
+    """
+    Returns the shared template for a world, reading its index from disk only once per process.
+    Single-file worlds written by older versions are split into region chunks on first load.
+    """
+    with _templates_lock:
+        template = _templates.get(world_id)
+        if template is None:
+            world_folder = os.path.join(folder, world_id)
+            legacy_path = os.path.join(folder, f"{world_id}.json")
+            if not os.path.exists(os.path.join(world_folder, "index.json")) and os.path.exists(legacy_path):
+                with open(legacy_path, "r") as file:
+                    document = json.load(file)
+                RegionStore.create(world_folder, document["locations"], freeze)
+                os.remove(legacy_path)
+            template = WorldTemplate(world_id, RegionStore(world_folder, freeze))
+            _templates[world_id] = template
+    return template
+
+def layer_game_state(game_state):
+    """
+    Splits a full game state into a shared world template and a fresh player overlay.
+    Item definitions the catalog already holds are replaced by their ids first.
+    """
+    compact_game_state(game_state)
+    template = register_world(game_state["locations"], game_state.get("quests"), game_state.get("expansion"))
+    return {
+        "world": template.world_id,
+        "player": game_state["player"],
+        "quests": game_state["quests"],
+        "locations": LayeredLocations(template),
+    }
+
+def to_save_document(game_state):
+    """
+    Returns the per-player part of a layered game state for saving.
+    """
+    locations = game_state["locations"]
+    if not isinstance(locations, LayeredLocations):
+        return game_state
+    return {
+        "world": locations.template.world_id,
+        "player": game_state["player"],
+        "quests": game_state["quests"],
+        "location_overlay": locations.overlay,
+    }
+
+def from_save_document(document):
+    """
+    Rebuilds a layered game state from a save, migrating full legacy saves on the way.
+    """
+    if "world" in document:
+        template = load_world(document["world"])
+        overlay = document.get("location_overlay", {})
+        compact_inventory(document["player"]["inventory"])
+        for sections in overlay.values():
+            compact_items(sections.get("items", {}))
+        return {
+            "world": document["world"],
+            "player": document["player"],
+            "quests": document["quests"],
+            "locations": LayeredLocations(template, overlay),
+        }
+    return layer_game_state(document)